@@ -1,6 +1,6 @@
 import os
 import redis
-from flask import Flask, render_template
+from flask import Flask, render_template, request, jsonify
 
 from config import config_by_name
 
@@ -13,10 +13,11 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config_by_name.get(config_name, config_by_name['default']))
 
-    # Set up Redis for session storage
+    # Shared Redis client for sessions and the payroll cache
     redis_url = app.config.get('REDIS_URL', 'redis://localhost:6379/0')
+    app.extensions['redis'] = redis.from_url(redis_url, socket_timeout=2)
     if app.config.get('SESSION_TYPE') == 'redis':
-        app.config['SESSION_REDIS'] = redis.from_url(redis_url)
+        app.config['SESSION_REDIS'] = app.extensions['redis']
 
     # Initialize extensions
     from app.extensions import db, migrate, login_manager, csrf, limiter, mail, bcrypt, sess
@@ -50,11 +51,34 @@ def create_app(config_name=None):
     app.register_blueprint(employee_bp, url_prefix='/employee')
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    # Per-request SQL statement counts and Server-Timing
+    from app.utils.query_stats import init_query_stats
+    init_query_stats(app)
+
     # Register CLI commands
     from app.seeds import register_seed_command
+    from app.seeds.bulk import register_seed_bulk_command
+    from app.services.archive_service import register_archive_commands
+    from app.services.employee_service import register_purge_command
     from app.jobs.monthly_report import register_report_command
+    from app.jobs.notification_retention import register_retention_command
+    from app.services.digest_service import register_digest_command
+    from app.services.mail_queue_service import register_mail_queue_command, register_queue_gauges
+    from app.services.partition_service import register_partition_command
+    from app.services.payroll_service import register_period_commands
+    from app.services.rollup_service import register_rollup_command
     register_seed_command(app)
+    register_seed_bulk_command(app)
     register_report_command(app)
+    register_retention_command(app)
+    register_rollup_command(app)
+    register_period_commands(app)
+    register_partition_command(app)
+    register_archive_commands(app)
+    register_purge_command(app)
+    register_mail_queue_command(app)
+    register_digest_command(app)
+    register_queue_gauges()
 
     # Error handlers
     @app.errorhandler(404)
@@ -73,4 +97,13 @@ def create_app(config_name=None):
     def ratelimit_handler(e):
         return render_template('errors/429.html'), 429
 
+    from app.services.verification_service import VerificationBusy
+
+    @app.errorhandler(VerificationBusy)
+    def verification_busy(e):
+        headers = {'Retry-After': str(app.config.get('VERIFY_RETRY_AFTER', 2))}
+        if request.is_json or request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'Server busy, please try again in a moment.'}), 503, headers
+        return render_template('errors/503.html'), 503, headers
+
     return app
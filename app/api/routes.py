@@ -1,47 +1,84 @@
-import io
 from datetime import datetime, timezone
 
-from flask import request, send_file, jsonify
+from flask import Response, render_template, request, send_file, jsonify, stream_with_context
 from flask_login import login_required
 
 from app.api import api_bp
-from app.services.payroll_service import generate_payroll_csv, generate_payroll_excel
+from app.extensions import db
+from app.models.employee import Employee
+from app.services.employee_service import get_roster_page, purge_progress
+from app.services.payroll_service import (
+    generate_payroll_excel, get_employee_monthly_log, get_month_range, iter_payroll_csv,
+    iter_timesheet_csv
+)
+from app.services.trends_service import get_trends
+from app.utils import metrics as app_metrics
 from app.utils.decorators import manager_required
+from app.utils.pagination import page_size
+
+
+def _csv_response(chunks, filename):
+    """Stream CSV chunks to the client as a file download."""
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
 
 
 @api_bp.route('/export/csv')
 @login_required
 @manager_required
 def export_csv():
-    """Download payroll data as CSV."""
+    """Download payroll data as CSV (streamed)."""
     now = datetime.now(timezone.utc)
     year = request.args.get('year', now.year, type=int)
     month = request.args.get('month', now.month, type=int)
 
-    csv_data = generate_payroll_csv(year, month)
+    return _csv_response(iter_payroll_csv(year, month),
+                         f'workclock_payroll_{year}_{month:02d}.csv')
 
-    # Convert StringIO to BytesIO for send_file
-    output = io.BytesIO(csv_data.getvalue().encode('utf-8'))
-    output.seek(0)
 
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'workclock_payroll_{year}_{month:02d}.csv'
-    )
+@api_bp.route('/export/timesheet')
+@login_required
+@manager_required
+def export_timesheet():
+    """Download shift-level attendance for a date range as CSV (streamed).
+
+    Query params: start, end (YYYY-MM-DD, inclusive; default: this month),
+    employee_id (optional).
+    """
+    now = datetime.now(timezone.utc)
+    month_start, month_end = get_month_range(now.year, now.month)
+    try:
+        start = _parse_date(request.args.get('start')) or month_start.date()
+        end = _parse_date(request.args.get('end')) or month_end.date()
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format.'}), 400
+    if end < start:
+        return jsonify({'error': 'End date must not be before start date.'}), 400
+    employee_id = request.args.get('employee_id', type=int)
+
+    return _csv_response(iter_timesheet_csv(start, end, employee_id),
+                         f'workclock_timesheet_{start:%Y%m%d}_{end:%Y%m%d}.csv')
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
 
 
 @api_bp.route('/export/excel')
 @login_required
 @manager_required
 def export_excel():
-    """Download payroll data as Excel."""
+    """Download payroll data as Excel (detail=1 adds one shift sheet per employee)."""
     now = datetime.now(timezone.utc)
     year = request.args.get('year', now.year, type=int)
     month = request.args.get('month', now.month, type=int)
 
-    excel_data = generate_payroll_excel(year, month)
+    detail = request.args.get('detail', '0') == '1'
+
+    excel_data = generate_payroll_excel(year, month, detail=detail)
 
     return send_file(
         excel_data,
@@ -51,7 +88,128 @@ def export_excel():
     )
 
 
+def _page_response(page, serialize, template, **context):
+    """JSON for one keyset page: serialized items, the next cursor and the
+    rendered rows for the dashboard's "Load more" links."""
+    return jsonify({
+        'items': [serialize(item) for item in page.items],
+        'next_cursor': page.next_cursor,
+        'html': render_template(template, **context),
+    }), 200
+
+
+@api_bp.route('/employees')
+@login_required
+@manager_required
+def employees():
+    """Employee roster by name, one page at a time.
+
+    Query params: cursor (next_cursor of the previous page), limit (max 200),
+    show_inactive=1.
+    """
+    try:
+        page = get_roster_page(include_inactive=request.args.get('show_inactive', '0') == '1',
+                               cursor=request.args.get('cursor'),
+                               limit=page_size(request.args.get('limit', type=int)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def serialize(emp):
+        return {'id': emp.id, 'name': emp.name, 'email': emp.email,
+                'hourly_rate': float(emp.hourly_rate), 'is_active': emp.is_active,
+                'pending_deletion': emp.deletion_requested_at is not None}
+
+    return _page_response(page, serialize, 'dashboard/_employee_cards.html', employees=page.items)
+
+
+@api_bp.route('/employees/<int:employee_id>/purge')
+@login_required
+@manager_required
+def employee_purge(employee_id):
+    """Progress of a background employee deletion: rows left per table.
+
+    status is 'deleted' once the employee row itself is gone.
+    """
+    progress = purge_progress(employee_id)
+    if progress is None:
+        return jsonify({'error': 'Employee is not being deleted.'}), 404
+    return jsonify(progress), 200
+
+
+@api_bp.route('/employees/<int:employee_id>/attendance')
+@login_required
+@manager_required
+def employee_attendance(employee_id):
+    """An employee's attendance records for a month, newest first, one page at a time.
+
+    Query params: year, month (default: this month), cursor, limit (max 200).
+    """
+    if db.session.get(Employee, employee_id) is None:
+        return jsonify({'error': 'Employee not found.'}), 404
+    now = datetime.now(timezone.utc)
+    year = request.args.get('year', now.year, type=int)
+    month = request.args.get('month', now.month, type=int)
+    try:
+        page = get_employee_monthly_log(employee_id, year, month,
+                                        cursor=request.args.get('cursor'),
+                                        limit=page_size(request.args.get('limit', type=int)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def serialize(record):
+        return {
+            'id': record.id,
+            'clock_in': record.clock_in.isoformat(),
+            'clock_out': record.clock_out.isoformat() if record.clock_out else None,
+            'work_duration_minutes': record.work_duration_minutes,
+            'adjusted': record.adjusted_by is not None,
+            'adjuster_name': record.adjuster_name,
+            'adjustment_note': record.adjustment_note,
+        }
+
+    return _page_response(page, serialize, 'dashboard/_attendance_rows.html', records=page.items)
+
+
+@api_bp.route('/trends')
+@login_required
+@manager_required
+def trends():
+    """Hours, overtime and payroll cost per month or week over a range.
+
+    Query params: start, end (YYYY-MM, inclusive; default: year to date),
+    granularity (month or week), employee_id (optional; default company-wide).
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        start = _parse_month(request.args.get('start')) or (now.year, 1)
+        end = _parse_month(request.args.get('end')) or (now.year, now.month)
+    except ValueError:
+        return jsonify({'error': 'Months must be in YYYY-MM format.'}), 400
+    try:
+        data = get_trends(start, end,
+                          granularity=request.args.get('granularity', 'month'),
+                          employee_id=request.args.get('employee_id', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(data), 200
+
+
+def _parse_month(value):
+    if not value:
+        return None
+    parsed = datetime.strptime(value, '%Y-%m')
+    return parsed.year, parsed.month
+
+
 @api_bp.route('/status')
 def status():
     """Health check endpoint."""
     return jsonify({'status': 'ok', 'app': 'WorkClock'}), 200
+
+
+@api_bp.route('/metrics')
+@login_required
+@manager_required
+def metrics():
+    """Per-worker counters, gauges and latency percentiles."""
+    return jsonify(app_metrics.snapshot()), 200
@@ -1,10 +1,11 @@
 from flask import render_template, request, flash, redirect, url_for
 from app.attendance import attendance_bp
 from app.auth.forms import PinForm
-from app.services.attendance_service import process_pin
+from app.services.attendance_service import approve_open_shift, process_pin
 from app.extensions import limiter
 from app.models.employee import Employee
 from app.models.attendance import Attendance
+from app.utils import metrics
 
 # Approval for dual shift
 @attendance_bp.route('/approve_shift', methods=['POST'])
@@ -35,10 +36,7 @@ def approve_shift():
                     .filter_by(employee_id=approver_id, clock_out=None)
                     .first())
     if active_record:
-        active_record.adjusted_by = approver.id
-        active_record.adjustment_note = f"Approved dual shift: {reason}"
-        from app.extensions import db
-        db.session.commit()
+        approve_open_shift(active_record, approver.id, f"Approved dual shift: {reason}")
         
     if is_json:
         return {'status': 'approved', 'message': 'Approval successful. Dual shift started.'}, 200
@@ -90,6 +88,7 @@ def kiosk():
 
 @attendance_bp.route('/clock', methods=['POST'])
 @limiter.limit('5 per minute')
+@metrics.timed('clock_request')
 def clock():
     """Process PIN and clock in/out."""
     # Check if request is JSON or Form
@@ -123,7 +122,7 @@ def clock():
                      'employee': {'id': employee.id, 'name': employee.name},
                      'active_record': {
                          'id': record.id,
-                         'employee_id': record.employee.id,
+                         'employee_id': record.employee_id,
                          'employee_name': record.employee.name,
                          'clock_in': record.clock_in.isoformat()
                      }
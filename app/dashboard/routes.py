@@ -1,16 +1,22 @@
 
 from app.dashboard import dashboard_bp
 from datetime import datetime, timezone
-from flask import render_template, request, flash, redirect, url_for
+from flask import Response, render_template, request, flash, redirect, url_for
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app.dashboard.forms import AdjustmentForm, AddEmployeeForm, EditEmployeeForm
 from app.models.employee import Employee
 from app.models.attendance import Attendance
 from app.services.payroll_service import (
-    get_dashboard_metrics, get_employee_monthly_log, get_monthly_hours
+    close_period, count_employee_monthly_records, get_dashboard_metrics, get_employee_monthly_log,
+    get_monthly_hours, get_month_range
 )
-from app.services.attendance_service import adjust_record
+from app.services.attendance_service import adjust_record, approve_open_shift
+from app.services.cache_service import bump_data_version
+from app.services.employee_service import get_roster_page, request_employee_deletion
+from app.services.live_service import event_stream
 from app.utils.decorators import manager_required
+from app.utils.pagination import page_size
 from app.extensions import db
 
 # Manager approval for dual shift
@@ -23,9 +29,7 @@ def approve_dual_shift(record_id):
         flash('Attendance record not found or not active.', 'error')
         return redirect(url_for('dashboard.index'))
     reason = request.form.get('reason')
-    record.adjusted_by = current_user.id
-    record.adjustment_note = f"Manager approved dual shift: {reason}"
-    db.session.commit()
+    approve_open_shift(record, current_user.id, f"Manager approved dual shift: {reason}")
     flash('Dual shift approved by manager.', 'success')
     return redirect(url_for('dashboard.employee_detail', employee_id=record.employee_id))
 
@@ -45,9 +49,54 @@ def index():
                            metrics=metrics,
                            year=year,
                            month=month,
+                           month_end=get_month_range(year, month)[1].strftime('%Y-%m-%d'),
+                           can_close=(year, month) < (now.year, now.month) and not metrics['closed_at'],
+                           is_current_month=(year, month) == (now.year, now.month),
                            now=now)
 
 
+@dashboard_bp.route('/stream')
+@login_required
+@manager_required
+def stream():
+    """Server-Sent Events feed of attendance changes for the live dashboard."""
+    return Response(event_stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@dashboard_bp.route('/close_period', methods=['POST'])
+@login_required
+@manager_required
+def close_payroll_period():
+    """Freeze a finished month's payroll into its snapshot."""
+    year = request.form.get('year', type=int)
+    month = request.form.get('month', type=int)
+    if not year or not month or not 1 <= month <= 12:
+        flash('Invalid payroll period.', 'error')
+        return redirect(url_for('dashboard.index'))
+
+    try:
+        count = close_period(year, month, closed_by=current_user.id)
+        flash(f'Payroll for {month:02d}/{year} closed ({count} employees).', 'success')
+    except ValueError as e:
+        flash(str(e), 'error')
+    return redirect(url_for('dashboard.index', year=year, month=month))
+
+
+@dashboard_bp.route('/notifications/realtime', methods=['POST'])
+@login_required
+@manager_required
+def toggle_realtime_notifications():
+    """Switch the current manager between real-time clock emails and the digest."""
+    current_user.notify_realtime = not current_user.notify_realtime
+    db.session.commit()
+    if current_user.notify_realtime:
+        flash('You will now get an email for every clock-in and clock-out.', 'success')
+    else:
+        flash('Clock events will be sent to you as a periodic digest.', 'success')
+    return redirect(request.referrer or url_for('dashboard.index'))
+
+
 @dashboard_bp.route('/employee/<int:employee_id>')
 @login_required
 @manager_required
@@ -62,12 +111,21 @@ def employee_detail(employee_id):
     year = request.args.get('year', now.year, type=int)
     month = request.args.get('month', now.month, type=int)
 
-    records = get_employee_monthly_log(employee_id, year, month)
+    try:
+        page = get_employee_monthly_log(employee_id, year, month,
+                                        cursor=request.args.get('cursor'),
+                                        limit=page_size(request.args.get('limit', type=int)))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('dashboard.employee_detail', employee_id=employee_id,
+                                year=year, month=month))
     hours = get_monthly_hours(employee_id, year, month)
 
     return render_template('dashboard/employee_detail.html',
                            employee=employee,
-                           records=records,
+                           records=page.items,
+                           next_cursor=page.next_cursor,
+                           record_count=count_employee_monthly_records(employee_id, year, month),
                            hours=hours,
                            year=year,
                            month=month,
@@ -79,7 +137,7 @@ def employee_detail(employee_id):
 @manager_required
 def adjust(record_id):
     """Manual time adjustment for an attendance record."""
-    record = db.session.get(Attendance, record_id)
+    record = db.session.get(Attendance, record_id, options=[joinedload(Attendance.employee)])
     if not record:
         flash('Attendance record not found.', 'error')
         return redirect(url_for('dashboard.index'))
@@ -121,12 +179,16 @@ def adjust(record_id):
 def employees():
     """List all employees with management options."""
     show_inactive = request.args.get('show_inactive', '0') == '1'
-    if show_inactive:
-        all_employees = Employee.query.filter(Employee.role != 'manager').order_by(Employee.name).all()
-    else:
-        all_employees = Employee.query.filter_by(is_active=True).filter(Employee.role != 'manager').order_by(Employee.name).all()
+    try:
+        page = get_roster_page(include_inactive=show_inactive,
+                               cursor=request.args.get('cursor'),
+                               limit=page_size(request.args.get('limit', type=int)))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('dashboard.employees', show_inactive=1 if show_inactive else None))
     return render_template('dashboard/employees.html',
-                           employees=all_employees,
+                           employees=page.items,
+                           next_cursor=page.next_cursor,
                            show_inactive=show_inactive)
 
 
@@ -159,6 +221,7 @@ def add_employee():
         employee.set_pin(form.pin.data)
         db.session.add(employee)
         db.session.commit()
+        bump_data_version()
 
         flash(f'Employee "{employee.name}" added successfully.', 'success')
         return redirect(url_for('dashboard.employees'))
@@ -175,6 +238,9 @@ def edit_employee(employee_id):
     if not employee or employee.is_manager:
         flash('Employee not found.', 'error')
         return redirect(url_for('dashboard.employees'))
+    if employee.is_pending_deletion:
+        flash(f'Employee "{employee.name}" is being deleted and cannot be edited.', 'error')
+        return redirect(url_for('dashboard.employees', show_inactive=1))
 
     form = EditEmployeeForm()
     if form.validate_on_submit():
@@ -200,6 +266,7 @@ def edit_employee(employee_id):
         employee.hourly_rate = form.hourly_rate.data
         employee.is_active = form.is_active.data
         db.session.commit()
+        bump_data_version()
 
         flash(f'Employee "{employee.name}" updated successfully.', 'success')
         return redirect(url_for('dashboard.employees'))
@@ -225,6 +292,7 @@ def deactivate_employee(employee_id):
 
     employee.is_active = False
     db.session.commit()
+    bump_data_version()
     flash(f'Employee "{employee.name}" has been deactivated.', 'success')
     return redirect(url_for('dashboard.employees'))
 
@@ -239,8 +307,13 @@ def activate_employee(employee_id):
         flash('Employee not found.', 'error')
         return redirect(url_for('dashboard.employees'))
 
+    if employee.is_pending_deletion:
+        flash(f'Employee "{employee.name}" is being deleted and cannot be re-activated.', 'error')
+        return redirect(url_for('dashboard.employees', show_inactive=1))
+
     employee.is_active = True
     db.session.commit()
+    bump_data_version()
     flash(f'Employee "{employee.name}" has been re-activated.', 'success')
     return redirect(url_for('dashboard.employees'))
 
@@ -249,20 +322,17 @@ def activate_employee(employee_id):
 @login_required
 @manager_required
 def delete_employee(employee_id):
-    """Permanently delete an employee and all their records."""
+    """Permanently delete an employee and all their records (in the background)."""
     employee = db.session.get(Employee, employee_id)
     if not employee or employee.is_manager:
         flash('Employee not found.', 'error')
         return redirect(url_for('dashboard.employees'))
 
-    name = employee.name
-    # Delete related records first
-    from app.models.attendance import Attendance
-    from app.models.notification import Notification
-    Attendance.query.filter_by(employee_id=employee.id).delete()
-    Notification.query.filter_by(employee_id=employee.id).delete()
-    db.session.delete(employee)
-    db.session.commit()
+    if employee.is_pending_deletion:
+        flash(f'Employee "{employee.name}" is already being deleted.', 'info')
+        return redirect(url_for('dashboard.employees', show_inactive=1))
 
-    flash(f'Employee "{name}" and all their records have been permanently deleted.', 'success')
-    return redirect(url_for('dashboard.employees'))
+    request_employee_deletion(employee)
+    flash(f'Employee "{employee.name}" is being permanently deleted with all their records. '
+          f'This runs in the background.', 'success')
+    return redirect(url_for('dashboard.employees', show_inactive=1))
@@ -1,45 +1,115 @@
 import logging
 import click
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from dateutil.relativedelta import relativedelta
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
 
-from app.models.notification import Notification
+from app.models.report_run import ReportRun
 from app.extensions import db
 
 logger = logging.getLogger(__name__)
 
+REPORT_TYPE = 'monthly_summary'
 
-def run_monthly_report(app=None):
-    """Generate and email the monthly payroll report for the previous month.
+# A run still marked 'running' after this long is assumed to have crashed
+STALE_RUN_AFTER = timedelta(hours=1)
 
-    This job runs on the 1st of each month and covers the previous month.
-    It includes idempotency checks to avoid duplicate reports.
-    """
-    from app.services.email_service import send_monthly_report
 
+def claim_report_run(report_type, year, month, force=False):
+    """Record that a report run is starting, unless it must not run.
+
+    The first run inserts the ledger row. A failed or stale run is taken
+    over with a conditional UPDATE, so two schedulers never both send.
+
+    Args:
+        force: also take over a run that was already sent (manual resend).
+
+    Returns:
+        bool: True if the caller now owns the run and should send.
+    """
     now = datetime.now(timezone.utc)
-    # Calculate previous month
-    prev_month = now - relativedelta(months=1)
-    year = prev_month.year
-    month = prev_month.month
+    run = db.session.get(ReportRun, (report_type, year, month))
+    if run is not None and run.status == 'sent' and not force:
+        return False
+    if run is None:
+        db.session.add(ReportRun(report_type=report_type, year=year, month=month,
+                                 status='running', attempts=1, started_at=now))
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Claimed concurrently by another scheduler
+            db.session.rollback()
 
-    # Idempotency check: skip if already sent this month
-    existing = Notification.query.filter_by(type='monthly_summary').filter(
-        Notification.sent_at >= datetime(year, month, 1, tzinfo=timezone.utc),
-        Notification.message.like(f'%{year}-{month:02d}%')
-    ).first()
+    claimable = or_(ReportRun.status == 'failed',
+                    and_(ReportRun.status == 'running', ReportRun.started_at < now - STALE_RUN_AFTER))
+    if force:
+        claimable = or_(claimable, ReportRun.status == 'sent')
+    result = db.session.execute(
+        update(ReportRun)
+        .where(ReportRun.report_type == report_type, ReportRun.year == year,
+               ReportRun.month == month, claimable)
+        .values(status='running', attempts=ReportRun.attempts + 1, started_at=now,
+                finished_at=None, error=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
 
-    if existing:
-        logger.info(f'Monthly report for {year}-{month:02d} already sent. Skipping.')
-        return
 
-    logger.info(f'Generating monthly payroll report for {year}-{month:02d}...')
+def finish_report_run(report_type, year, month, status, employee_count=None, error=None):
+    """Mark a claimed run 'sent' or 'failed'."""
+    db.session.execute(
+        update(ReportRun)
+        .where(ReportRun.report_type == report_type, ReportRun.year == year, ReportRun.month == month)
+        .values(status=status, finished_at=datetime.now(timezone.utc),
+                employee_count=employee_count, error=error)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def send_report_once(year, month, force=False):
+    """Send a month's payroll report unless report_runs says it already went out.
+
+    Returns:
+        bool: True if the report was sent by this call.
+    """
+    from app.services.email_service import send_monthly_report
 
+    if not claim_report_run(REPORT_TYPE, year, month, force=force):
+        logger.info(f'Monthly report for {year}-{month:02d} already sent or in progress. Skipping.')
+        return False
+
+    logger.info(f'Generating monthly payroll report for {year}-{month:02d}...')
     try:
-        send_monthly_report(year, month)
-        logger.info(f'Monthly report for {year}-{month:02d} sent successfully.')
+        count = send_monthly_report(year, month)
     except Exception as e:
+        db.session.rollback()
+        finish_report_run(REPORT_TYPE, year, month, 'failed', error=str(e)[:1000])
         logger.error(f'Failed to send monthly report: {e}', exc_info=True)
+        return False
+
+    if count is None:
+        finish_report_run(REPORT_TYPE, year, month, 'failed', error='No manager emails configured')
+        return False
+    finish_report_run(REPORT_TYPE, year, month, 'sent', employee_count=count)
+    logger.info(f'Monthly report for {year}-{month:02d} sent successfully.')
+    return True
+
+
+def run_monthly_report(app=None):
+    """Generate and email the monthly payroll report for the previous month.
+
+    This job runs on the 1st of each month and covers the previous month.
+    The report_runs ledger makes it idempotent: a month already sent (or
+    being sent by another scheduler) is skipped, a failed one is retried.
+    """
+    now = datetime.now(timezone.utc)
+    # Calculate previous month
+    prev_month = now - relativedelta(months=1)
+    return send_report_once(prev_month.year, prev_month.month)
 
 
 def register_report_command(app):
@@ -49,14 +119,15 @@ def register_report_command(app):
     @click.option('--year', type=int, help='Year for the report')
     @click.option('--month', type=int, help='Month for the report')
     def monthly_report_cmd(year, month):
-        """Manually generate and send the monthly payroll report."""
-        from app.services.email_service import send_monthly_report
+        """Manually generate and send the monthly payroll report.
 
+        With --year/--month the report is sent even if it already was.
+        """
         if year and month:
             click.echo(f'Generating report for {year}-{month:02d}...')
-            send_monthly_report(year, month)
+            sent = send_report_once(year, month, force=True)
         else:
             click.echo('Running monthly report for previous month...')
-            run_monthly_report()
+            sent = run_monthly_report()
 
-        click.echo('Done!')
+        click.echo('Done!' if sent else 'Not sent (see the log and report_runs).')
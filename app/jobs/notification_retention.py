@@ -0,0 +1,90 @@
+"""Batched pruning of old notification log rows.
+
+notifications gets a row for every clock event that is e-mailed, so
+rows older than NOTIFICATION_RETENTION_DAYS are deleted daily by the
+scheduler. Each batch of NOTIFICATION_PRUNE_BATCH rows is its own short
+transaction, so pruning a large backlog never holds long locks.
+
+Batches are picked in id order: ids grow with sent_at, so the oldest rows
+are at the start of the primary key. Each batch reads the next batch of
+rows by id and stops at the first one sent on or after the cutoff, so
+every read is a short primary key range scan, including the last one,
+and no separate sent_at index is needed on this write-heavy table. A row
+without sent_at is judged by its id like any other: the walk only reaches
+it if it comes before the first row still inside the retention window.
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import delete, select
+
+from app.extensions import db
+from app.models.notification import Notification
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def prune_notifications(days=None, batch_size=None, pause=0.0):
+    """Delete notifications sent more than days ago, batch by batch.
+
+    Args:
+        pause: seconds to sleep between batches, to leave room for other writers.
+
+    Returns:
+        int: number of rows deleted.
+    """
+    cfg = current_app.config
+    days = cfg.get('NOTIFICATION_RETENTION_DAYS', 90) if days is None else days
+    batch_size = batch_size or cfg.get('NOTIFICATION_PRUNE_BATCH', 5000)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+    # sent_at is stored as naive UTC
+    stored_cutoff = cutoff.replace(tzinfo=None)
+    deleted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Notification.id, Notification.sent_at)
+            .where(Notification.id > last_id)
+            .order_by(Notification.id)
+            .limit(batch_size)
+        ).all()
+        ids = []
+        for row in rows:
+            if row.sent_at is not None and row.sent_at >= stored_cutoff:
+                break
+            ids.append(row.id)
+        if ids:
+            db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+            last_id = ids[-1]
+            metrics.incr('notifications_pruned', len(ids))
+        else:
+            db.session.rollback()
+        # A short batch is the end of the table; a kept row is the cutoff
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f'Pruned {deleted} notifications sent before {cutoff:%Y-%m-%d}')
+    return deleted
+
+
+def register_retention_command(app):
+    """Register the Flask CLI command for pruning old notifications."""
+
+    @app.cli.command('prune-notifications')
+    @click.option('--days', type=int, default=None,
+                  help='Keep this many days (default: NOTIFICATION_RETENTION_DAYS)')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Rows deleted per transaction (default: NOTIFICATION_PRUNE_BATCH)')
+    def prune_notifications_cmd(days, batch_size):
+        """Delete old notification log rows in batches."""
+        deleted = prune_notifications(days, batch_size)
+        click.echo(f'Pruned {deleted} notification(s).')
@@ -1,6 +1,10 @@
 # Import all models so Alembic can discover them
 from app.models.employee import Employee
 from app.models.attendance import Attendance
+from app.models.attendance_daily import AttendanceDaily
 from app.models.notification import Notification
+from app.models.payroll_snapshot import ArchivedPeriod, ClosedPeriod, PayrollSnapshot
+from app.models.report_run import ReportRun
 
-__all__ = ['Employee', 'Attendance', 'Notification']
+__all__ = ['Employee', 'Attendance', 'AttendanceDaily', 'Notification',
+           'ArchivedPeriod', 'ClosedPeriod', 'PayrollSnapshot', 'ReportRun']
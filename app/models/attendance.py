@@ -6,10 +6,24 @@ from app.extensions import db
 class Attendance(db.Model):
     """Attendance records for clock-in and clock-out."""
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # At most one open shift per employee. attendance_service.clock_in
+        # serialises clock-ins per employee with a row lock; this index is
+        # the backstop. On PostgreSQL attendance is partitioned by clock_in
+        # month and this is a per-partition index instead (see
+        # partition_service), so only the lock spans months.
+        db.Index('uq_attendance_open_shift', 'employee_id', unique=True,
+                 postgresql_where=db.text('clock_out IS NULL'),
+                 sqlite_where=db.text('clock_out IS NULL')),
+        # Per-employee month ranges in payroll_service; also serves the
+        # employee_id foreign key, so no separate employee_id index.
+        db.Index('ix_attendance_employee_clock_in', 'employee_id', 'clock_in'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False, index=True)
-    clock_in = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
+    clock_in = db.Column(db.DateTime, nullable=False, index=True,
+                         default=lambda: datetime.now(timezone.utc))
     clock_out = db.Column(db.DateTime, nullable=True)
     work_duration_minutes = db.Column(db.Integer, nullable=True)
     ip_address = db.Column(db.String(45), nullable=True)
@@ -37,10 +51,14 @@ class Attendance(db.Model):
     @property
     def formatted_duration(self):
         """Return duration as 'Xh Ym' string."""
-        if self.work_duration_minutes is None:
+        return self.format_duration(self.work_duration_minutes)
+
+    @staticmethod
+    def format_duration(total_minutes):
+        if total_minutes is None:
             return 'In progress'
-        hours = self.work_duration_minutes // 60
-        minutes = self.work_duration_minutes % 60
+        hours = total_minutes // 60
+        minutes = total_minutes % 60
         return f'{hours}h {minutes}m'
 
     def calculate_duration(self):
@@ -51,10 +69,13 @@ class Attendance(db.Model):
         When using DB-loaded values, call db.session.flush() + refresh() first.
         """
         if self.clock_in and self.clock_out:
-            ci = self.clock_in.replace(tzinfo=None)
-            co = self.clock_out.replace(tzinfo=None)
-            delta = co - ci
-            self.work_duration_minutes = max(0, int(delta.total_seconds() / 60))
+            self.work_duration_minutes = self.minutes_between(self.clock_in, self.clock_out)
+
+    @staticmethod
+    def minutes_between(clock_in, clock_out):
+        """Whole minutes between two timestamps, ignoring tzinfo (all UTC)."""
+        delta = clock_out.replace(tzinfo=None) - clock_in.replace(tzinfo=None)
+        return max(0, int(delta.total_seconds() / 60))
 
     def __repr__(self):
         status = 'active' if self.is_active else f'{self.work_duration_minutes}min'
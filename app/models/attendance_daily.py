@@ -0,0 +1,20 @@
+from app.extensions import db
+
+
+class AttendanceDaily(db.Model):
+    """Per-employee, per-day rollup of completed shifts.
+
+    Shifts are bucketed by the UTC date of clock_in, matching how
+    payroll_service assigns shifts to months. Rows are maintained by
+    rollup_service in the same transaction as clock-out and adjustments.
+    """
+    __tablename__ = 'attendance_daily'
+
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total_minutes = db.Column(db.Integer, nullable=False, default=0)
+    shift_count = db.Column(db.Integer, nullable=False, default=0)
+    overtime_eligible_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<AttendanceDaily emp={self.employee_id} {self.day} {self.total_minutes}min>'
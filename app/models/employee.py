@@ -1,23 +1,37 @@
+import hashlib
+import hmac
 from datetime import datetime, timezone
 
+from flask import current_app
 from flask_login import UserMixin
 
 from app.extensions import db, bcrypt
+from app.services.verification_service import verify
 
 
 class Employee(UserMixin, db.Model):
     """Employee model — used for both employees and managers."""
     __tablename__ = 'employees'
+    __table_args__ = (
+        # Keyset pagination of the roster on (name, id)
+        db.Index('ix_employees_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     pin_hash = db.Column(db.String(255), nullable=True)
+    pin_lookup = db.Column(db.String(64), nullable=True, index=True)
     password_hash = db.Column(db.String(255), nullable=True)
     role = db.Column(db.String(20), nullable=False, default='employee')
     hourly_rate = db.Column(db.Numeric(10, 2), nullable=False, default=0)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Managers only: email every clock event instead of the periodic digest
+    notify_realtime = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # Set when a manager deletes the employee; their rows are then removed in
+    # the scheduler (employee_service.run_pending_purges) and the row last
+    deletion_requested_at = db.Column(db.DateTime, nullable=True)
 
     # Relationships
     attendance_records = db.relationship('Attendance', backref='employee',
@@ -25,15 +39,26 @@ class Employee(UserMixin, db.Model):
                                          foreign_keys='Attendance.employee_id')
     notifications = db.relationship('Notification', backref='employee', lazy='dynamic')
 
+    @staticmethod
+    def pin_digest(raw_pin):
+        """Keyed HMAC of a PIN, used as an indexed lookup key.
+
+        The bcrypt hash stays the source of truth; this only narrows
+        find_by_pin down to a single candidate row.
+        """
+        key = current_app.config['PIN_LOOKUP_KEY'].encode('utf-8')
+        return hmac.new(key, str(raw_pin).encode('utf-8'), hashlib.sha256).hexdigest()
+
     def set_pin(self, raw_pin):
         """Hash and store a 4-digit PIN."""
         self.pin_hash = bcrypt.generate_password_hash(raw_pin).decode('utf-8')
+        self.pin_lookup = self.pin_digest(raw_pin)
 
     def check_pin(self, raw_pin):
         """Verify a PIN against the stored hash."""
         if not self.pin_hash:
             return False
-        return bcrypt.check_password_hash(self.pin_hash, raw_pin)
+        return verify(self.pin_hash, raw_pin)
 
     def set_password(self, password):
         """Hash and store a password (for managers)."""
@@ -43,19 +68,40 @@ class Employee(UserMixin, db.Model):
         """Verify a password against the stored hash."""
         if not self.password_hash:
             return False
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return verify(self.password_hash, password)
 
     @property
     def is_manager(self):
         return self.role == 'manager'
 
+    @property
+    def is_pending_deletion(self):
+        return self.deletion_requested_at is not None
+
     @classmethod
     def find_by_pin(cls, raw_pin):
-        """Find an employee by their PIN. Iterates all active employees
-        and checks bcrypt hash (can't do DB-level lookup on hashed values)."""
-        employees = cls.query.filter_by(is_active=True).all()
-        for emp in employees:
+        """Find an active employee by their PIN.
+
+        Looks up candidates through the indexed pin_lookup HMAC and verifies
+        the bcrypt hash once. Employees whose PIN was set before pin_lookup
+        existed are still scanned the old way; a match backfills their
+        lookup key so the next tap takes the indexed path.
+        """
+        digest = cls.pin_digest(raw_pin)
+        candidates = cls.query.filter_by(is_active=True, pin_lookup=digest).all()
+        for emp in candidates:
+            if emp.check_pin(raw_pin):
+                return emp
+
+        legacy = (cls.query
+                  .filter(cls.is_active.is_(True),
+                          cls.pin_hash.isnot(None),
+                          cls.pin_lookup.is_(None))
+                  .all())
+        for emp in legacy:
             if emp.check_pin(raw_pin):
+                emp.pin_lookup = digest
+                db.session.commit()
                 return emp
         return None
 
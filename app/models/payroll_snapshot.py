@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+
+from app.extensions import db
+
+
+class ClosedPeriod(db.Model):
+    """A payroll month that has been closed; its figures come from snapshots."""
+    __tablename__ = 'payroll_periods'
+
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    closed_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    closed_by = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=True)
+
+    def __repr__(self):
+        return f'<ClosedPeriod {self.year}-{self.month:02d}>'
+
+
+class PayrollSnapshot(db.Model):
+    """Per-employee payroll figures frozen when a period is closed.
+
+    Name, email and hourly rate are copied so later edits (or deleting the
+    employee) never change a closed month, hence no foreign key.
+    """
+    __tablename__ = 'payroll_snapshots'
+
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, primary_key=True)
+    employee_name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    role = db.Column(db.String(20), nullable=False)
+    hourly_rate = db.Column(db.Numeric(10, 2), nullable=False)
+    total_hours = db.Column(db.Numeric(10, 2), nullable=False)
+    regular_hours = db.Column(db.Numeric(10, 2), nullable=False)
+    overtime_hours = db.Column(db.Numeric(10, 2), nullable=False)
+    regular_pay = db.Column(db.Numeric(12, 2), nullable=False)
+    overtime_pay = db.Column(db.Numeric(12, 2), nullable=False)
+    total_pay = db.Column(db.Numeric(12, 2), nullable=False)
+
+    SUMMARY_FIELDS = ('employee_id', 'employee_name', 'email', 'role', 'hourly_rate',
+                      'total_hours', 'regular_hours', 'overtime_hours',
+                      'regular_pay', 'overtime_pay', 'total_pay')
+
+    @classmethod
+    def summary_from_row(cls, row):
+        """Same dict shape as payroll_service.get_all_employees_monthly_summary,
+        from a Core row of SUMMARY_FIELDS (read_models.snapshot_select)."""
+        summary = dict(row._mapping)
+        for key in cls.SUMMARY_FIELDS[4:]:
+            summary[key] = float(summary[key])
+        return summary
+
+    def __repr__(self):
+        return f'<PayrollSnapshot {self.year}-{self.month:02d} emp={self.employee_id}>'
+
+
+class ArchivedPeriod(db.Model):
+    """A closed month whose shifts were moved out of attendance into an archive file.
+
+    row_count and total_minutes are taken from the database before the
+    rows are deleted and checked against the file, here and on restore.
+    """
+    __tablename__ = 'archived_periods'
+    __table_args__ = (
+        db.ForeignKeyConstraint(['year', 'month'], ['payroll_periods.year', 'payroll_periods.month']),
+    )
+
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    format = db.Column(db.String(16), nullable=False)
+    path = db.Column(db.String(255), nullable=False)  # relative to ARCHIVE_DIR
+    row_count = db.Column(db.Integer, nullable=False)
+    total_minutes = db.Column(db.BigInteger, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<ArchivedPeriod {self.year}-{self.month:02d} {self.format}>'
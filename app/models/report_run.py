@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+from app.extensions import db
+
+
+class ReportRun(db.Model):
+    """One scheduled report for one month, and whether it went out.
+
+    The primary key makes "was this report already sent?" a single key
+    lookup, and lets concurrent schedulers claim a run with a conditional
+    UPDATE (see app.jobs.monthly_report).
+    """
+    __tablename__ = 'report_runs'
+
+    STATUSES = ('running', 'sent', 'failed')
+
+    report_type = db.Column(db.String(30), primary_key=True)  # monthly_summary
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(16), nullable=False, default='running')
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+    started_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime, nullable=True)
+    employee_count = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<ReportRun {self.report_type} {self.year}-{self.month:02d} {self.status}>'
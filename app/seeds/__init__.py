@@ -5,7 +5,9 @@ import random
 from app.extensions import db
 from app.models.employee import Employee
 from app.models.attendance import Attendance
+from app.models.attendance_daily import AttendanceDaily
 from app.models.notification import Notification
+from app.services.rollup_service import rebuild_rollups
 
 
 def register_seed_command(app):
@@ -18,6 +20,7 @@ def register_seed_command(app):
 
         # Clear existing data
         Notification.query.delete()
+        AttendanceDaily.query.delete()
         Attendance.query.delete()
         Employee.query.delete()
         db.session.commit()
@@ -89,6 +92,7 @@ def register_seed_command(app):
                 current_day += timedelta(days=1)
 
         db.session.commit()
+        rebuild_rollups(app)
 
         # Print summary
         click.echo('\n' + '=' * 50)
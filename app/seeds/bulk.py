@@ -0,0 +1,317 @@
+"""Large synthetic datasets for benchmarking (`flask seed-bulk`).
+
+Generates N employees and M years of shifts: day, evening and overnight
+schedules, absences, missed clock-outs fixed by the manager, corrected
+clock-ins, approved dual shifts and a few shifts still open. Shifts are
+written in batches through COPY on PostgreSQL and executemany elsewhere,
+one transaction per batch, never through ORM objects.
+
+Every employee's shifts come from their own random.Random seeded with
+(--seed, employee number), so the same --seed, --employees, --years and
+--until rebuild exactly the same shifts. PIN hashes are salted and
+differ between runs.
+"""
+import csv
+import io
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time, timedelta, timezone
+
+import bcrypt as _bcrypt
+import click
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, insert, select, text
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.attendance_daily import AttendanceDaily
+from app.models.employee import Employee
+from app.models.notification import Notification
+from app.models.payroll_snapshot import ArchivedPeriod, ClosedPeriod, PayrollSnapshot
+from app.models.report_run import ReportRun
+from app.services.cache_service import bump_data_version
+from app.services.partition_service import create_month_partition, is_partitioned
+from app.services.rollup_service import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = (
+    'Alice', 'Bob', 'Carmen', 'Daniel', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jamal',
+    'Keiko', 'Liam', 'Maya', 'Nikolai', 'Olivia', 'Pedro', 'Quinn', 'Rosa', 'Samir', 'Tara',
+    'Umar', 'Vera', 'Wei', 'Ximena', 'Yusuf', 'Zoe',
+)
+LAST_NAMES = (
+    'Anders', 'Brown', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Horvat', 'Ito',
+    'Jensen', 'Kowalski', 'Lopez', 'Mensah', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Silva',
+    'Tanaka', 'Ueda', 'Varga', 'Wilson', 'Yilmaz', 'Zhang',
+)
+
+# (schedule, share of employees, earliest and latest clock-in hour)
+SCHEDULES = (
+    ('day', 0.70, (6, 9)),
+    ('evening', 0.15, (14, 16)),
+    ('night', 0.15, (21, 23)),
+)
+
+# Per-shift odds of the exceptional cases
+ABSENCE_RATE = 0.05
+MISSED_CLOCK_OUT_RATE = 0.015
+CORRECTION_RATE = 0.01
+DUAL_SHIFT_RATE = 0.03
+# Share of active employees whose last shift is still open
+OPEN_SHIFT_RATE = 0.02
+# Employee PINs are 4 digits (PinForm) and 0000 is the manager's, so each
+# employee gets a distinct PIN only up to this many employees
+MAX_EMPLOYEES = 9999
+
+DUAL_SHIFT_REASONS = ('Covering a colleague', 'Shift handover', 'Training a new hire',
+                      'Inventory count')
+
+ATTENDANCE_COLUMNS = ('employee_id', 'clock_in', 'clock_out', 'work_duration_minutes',
+                      'ip_address', 'adjusted_by', 'adjustment_note')
+
+# Child tables first, so the deletes satisfy the foreign keys
+_CLEARED_MODELS = (PayrollSnapshot, ArchivedPeriod, ClosedPeriod, ReportRun,
+                   Notification, AttendanceDaily, Attendance, Employee)
+
+
+def clear_data():
+    """Delete all employees, shifts and payroll history."""
+    if db.engine.dialect.name == 'postgresql':
+        tables = ', '.join(model.__tablename__ for model in _CLEARED_MODELS)
+        db.session.execute(text(f'TRUNCATE TABLE {tables} RESTART IDENTITY'))
+    else:
+        for model in _CLEARED_MODELS:
+            db.session.execute(delete(model))
+    db.session.commit()
+
+
+def employee_profile(number, seed, start, until):
+    """Deterministic attributes and schedule of synthetic employee number.
+
+    Returns:
+        tuple: (employee row dict, schedule dict, rng positioned for the shifts)
+    """
+    rng = random.Random(f'{seed}:{number}')
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+    days = (until - start).days
+    hired = start if rng.random() < 0.75 else start + timedelta(days=rng.randrange(max(1, days)))
+    left = None
+    if rng.random() < 0.08:
+        left = hired + timedelta(days=rng.randrange(max(1, (until - hired).days)))
+
+    kind = rng.choices([s[0] for s in SCHEDULES], weights=[s[1] for s in SCHEDULES])[0]
+    earliest, latest = next(s[2] for s in SCHEDULES if s[0] == kind)
+    if rng.random() < 0.2:  # part-time
+        weekdays = set(rng.sample(range(7), 3))
+    elif kind == 'day':
+        weekdays = {0, 1, 2, 3, 4}
+    else:
+        weekdays = set(rng.sample(range(7), 5))
+
+    row = {
+        'name': f'{first} {last}',
+        'email': f'{first}.{last}.{number}@example.com'.lower(),
+        'role': 'employee',
+        'hourly_rate': round(rng.uniform(15, 45) * 4) / 4,
+        'is_active': left is None,
+        'created_at': datetime.combine(hired, dt_time()),
+    }
+    schedule = {
+        'first_day': hired,
+        'last_day': left or until,
+        'weekdays': weekdays,
+        'start_minute': rng.randint(earliest * 60, latest * 60),
+        'hours': rng.choice((6, 8, 8, 8, 10)),
+        'kiosk': f'10.0.{rng.randrange(1, 5)}.{rng.randrange(10, 20)}',
+    }
+    return row, schedule, rng
+
+
+def generate_shifts(employee_id, schedule, rng, manager_id):
+    """Yield attendance rows (ATTENDANCE_COLUMNS order) for one employee.
+
+    Shifts run from the employee's hire date up to, not including, their
+    last day. Night shifts end the next morning.
+    """
+    day = schedule['first_day']
+    last_day = schedule['last_day']
+    planned = schedule['hours'] * 60
+    while day < last_day:
+        if day.weekday() not in schedule['weekdays'] or rng.random() < ABSENCE_RATE:
+            day += timedelta(days=1)
+            continue
+
+        clock_in = (datetime.combine(day, dt_time())
+                    + timedelta(minutes=schedule['start_minute'] + round(rng.gauss(0, 10)),
+                                seconds=rng.randrange(60)))
+        minutes = max(60, round(rng.gauss(planned + 10, 25)))
+        clock_out = clock_in + timedelta(minutes=minutes, seconds=rng.randrange(60))
+        adjusted_by = note = None
+
+        roll = rng.random()
+        if roll < MISSED_CLOCK_OUT_RATE:
+            # Closed by the manager at the scheduled end
+            clock_out = clock_in + timedelta(minutes=planned)
+            adjusted_by, note = manager_id, 'Missed clock-out; set to scheduled end'
+        elif roll < MISSED_CLOCK_OUT_RATE + CORRECTION_RATE:
+            clock_in -= timedelta(minutes=rng.randint(5, 45))
+            adjusted_by, note = manager_id, 'Forgot to clock in; corrected by manager'
+        elif roll < MISSED_CLOCK_OUT_RATE + CORRECTION_RATE + DUAL_SHIFT_RATE:
+            adjusted_by = manager_id
+            note = f'Manager approved dual shift: {rng.choice(DUAL_SHIFT_REASONS)}'
+
+        yield (employee_id, clock_in, clock_out, Attendance.minutes_between(clock_in, clock_out),
+               schedule['kiosk'], adjusted_by, note)
+        day += timedelta(days=1)
+
+
+def _open_shift(employee_id, schedule, rng, manager_id, until):
+    """A shift clocked in a few hours before until and not yet clocked out.
+
+    Approved, like a dual shift, so it does not block other clock-ins.
+    """
+    clock_in = datetime.combine(until, dt_time()) - timedelta(minutes=rng.randint(30, 300))
+    return (employee_id, clock_in, None, None, schedule['kiosk'], manager_id,
+            f'Manager approved dual shift: {rng.choice(DUAL_SHIFT_REASONS)}')
+
+
+def _write_shifts(rows):
+    """Insert a batch of attendance rows and commit."""
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # csv writes None as an empty unquoted field, which COPY reads as NULL
+            writer.writerow(row)
+        buffer.seek(0)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY attendance ({", ".join(ATTENDANCE_COLUMNS)}) '
+                               f'FROM STDIN WITH (FORMAT csv)', buffer)
+    else:
+        connection.execute(insert(Attendance), [dict(zip(ATTENDANCE_COLUMNS, row)) for row in rows])
+    db.session.commit()
+
+
+def _pin_hashes(count, rounds):
+    """bcrypt hashes of the PINs 0001..count, hashed in parallel."""
+    pins = [f'{n:04d}' for n in range(1, count + 1)]
+
+    def hash_pin(pin):
+        return pin, _bcrypt.hashpw(pin.encode('utf-8'), _bcrypt.gensalt(rounds)).decode('utf-8')
+
+    with ThreadPoolExecutor() as pool:
+        return dict(pool.map(hash_pin, pins))
+
+
+def seed_bulk(app, employees, years, seed=42, until=None, batch_size=50_000, pin_rounds=4):
+    """Replace all data with a synthetic dataset.
+
+    Args:
+        until: first day without shifts (default: today, UTC).
+        pin_rounds: bcrypt cost of the employee PIN hashes.
+
+    Returns:
+        dict: employees and shifts written.
+
+    Raises:
+        ValueError: if employees is more than MAX_EMPLOYEES.
+    """
+    if employees > MAX_EMPLOYEES:
+        raise ValueError(f'At most {MAX_EMPLOYEES} employees: every employee needs a distinct 4-digit PIN.')
+    until = until or datetime.now(timezone.utc).date()
+    start = until - relativedelta(years=years)
+    clear_data()
+
+    if is_partitioned():
+        connection = db.session.connection()
+        year, month = start.year, start.month
+        while (year, month) <= (until.year, until.month):
+            create_month_partition(connection, year, month)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        db.session.commit()
+
+    manager = Employee(name='Admin Manager', email=app.config.get('MANAGER_EMAIL', 'manager@workclock.com'),
+                       role='manager', hourly_rate=0, is_active=True,
+                       created_at=datetime.combine(start, dt_time()))
+    manager.set_password('manager123')
+    manager.set_pin('0000')
+    db.session.add(manager)
+    db.session.commit()
+    manager_id = manager.id
+
+    # Employee n gets PIN n, zero-padded to 4 digits
+    hashes = _pin_hashes(employees, pin_rounds)
+    profiles = []
+    employee_rows = []
+    for number in range(1, employees + 1):
+        row, schedule, rng = employee_profile(number, seed, start, until)
+        pin = f'{number:04d}'
+        row.update(pin_hash=hashes[pin], pin_lookup=Employee.pin_digest(pin))
+        employee_rows.append(row)
+        profiles.append((schedule, rng))
+    for i in range(0, len(employee_rows), batch_size):
+        db.session.execute(insert(Employee), employee_rows[i:i + batch_size])
+    db.session.commit()
+    employee_ids = db.session.scalars(
+        select(Employee.id).where(Employee.role == 'employee').order_by(Employee.id)).all()
+
+    shifts = 0
+    batch = []
+    for employee_id, (schedule, rng) in zip(employee_ids, profiles):
+        rows = list(generate_shifts(employee_id, schedule, rng, manager_id))
+        if schedule['last_day'] == until and rng.random() < OPEN_SHIFT_RATE:
+            open_shift = _open_shift(employee_id, schedule, rng, manager_id, until)
+            if not rows or rows[-1][2] < open_shift[1]:
+                rows.append(open_shift)
+        batch.extend(rows)
+        while len(batch) >= batch_size:
+            _write_shifts(batch[:batch_size])
+            shifts += batch_size
+            del batch[:batch_size]
+            logger.info(f'Wrote {shifts:,} shifts')
+    if batch:
+        _write_shifts(batch)
+        shifts += len(batch)
+
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('ANALYZE employees, attendance'))
+        db.session.commit()
+    rebuild_rollups(app)
+    bump_data_version()
+    return {'employees': len(employee_ids), 'shifts': shifts, 'start': start, 'until': until}
+
+
+def register_seed_bulk_command(app):
+    """Register the bulk seed CLI command."""
+
+    @app.cli.command('seed-bulk')
+    @click.option('--employees', type=click.IntRange(1, MAX_EMPLOYEES), default=1000, show_default=True,
+                  help='Employees to create (each gets a distinct 4-digit PIN)')
+    @click.option('--years', type=int, default=2, show_default=True,
+                  help='Years of shifts before --until')
+    @click.option('--seed', type=int, default=42, show_default=True,
+                  help='Random seed; the same options rebuild the same shifts')
+    @click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='First day without shifts (default: today, UTC)')
+    @click.option('--batch-size', type=int, default=50_000, show_default=True,
+                  help='Rows per insert transaction')
+    @click.option('--pin-rounds', type=click.IntRange(4, 31), default=4, show_default=True,
+                  help='bcrypt cost of the employee PINs (use the production cost to benchmark clock-ins)')
+    @click.confirmation_option(prompt='This deletes all employees, attendance and payroll data. Continue?')
+    def seed_bulk_cmd(employees, years, seed, until, batch_size, pin_rounds):
+        """Replace all data with a large synthetic dataset for benchmarking."""
+        click.echo(f'Generating {employees:,} employees and {years} year(s) of shifts (seed {seed})...')
+        started = time.perf_counter()
+        result = seed_bulk(app, employees, years, seed=seed, until=until.date() if until else None,
+                           batch_size=batch_size, pin_rounds=pin_rounds)
+        elapsed = time.perf_counter() - started
+        click.echo(f'{result["employees"]:,} employees, {result["shifts"]:,} shifts '
+                   f'({result["start"]} to {result["until"]}) in {elapsed:.1f}s '
+                   f'({result["shifts"] / max(elapsed, 1e-9):,.0f} shifts/s)')
+        click.echo(f'Manager login: {app.config.get("MANAGER_EMAIL", "manager@workclock.com")} / manager123; '
+                   f'employee PINs are 0001 to {result["employees"]:04d}')
@@ -0,0 +1,397 @@
+"""Cold archive of old shifts in compressed columnar files.
+
+`flask archive-attendance` moves the shifts of closed payroll months
+older than ARCHIVE_AFTER_MONTHS out of the attendance table into one file
+per month under ARCHIVE_DIR, recorded in archived_periods. Payroll
+figures do not change: closed months come from payroll_snapshots and the
+daily rollups are kept.
+
+Two file formats:
+  * parquet (needs pyarrow): zstd-compressed, sorted by employee so a
+    filtered read skips the other row groups; read memory-mapped.
+  * csv.gz: every employee's rows are a separate gzip member of one file
+    (concatenated members are still a valid .gz) and a JSON index holds
+    each member's byte range, so one employee's shifts are read by
+    decompressing just their slice of the memory-mapped file.
+
+The month log, timesheet export and Excel detail sheets read archived
+months through read_month(), which returns rows in ARCHIVE_COLUMNS order.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import mmap
+import os
+from calendar import monthrange
+from datetime import date, datetime, timezone
+
+import click
+from flask import current_app, g
+from sqlalchemy import case, delete, func, insert, select, text, tuple_
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.payroll_snapshot import ArchivedPeriod, ClosedPeriod
+from app.services.partition_service import create_month_partition, is_partitioned, partition_name
+from app.services.read_models import shift_select
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional; archives fall back to csv.gz
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('parquet', 'csv.gz')
+INDEX_SUFFIX = '.idx.json'
+
+# Column order of archive rows; the first nine are read_models.ShiftRow
+ARCHIVE_COLUMNS = ('id', 'employee_id', 'employee_name', 'clock_in', 'clock_out',
+                   'work_duration_minutes', 'adjusted_by', 'adjuster_name', 'adjustment_note',
+                   'ip_address', 'gps_lat', 'gps_lng')
+_INT_COLUMNS = {'id', 'employee_id', 'work_duration_minutes', 'adjusted_by'}
+_FLOAT_COLUMNS = {'gps_lat', 'gps_lng'}
+_DATETIME_COLUMNS = {'clock_in', 'clock_out'}
+_MINUTES = ARCHIVE_COLUMNS.index('work_duration_minutes')
+
+# Rows fetched per cursor batch (and written per Parquet row group)
+ARCHIVE_BATCH_SIZE = 10000
+
+
+def default_format():
+    return current_app.config.get('ARCHIVE_FORMAT') or ('parquet' if pq is not None else 'csv.gz')
+
+
+def _check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f'Archive format must be one of: {", ".join(FORMATS)}.')
+    if fmt == 'parquet' and pq is None:
+        raise ValueError('The parquet archive format needs pyarrow (pip install pyarrow).')
+
+
+def _full_path(relative):
+    return os.path.join(current_app.config['ARCHIVE_DIR'], relative)
+
+
+# Parquet
+
+def _parquet_schema():
+    return pa.schema([
+        ('id', pa.int64()), ('employee_id', pa.int64()), ('employee_name', pa.string()),
+        ('clock_in', pa.timestamp('us')), ('clock_out', pa.timestamp('us')),
+        ('work_duration_minutes', pa.int64()), ('adjusted_by', pa.int64()),
+        ('adjuster_name', pa.string()), ('adjustment_note', pa.string()),
+        ('ip_address', pa.string()), ('gps_lat', pa.float64()), ('gps_lng', pa.float64()),
+    ])
+
+
+def _write_parquet(path, batches):
+    schema = _parquet_schema()
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=f.type) for values, f in zip(columns, schema)], schema=schema))
+
+
+def _read_parquet(path, employee_id):
+    filters = [('employee_id', '=', employee_id)] if employee_id is not None else None
+    table = pq.read_table(path, columns=list(ARCHIVE_COLUMNS), filters=filters, memory_map=True)
+    return list(zip(*(table.column(name).to_pylist() for name in ARCHIVE_COLUMNS)))
+
+
+# Compressed CSV + index
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _parse_csv_row(record):
+    """Inverse of _csv_value; empty strings read back as None."""
+    row = []
+    for name, value in zip(ARCHIVE_COLUMNS, record):
+        if value == '':
+            value = None
+        elif name in _INT_COLUMNS:
+            value = int(value)
+        elif name in _FLOAT_COLUMNS:
+            value = float(value)
+        elif name in _DATETIME_COLUMNS:
+            value = datetime.fromisoformat(value)
+        row.append(value)
+    return tuple(row)
+
+
+def _write_csv(path, batches):
+    """Write one gzip member per employee; returns the index of member byte ranges."""
+    employees = {}
+    offset = 0
+    current, buf, writer, count = None, None, None, 0
+
+    def flush():
+        nonlocal offset
+        member = gzip.compress(buf.getvalue().encode('utf-8'), mtime=0)
+        f.write(member)
+        employees[str(current)] = [offset, len(member), count]
+        offset += len(member)
+
+    with open(path, 'wb') as f:
+        for batch in batches:
+            for row in batch:
+                if row[1] != current:
+                    if current is not None:
+                        flush()
+                    current, buf, count = row[1], io.StringIO(newline=''), 0
+                    writer = csv.writer(buf)
+                writer.writerow([_csv_value(v) for v in row])
+                count += 1
+        if current is not None:
+            flush()
+    return {'columns': list(ARCHIVE_COLUMNS), 'employees': employees}
+
+
+def _read_csv(path, employee_id):
+    with open(path + INDEX_SUFFIX) as f:
+        members = json.load(f)['employees']
+    if employee_id is None:
+        spans = list(members.values())
+    else:
+        spans = [members[str(employee_id)]] if str(employee_id) in members else []
+    if not spans:
+        return []
+
+    rows = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset, length, _ in spans:
+            data = gzip.decompress(mapped[offset:offset + length]).decode('utf-8')
+            rows.extend(_parse_csv_row(r) for r in csv.reader(io.StringIO(data, newline='')))
+    return rows
+
+
+def _read_file(fmt, path, employee_id=None):
+    if fmt == 'parquet':
+        _check_format(fmt)
+        return _read_parquet(path, employee_id)
+    return _read_csv(path, employee_id)
+
+
+def _remove_files(path):
+    for name in (path, path + '.tmp', path + INDEX_SUFFIX):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+# Readers
+
+def archived_period(year, month):
+    """The month's ArchivedPeriod, or None; memoised for the request."""
+    memo = g.setdefault('archived_periods', {})
+    if (year, month) not in memo:
+        memo[(year, month)] = db.session.get(ArchivedPeriod, (year, month))
+    return memo[(year, month)]
+
+
+def archived_periods_between(start_day, end_day):
+    """ArchivedPeriods of the months overlapping two dates, oldest first."""
+    return (ArchivedPeriod.query
+            .filter(tuple_(ArchivedPeriod.year, ArchivedPeriod.month).between(
+                (start_day.year, start_day.month), (end_day.year, end_day.month)))
+            .order_by(ArchivedPeriod.year, ArchivedPeriod.month)
+            .all())
+
+
+def archived_day_ranges():
+    """(first day, last day) of every archived month."""
+    return [(date(y, m, 1), date(y, m, monthrange(y, m)[1]))
+            for y, m in db.session.query(ArchivedPeriod.year, ArchivedPeriod.month)]
+
+
+def read_month(period, employee_id=None):
+    """An archived month's rows (ARCHIVE_COLUMNS tuples), by employee then clock-in."""
+    return _read_file(period.format, _full_path(period.path), employee_id)
+
+
+# Archive / restore
+
+def _month_totals(in_month):
+    """(rows, worked minutes, open shifts) of the month's shifts in attendance."""
+    return db.session.execute(select(
+        func.count(Attendance.id),
+        func.coalesce(func.sum(Attendance.work_duration_minutes), 0),
+        func.coalesce(func.sum(case((Attendance.clock_out.is_(None), 1), else_=0)), 0),
+    ).where(in_month)).one()
+
+
+def _verify(fmt, path, row_count, total_minutes):
+    rows = _read_file(fmt, path)
+    minutes = sum(r[_MINUTES] or 0 for r in rows)
+    if (len(rows), minutes) != (row_count, total_minutes):
+        raise ValueError(f'Archive {path} holds {len(rows)} rows / {minutes} min, '
+                         f'expected {row_count} / {total_minutes}.')
+
+
+def archive_period(year, month, fmt=None):
+    """Move a closed month's shifts from attendance into an archive file.
+
+    The file is written and read back before anything is deleted; the
+    delete (or, on a partitioned table, dropping the month's partition)
+    commits together with the archived_periods row.
+
+    Returns:
+        ArchivedPeriod
+
+    Raises:
+        ValueError: if the month is not closed, is already archived, has
+        open shifts or changed while it was being archived, or fmt is
+        unavailable.
+    """
+    from app.services.payroll_service import month_shifts
+
+    fmt = fmt or default_format()
+    _check_format(fmt)
+    label = f'{year}-{month:02d}'
+    if db.session.get(ClosedPeriod, (year, month)) is None:
+        raise ValueError(f'{label} is not closed.')
+    if db.session.get(ArchivedPeriod, (year, month)) is not None:
+        raise ValueError(f'{label} is already archived.')
+
+    in_month = month_shifts(year, month)
+    row_count, total_minutes, open_shifts = _month_totals(in_month)
+    if open_shifts:
+        raise ValueError(f'{label} has {open_shifts} open shift(s); clock them out first.')
+
+    relative = f'attendance-{label}.{fmt}'
+    path = _full_path(relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    stmt = (shift_select()
+            .add_columns(Attendance.ip_address, Attendance.gps_lat, Attendance.gps_lng)
+            .where(in_month)
+            .order_by(Attendance.employee_id, Attendance.clock_in, Attendance.id)
+            .execution_options(yield_per=ARCHIVE_BATCH_SIZE))
+    batches = ([tuple(row) for row in part] for part in db.session.execute(stmt).partitions())
+
+    try:
+        if fmt == 'parquet':
+            _write_parquet(path + '.tmp', batches)
+        else:
+            index = _write_csv(path + '.tmp', batches)
+            with open(path + INDEX_SUFFIX, 'w') as f:
+                json.dump(index, f, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+        _verify(fmt, path, row_count, total_minutes)
+
+        # Recount inside the deleting transaction: a shift edited since the
+        # file was written would otherwise be lost
+        if _month_totals(in_month)[:2] != (row_count, total_minutes):
+            raise ValueError(f'{label} changed while it was being archived; try again.')
+        conn = db.session.connection()
+        if is_partitioned(conn) and conn.execute(
+                text('SELECT to_regclass(:name)'), {'name': partition_name(year, month)}).scalar():
+            conn.execute(text(f'DROP TABLE {partition_name(year, month)}'))
+        else:
+            db.session.execute(delete(Attendance).where(in_month))
+        period = ArchivedPeriod(year=year, month=month, format=fmt, path=relative,
+                                row_count=row_count, total_minutes=total_minutes)
+        db.session.add(period)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        _remove_files(path)
+        raise
+
+    g.get('archived_periods', {}).pop((year, month), None)
+    logger.info(f'Archived {row_count} shifts of {label} to {path}')
+    return period
+
+
+def restore_period(year, month):
+    """Move an archived month's shifts back into attendance and delete its file.
+
+    Returns:
+        int: number of shifts restored.
+
+    Raises:
+        ValueError: if the month is not archived or its file does not match
+        the recorded totals.
+    """
+    period = db.session.get(ArchivedPeriod, (year, month))
+    if period is None:
+        raise ValueError(f'{year}-{month:02d} is not archived.')
+    path = _full_path(period.path)
+    _verify(period.format, path, period.row_count, period.total_minutes)
+    rows = read_month(period)
+
+    conn = db.session.connection()
+    if is_partitioned(conn):
+        create_month_partition(conn, year, month)
+    columns = [(i, name) for i, name in enumerate(ARCHIVE_COLUMNS)
+               if name not in ('employee_name', 'adjuster_name')]
+    for start in range(0, len(rows), ARCHIVE_BATCH_SIZE):
+        db.session.execute(insert(Attendance), [
+            {name: row[i] for i, name in columns} for row in rows[start:start + ARCHIVE_BATCH_SIZE]])
+    db.session.delete(period)
+    db.session.commit()
+
+    _remove_files(path)
+    g.get('archived_periods', {}).pop((year, month), None)
+    logger.info(f'Restored {len(rows)} shifts of {year}-{month:02d} from {path}')
+    return len(rows)
+
+
+def archivable_months(older_than_months):
+    """Closed, not yet archived months that ended more than older_than_months ago."""
+    today = datetime.now(timezone.utc)
+    index = today.year * 12 + today.month - 1 - older_than_months
+    cutoff = (index // 12, index % 12 + 1)
+    archived = db.session.query(ArchivedPeriod.year, ArchivedPeriod.month)
+    return [(p.year, p.month) for p in ClosedPeriod.query
+            .filter(tuple_(ClosedPeriod.year, ClosedPeriod.month) < cutoff,
+                    tuple_(ClosedPeriod.year, ClosedPeriod.month).not_in(archived))
+            .order_by(ClosedPeriod.year, ClosedPeriod.month)]
+
+
+def register_archive_commands(app):
+    """Register the Flask CLI commands for archiving and restoring old shifts."""
+
+    @app.cli.command('archive-attendance')
+    @click.option('--older-than', 'older_than', type=int, default=None,
+                  help='Archive closed months that ended more than this many months ago '
+                       '(default: ARCHIVE_AFTER_MONTHS)')
+    @click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+                  help='File format (default: parquet if pyarrow is installed, else csv.gz)')
+    @click.option('--dry-run', is_flag=True, help='Only list the months that would be archived')
+    def archive_attendance_cmd(older_than, fmt, dry_run):
+        """Move the shifts of old closed months into archive files."""
+        if older_than is None:
+            older_than = app.config.get('ARCHIVE_AFTER_MONTHS', 18)
+        months = archivable_months(older_than)
+        if not months:
+            click.echo('Nothing to archive.')
+            return
+        for year, month in months:
+            if dry_run:
+                click.echo(f'Would archive {year}-{month:02d}')
+                continue
+            try:
+                period = archive_period(year, month, fmt)
+            except ValueError as e:
+                click.echo(f'Skipped {year}-{month:02d}: {e}')
+                continue
+            click.echo(f'Archived {year}-{month:02d}: {period.row_count} shifts -> {period.path}')
+
+    @app.cli.command('restore-attendance')
+    @click.argument('year', type=int)
+    @click.argument('month', type=click.IntRange(1, 12))
+    def restore_attendance_cmd(year, month):
+        """Move an archived month's shifts back into the attendance table."""
+        try:
+            count = restore_period(year, month)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'Restored {year}-{month:02d}: {count} shifts.')
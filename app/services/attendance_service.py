@@ -1,9 +1,18 @@
 import logging
 from datetime import datetime, timezone
 
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
 from app.extensions import db
 from app.models.employee import Employee
 from app.models.attendance import Attendance
+from app.services.cache_service import bump_data_version
+from app.services.dispatch_service import after_commit
+from app.services.email_service import notify_clock_event
+from app.services.live_service import publish_attendance_event
+from app.services.rollup_service import refresh_days_for
 
 logger = logging.getLogger(__name__)
 
@@ -11,8 +20,16 @@ logger = logging.getLogger(__name__)
 def process_pin(raw_pin, ip_address=None, gps_lat=None, gps_lng=None):
     """Process a PIN entry — either clock in or clock out.
 
+    After the PIN lookup, a single query loads the employee's open shift
+    together with any unapproved open shift of another employee. The toggle
+    itself is one conditional write: the clock-out UPDATE only matches a
+    still-open row, and the clock-in INSERT happens under a lock on the
+    employee row, so two taps or two kiosks can never open two shifts for
+    the same employee.
+
     Returns:
-        tuple: (employee, action, record) where action is 'clock_in' or 'clock_out'
+        tuple: (employee, action, record) where action is 'clock_in',
+        'clock_out' or 'approval_required'
 
     Raises:
         ValueError: If PIN is invalid or employee not found.
@@ -21,30 +38,17 @@ def process_pin(raw_pin, ip_address=None, gps_lat=None, gps_lng=None):
     if not employee:
         raise ValueError('Invalid PIN. Please try again.')
 
-    # Get the latest attendance record for this employee
-    latest = (Attendance.query
-              .filter_by(employee_id=employee.id)
-              .order_by(Attendance.clock_in.desc())
-              .first())
-
-    # Check if any other employee is clocked in and NOT approved for overlap
-    active_record = (Attendance.query
-                    .filter(Attendance.clock_out.is_(None), 
-                            Attendance.employee_id != employee.id,
-                            Attendance.adjusted_by.is_(None))
-                    .first())
+    own_shift, active_record = _load_clock_state(employee.id)
 
     if active_record:
-        # Approval required
+        # Another employee is clocked in and NOT approved for overlap
         return employee, 'approval_required', active_record
 
-    if latest and latest.is_active:
-        # Clock out
-        record = clock_out(latest)
+    if own_shift:
+        record = clock_out(own_shift)
         action = 'clock_out'
         logger.info(f'Employee {employee.name} clocked out. Duration: {record.formatted_duration}')
     else:
-        # Clock in
         record = clock_in(employee, ip_address, gps_lat, gps_lng)
         action = 'clock_in'
         logger.info(f'Employee {employee.name} clocked in at {record.clock_in}')
@@ -52,49 +56,127 @@ def process_pin(raw_pin, ip_address=None, gps_lat=None, gps_lng=None):
     return employee, action, record
 
 
+def _load_clock_state(employee_id):
+    """Fetch the employee's open shift and a blocking open shift in one query.
+
+    Returns:
+        tuple: (own_open_shift or None, other_unapproved_open_shift or None)
+    """
+    rows = (Attendance.query
+            .options(joinedload(Attendance.employee))  # shown on the approval screen
+            .filter(Attendance.clock_out.is_(None),
+                    or_(Attendance.employee_id == employee_id,
+                        Attendance.adjusted_by.is_(None)))
+            .order_by((Attendance.employee_id == employee_id).desc())
+            .limit(2)
+            .all())
+
+    own_shift = next((r for r in rows if r.employee_id == employee_id), None)
+    active_record = next((r for r in rows if r.employee_id != employee_id), None)
+    return own_shift, active_record
+
+
+def _lock_employee(employee_id):
+    """Lock the employee row (FOR NO KEY UPDATE) until the transaction ends.
+
+    Taken before any write that can leave the employee with an open shift.
+    On PostgreSQL the open-shift unique index exists only per monthly
+    partition, so it cannot see two open shifts in different months (a
+    clock-in racing across midnight at a month boundary); serialising these
+    writes per employee keeps the one-open-shift guarantee. It is the same
+    lock rollup_service.refresh_day takes.
+    """
+    db.session.execute(select(Employee.id).where(Employee.id == employee_id)
+                       .with_for_update(key_share=True))
+
+
 def clock_in(employee, ip_address=None, gps_lat=None, gps_lng=None):
-    """Create a new clock-in record."""
+    """Create a new clock-in record.
+
+    The employee row is locked first and the open shift looked up again,
+    so if a concurrent request already opened a shift for this employee,
+    that shift is returned instead, without a second notification. The
+    unique open-shift index stays as a backstop (on SQLite, which has no
+    row locks, it is what rejects the second insert).
+    """
+    _lock_employee(employee.id)
+    existing = get_active_shift(employee.id)
+    if existing is not None:
+        db.session.commit()
+        logger.info(f'Employee {employee.name} already clocked in by a concurrent request')
+        return existing
+
+    now = datetime.now(timezone.utc)
     record = Attendance(
         employee_id=employee.id,
-        clock_in=datetime.now(timezone.utc),
+        clock_in=now,
         ip_address=ip_address,
         gps_lat=gps_lat,
         gps_lng=gps_lng,
     )
     db.session.add(record)
-    db.session.commit()
-
-    # Send notification asynchronously
     try:
-        from app.services.email_service import send_clock_notification
-        send_clock_notification(employee, 'clock_in', record)
-    except Exception as e:
-        logger.error(f'Failed to send clock-in notification: {e}')
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        existing = get_active_shift(employee.id)
+        if existing is None:
+            raise
+        logger.info(f'Employee {employee.name} already clocked in by a concurrent request')
+        return existing
+
+    # Side effects run only once the shift is committed; the manager
+    # notification goes to the background dispatcher
+    after_commit(bump_data_version, now, employee_id=employee.id, background=False)
+    after_commit(notify_clock_event, employee.id, 'clock_in', record.id)
+    after_commit(publish_attendance_event, 'clock_in', employee.id)
+    db.session.commit()
 
     return record
 
 
 def clock_out(record):
-    """Set clock-out on an existing attendance record."""
-    record.clock_out = datetime.now(timezone.utc)
-    # Flush to DB and refresh so clock_in and clock_out are in the same
-    # timezone representation (both naive, as returned by PostgreSQL).
-    db.session.flush()
-    db.session.refresh(record)
-    record.calculate_duration()
-    db.session.commit()
+    """Set clock-out on an existing attendance record.
 
-    # Send notification asynchronously
-    try:
-        from app.services.email_service import send_clock_notification
-        employee = record.employee
-        send_clock_notification(employee, 'clock_out', record)
-    except Exception as e:
-        logger.error(f'Failed to send clock-out notification: {e}')
+    The UPDATE only matches while the shift is still open, so when two
+    requests race to close it the loser simply reloads the closed row.
+    Matching on clock_in as well lets PostgreSQL prune the UPDATE to the
+    shift's monthly partition.
+    """
+    now = datetime.now(timezone.utc)
+    shift_start = record.clock_in
+    result = db.session.execute(
+        update(Attendance)
+        .where(Attendance.id == record.id,
+               Attendance.clock_in == shift_start.replace(tzinfo=None),
+               Attendance.clock_out.is_(None))
+        .values(clock_out=now,
+                work_duration_minutes=Attendance.minutes_between(shift_start, now))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.commit()
+        logger.info(f'Attendance record {record.id} was already clocked out')
+        return record
+
+    refresh_days_for(record)
+    after_commit(bump_data_version, shift_start, employee_id=record.employee_id, background=False)
+    after_commit(notify_clock_event, record.employee_id, 'clock_out', record.id)
+    after_commit(publish_attendance_event, 'clock_out', record.employee_id)
+    db.session.commit()
 
     return record
 
 
+def approve_open_shift(record, approver_id, note):
+    """Mark an open shift as approved to overlap with another employee's."""
+    record.adjusted_by = approver_id
+    record.adjustment_note = note
+    after_commit(bump_data_version, record.clock_in, employee_id=record.employee_id, background=False)
+    after_commit(publish_attendance_event, 'approval', record.employee_id)
+    db.session.commit()
+
+
 def get_active_shift(employee_id):
     """Get the active (un-clocked-out) shift for an employee, if any."""
     return (Attendance.query
@@ -112,11 +194,26 @@ def get_active_employees_count():
 
 
 def adjust_record(record_id, new_clock_in, new_clock_out, manager_id, note):
-    """Manually adjust an attendance record."""
-    record = db.session.get(Attendance, record_id)
+    """Manually adjust an attendance record.
+
+    Raises:
+        ValueError: if the record does not exist, or leaving it open would
+        give the employee a second open shift.
+    """
+    # Shift row first, then the employee: the same lock order as clock_out
+    record = db.session.get(Attendance, record_id, with_for_update=True)
     if not record:
         raise ValueError('Attendance record not found.')
-
+    if new_clock_out is None:
+        _lock_employee(record.employee_id)
+        if db.session.scalar(select(Attendance.id).where(
+                Attendance.employee_id == record.employee_id,
+                Attendance.clock_out.is_(None),
+                Attendance.id != record.id).limit(1)) is not None:
+            db.session.rollback()
+            raise ValueError('The employee already has an open shift.')
+
+    previous_clock_in = record.clock_in
     record.clock_in = new_clock_in
     record.clock_out = new_clock_out
     record.adjusted_by = manager_id
@@ -125,6 +222,11 @@ def adjust_record(record_id, new_clock_in, new_clock_out, manager_id, note):
     db.session.flush()
     db.session.refresh(record)
     record.calculate_duration()
+    db.session.flush()
+    refresh_days_for(record, previous_clock_in.date())
+    after_commit(bump_data_version, previous_clock_in, new_clock_in,
+                 employee_id=record.employee_id, background=False)
+    after_commit(publish_attendance_event, 'adjustment', record.employee_id)
     db.session.commit()
 
     logger.info(f'Attendance record {record_id} adjusted by manager {manager_id}')
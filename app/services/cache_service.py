@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+
+import redis
+from flask import current_app
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_VERSION = 'global'
+
+
+def get_redis():
+    """Shared Redis client, or None when caching is disabled."""
+    if not current_app.config.get('CACHE_ENABLED', True):
+        return None
+    return current_app.extensions.get('redis')
+
+
+def _key(*parts):
+    return current_app.config.get('CACHE_KEY_PREFIX', 'workclock:cache:') + ':'.join(str(p) for p in parts)
+
+
+def _period(year, month):
+    return f'{year}-{month:02d}'
+
+
+def _is_closed(year, month):
+    now = datetime.now(timezone.utc)
+    return (year, month) < (now.year, now.month)
+
+
+def get_data_versions(year, month):
+    """Return (month_version, global_version) for a payroll period."""
+    client = get_redis()
+    if client is None:
+        return 0, 0
+    month_v, global_v = client.mget(_key('version', _period(year, month)),
+                                    _key('version', GLOBAL_VERSION))
+    return int(month_v or 0), int(global_v or 0)
+
+
+def bump_data_version(*moments, employee_id=None):
+    """Invalidate cached results for the months containing the given datetimes.
+
+    Call after the write has been committed. employee_id also invalidates
+    that employee's own cached views. With no arguments, bumps the global
+    version, invalidating every month (e.g. after a pay rate change).
+    """
+    client = get_redis()
+    if client is None:
+        return
+    keys = {_key('version', _period(m.year, m.month)) for m in moments if m is not None}
+    if employee_id is not None:
+        keys.add(_key('version', 'employee', employee_id))
+    keys = keys or {_key('version', GLOBAL_VERSION)}
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.execute()
+    except redis.RedisError as e:
+        metrics.incr('cache_errors')
+        logger.warning(f'Failed to bump cache versions {sorted(keys)}: {e}')
+
+
+def cached(namespace, year, month, compute):
+    """Return compute() for a payroll period, cached in Redis.
+
+    The key includes the period's data version and the global version, so
+    writes invalidate by bumping a counter instead of deleting keys. Closed
+    months get a long TTL since their data no longer changes. Values must
+    be JSON-serialisable. Redis errors fall back to computing directly.
+    """
+    return cached_range(namespace, _period(year, month), [(year, month)], compute)
+
+
+def cached_range(namespace, label, periods, compute):
+    """Like cached(), for a result that spans several payroll periods.
+
+    Args:
+        label: identifies the query within the namespace (range, filters).
+        periods: every (year, month) the result depends on; a write to any
+            of them (or a global bump) invalidates it.
+    """
+    all_closed = all(_is_closed(y, m) for y, m in periods)
+    return _cached(namespace, label,
+                   [_key('version', _period(y, m)) for y, m in periods],
+                   'CACHE_CLOSED_MONTH_TTL' if all_closed else 'CACHE_OPEN_MONTH_TTL',
+                   compute)
+
+
+def cached_for_employee(namespace, employee_id, label, compute):
+    """Return compute() for one employee's view, cached until their next write.
+
+    Invalidated by bump_data_version(..., employee_id=employee_id) or a
+    global bump; writes by other employees leave it alone.
+    """
+    return _cached(namespace, f'{employee_id}:{label}',
+                   [_key('version', 'employee', employee_id)],
+                   'CACHE_EMPLOYEE_TTL', compute)
+
+
+def _cached(namespace, label, version_keys, ttl_setting, compute):
+    """Cache compute() under label and the current values of version_keys
+    (plus the global version). Redis errors fall back to computing directly."""
+    client = get_redis()
+    if client is None:
+        return compute()
+
+    try:
+        versions = client.mget(version_keys + [_key('version', GLOBAL_VERSION)])
+        tag = '.'.join(str(int(v or 0)) for v in versions)
+        if len(versions) > 2:
+            tag = hashlib.blake2b(tag.encode(), digest_size=8).hexdigest()
+        key = _key(namespace, label, f'v{tag}')
+        raw = client.get(key)
+    except redis.RedisError as e:
+        metrics.incr('cache_errors')
+        logger.warning(f'Cache read failed for {namespace} {label}: {e}')
+        return compute()
+
+    if raw is not None:
+        metrics.incr(f'{namespace}_cache_hit')
+        return json.loads(raw)
+
+    metrics.incr(f'{namespace}_cache_miss')
+    value = compute()
+    try:
+        client.set(key, json.dumps(value), ex=current_app.config[ttl_setting])
+    except redis.RedisError as e:
+        metrics.incr('cache_errors')
+        logger.warning(f'Cache write failed for {key}: {e}')
+    return value
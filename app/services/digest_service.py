@@ -0,0 +1,154 @@
+"""Coalesced clock-event digests for managers.
+
+Clock events are appended to a Redis list as they happen; the scheduler
+flushes the list every NOTIFY_DIGEST_MINUTES and each digest manager
+receives one email listing every clock-in and clock-out of the window.
+Managers who opt in to real-time alerts (Employee.notify_realtime) keep
+getting one email per event instead.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+
+import click
+import redis
+from flask import current_app
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DigestUnavailable(Exception):
+    """Raised when digests are disabled or the buffer cannot be reached."""
+
+
+def _client():
+    client = current_app.extensions.get('redis')
+    if client is None or not current_app.config.get('NOTIFY_DIGEST_ENABLED', True):
+        raise DigestUnavailable('Notification digests are disabled.')
+    return client
+
+
+def _key(name):
+    return current_app.config.get('NOTIFY_DIGEST_KEY_PREFIX', 'workclock:digest:') + name
+
+
+def buffer_clock_event(employee, action, record):
+    """Append a clock event to the digest buffer.
+
+    Raises:
+        DigestUnavailable: so the caller can send the event in real time
+            rather than drop it.
+    """
+    timestamp = record.clock_in if action == 'clock_in' else record.clock_out
+    event = {
+        'employee_id': employee.id,
+        'employee_name': employee.name,
+        'action': action,
+        'time': timestamp.strftime('%Y-%m-%d %H:%M:%S') if timestamp else None,
+        'duration': record.formatted_duration if action == 'clock_out' and record.work_duration_minutes else None,
+    }
+    try:
+        _client().rpush(_key('events'), json.dumps(event))
+    except redis.RedisError as e:
+        raise DigestUnavailable(str(e)) from e
+    metrics.incr('digest_events_buffered')
+
+
+def _claim_events(client):
+    """Take ownership of the buffered events.
+
+    The buffer is renamed to a flushing key so events arriving during the
+    flush go into the next digest. A flushing key left by a crashed flush
+    is sent first.
+    """
+    flushing = _key('flushing')
+    if not client.exists(flushing):
+        try:
+            client.rename(_key('events'), flushing)
+        except redis.ResponseError:
+            return []  # no events buffered
+    return [json.loads(raw) for raw in client.lrange(flushing, 0, -1)]
+
+
+def _render_digest(events, window_end):
+    clock_ins = sum(1 for e in events if e['action'] == 'clock_in')
+    subject = (f'[WorkClock] Attendance digest — {clock_ins} in, '
+               f'{len(events) - clock_ins} out (to {window_end:%H:%M} UTC)')
+
+    lines = []
+    rows = []
+    for e in events:
+        action_text = 'In' if e['action'] == 'clock_in' else 'Out'
+        duration = e['duration'] or ''
+        lines.append(f"  {e['time'] or 'N/A'}  {action_text:<3}  {e['employee_name']}"
+                     + (f'  ({duration})' if duration else ''))
+        rows.append(
+            f'<tr><td style="padding: 6px;">{e["time"] or "N/A"}</td>'
+            f'<td style="padding: 6px; color: {"#059669" if action_text == "In" else "#2563eb"};">{action_text}</td>'
+            f'<td style="padding: 6px;">{e["employee_name"]}</td>'
+            f'<td style="padding: 6px;">{duration}</td></tr>'
+        )
+
+    body = f"""
+WorkClock Attendance Digest
+----------------------------
+
+Clock events up to {window_end:%Y-%m-%d %H:%M} UTC:
+
+""" + '\n'.join(lines) + '\n\n— WorkClock Attendance System'
+
+    html = f"""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+        <h2 style="color: #1f2937;">Attendance digest</h2>
+        <p style="color: #6b7280;">{clock_ins} clock-in(s), {len(events) - clock_ins} clock-out(s) up to {window_end:%Y-%m-%d %H:%M} UTC</p>
+        <table style="width: 100%; border-collapse: collapse;">
+            <tr><th style="padding: 6px; text-align: left;">Time (UTC)</th><th style="padding: 6px; text-align: left;">Action</th>
+                <th style="padding: 6px; text-align: left;">Employee</th><th style="padding: 6px; text-align: left;">Duration</th></tr>
+            {''.join(rows)}
+        </table>
+        <p style="color: #6b7280; font-size: 12px; margin-top: 20px;">— WorkClock Attendance System</p>
+    </div>
+    """
+    return subject, body, html
+
+
+def flush_digests():
+    """Send one digest per digest manager covering all buffered events.
+
+    Returns:
+        int: number of events included.
+    """
+    from app.services.email_service import get_manager_recipients, send_email
+
+    client = _client()
+    events = _claim_events(client)
+    if not events:
+        return 0
+
+    _, digest_emails = get_manager_recipients()
+    if digest_emails:
+        subject, body, html = _render_digest(events, datetime.now(timezone.utc))
+        for email in digest_emails:
+            send_email(subject, [email], body, html=html)
+    else:
+        logger.info('No digest recipients; discarding buffered clock events')
+
+    client.delete(_key('flushing'))
+    metrics.incr('digests_sent', len(digest_emails))
+    logger.info(f'Flushed {len(events)} clock event(s) to {len(digest_emails)} manager(s)')
+    return len(events)
+
+
+def register_digest_command(app):
+    """Register the Flask CLI command for flushing the digest buffer."""
+
+    @app.cli.command('flush-digest')
+    def flush_digest_cmd():
+        """Send the pending clock-event digest to managers now."""
+        try:
+            count = flush_digests()
+        except (DigestUnavailable, redis.RedisError) as e:
+            raise click.ClickException(f'Digest buffer unavailable: {e}')
+        click.echo(f'Sent digest with {count} clock event(s).')
@@ -0,0 +1,170 @@
+"""After-commit side effects and the background dispatcher.
+
+Services register side effects with after_commit() while their
+transaction is open. They only run once the transaction commits (a
+rollback discards them): inline ones right after the COMMIT, the rest
+on a per-process background thread, so a request returns as soon as
+its own data is durable.
+
+The dispatcher thread also batches notification log rows
+(log_notification) into multi-row inserts instead of one commit per row.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import event, insert
+
+from app.extensions import db
+from app.models.notification import Notification
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = 'after_commit'
+_STOP = object()
+
+_lock = threading.Lock()
+_queue = None
+_thread = None
+_pid = None
+
+
+def after_commit(func, *args, background=True, **kwargs):
+    """Run func(*args, **kwargs) after the current transaction commits.
+
+    Args:
+        background: run on the dispatcher thread (default) or inline,
+            immediately after the commit (for cheap work the caller's next
+            read depends on, e.g. cache invalidation).
+    """
+    db.session.info.setdefault(_SESSION_KEY, []).append((func, args, kwargs, background))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _run_after_commit(session):
+    pending = session.info.pop(_SESSION_KEY, None)
+    if not pending:
+        return
+    for func, args, kwargs, background in pending:
+        if background:
+            submit(func, *args, **kwargs)
+            continue
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            metrics.incr('dispatch_errors')
+            logger.error(f'After-commit hook {func.__name__} failed: {e}', exc_info=True)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_SESSION_KEY, None)
+
+
+def _get_queue():
+    """Start the dispatcher lazily, once per process (gunicorn forks workers)."""
+    global _queue, _thread, _pid
+    pid = os.getpid()
+    if _queue is not None and _pid == pid:
+        return _queue
+
+    with _lock:
+        if _queue is None or _pid != pid:
+            app = current_app._get_current_object()
+            _queue = queue.Queue(maxsize=app.config.get('DISPATCH_QUEUE_SIZE', 1000))
+            _thread = threading.Thread(target=_worker, args=(app, _queue),
+                                       name='dispatcher', daemon=True)
+            _thread.start()
+            _pid = pid
+            metrics.register_gauge('dispatch_queue_depth', _queue.qsize)
+    return _queue
+
+
+def _enqueue(task):
+    try:
+        _get_queue().put_nowait(task)
+        return True
+    except queue.Full:
+        metrics.incr('dispatch_inline')
+        return False
+
+
+def submit(func, *args, **kwargs):
+    """Queue a callable for the dispatcher thread.
+
+    When the queue is full the call runs inline instead, so side effects
+    slow the request down rather than getting lost.
+    """
+    if not _enqueue((func, args, kwargs)):
+        logger.warning(f'Dispatcher queue full; running {func.__name__} inline')
+        func(*args, **kwargs)
+
+
+def log_notification(employee_id, type, message):
+    """Record a sent notification; rows are written in batches."""
+    row = {'employee_id': employee_id, 'type': type, 'message': message,
+           'sent_at': datetime.now(timezone.utc)}
+    if not _enqueue((None, (row,), {})):
+        _flush_notifications([row])
+
+
+def _flush_notifications(rows):
+    started = time.perf_counter()
+    try:
+        db.session.execute(insert(Notification), rows)
+        db.session.commit()
+        metrics.incr('notifications_logged', len(rows))
+    except Exception as e:
+        db.session.rollback()
+        metrics.incr('dispatch_errors')
+        logger.error(f'Failed to log {len(rows)} notification(s): {e}')
+    metrics.observe('notification_flush', time.perf_counter() - started)
+
+
+def _worker(app, tasks):
+    """Run queued side effects; flush notification rows whenever the queue
+    drains or a batch fills, so bursts become a single insert."""
+    batch_size = app.config.get('DISPATCH_LOG_BATCH_SIZE', 100)
+    rows = []
+    while True:
+        task = tasks.get()
+        if task is _STOP:
+            if rows:
+                with app.app_context():
+                    _flush_notifications(rows)
+            return
+
+        func, args, kwargs = task
+        with app.app_context():
+            if func is None:
+                rows.append(args[0])  # notification log row
+            else:
+                try:
+                    func(*args, **kwargs)
+                    metrics.incr('dispatch_tasks')
+                except Exception as e:
+                    metrics.incr('dispatch_errors')
+                    logger.error(f'Background task {func.__name__} failed: {e}', exc_info=True)
+
+            if rows and (len(rows) >= batch_size or tasks.empty()):
+                _flush_notifications(rows)
+                rows = []
+
+
+@atexit.register
+def _drain_on_exit(timeout=10):
+    """Let queued side effects finish when a worker shuts down."""
+    if _queue is None or _pid != os.getpid() or not _thread.is_alive():
+        return
+    try:
+        _queue.put(_STOP, timeout=timeout)
+    except queue.Full:
+        return
+    _thread.join(timeout)
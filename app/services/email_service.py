@@ -7,7 +7,7 @@ from flask_mail import Message
 
 from app.extensions import db, mail
 from app.models.employee import Employee
-from app.models.notification import Notification
+from app.services.dispatch_service import log_notification
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +23,20 @@ def _send_async_email(app, msg):
 
 
 def send_email(subject, recipients, body, html=None, attachments=None):
-    """Send an email (non-blocking via background thread)."""
+    """Queue an email for the sender process (mail_worker.py).
+
+    Falls back to sending from a background thread when the queue is
+    disabled or Redis is unreachable, so mail is never dropped outright.
+    """
+    from app.services.mail_queue_service import MailQueueUnavailable, enqueue
+
+    try:
+        enqueue(subject, recipients, body, html=html, attachments=attachments)
+        return
+    except MailQueueUnavailable as e:
+        if current_app.config.get('MAIL_QUEUE_ENABLED', True):
+            logger.warning(f'Mail queue unavailable ({e}); sending directly')
+
     try:
         app = current_app._get_current_object()
         msg = Message(subject=subject, recipients=recipients)
@@ -52,13 +65,43 @@ def get_manager_emails():
     return emails
 
 
+def get_manager_recipients():
+    """Split manager addresses into (real-time, digest) recipients.
+
+    Managers receive clock events in the periodic digest unless they opted
+    in to real-time alerts; the MANAGER_EMAIL fallback gets the digest.
+    """
+    managers = Employee.query.filter_by(role='manager', is_active=True).all()
+    realtime = [m.email for m in managers if m.email and m.notify_realtime]
+    digest = [m.email for m in managers if m.email and not m.notify_realtime]
+    if not managers:
+        fallback = current_app.config.get('MANAGER_EMAIL')
+        if fallback:
+            digest = [fallback]
+    return realtime, digest
+
+
 def send_clock_notification(employee, action, record):
-    """Send clock-in/clock-out notification to managers."""
-    manager_emails = get_manager_emails()
-    if not manager_emails:
+    """Notify managers of a clock-in/clock-out.
+
+    Digest recipients get the event via the buffered digest; real-time
+    recipients (and everyone, if the buffer is unavailable) get an email now.
+    """
+    from app.services.digest_service import DigestUnavailable, buffer_clock_event
+
+    manager_emails, digest_emails = get_manager_recipients()
+    if not manager_emails and not digest_emails:
         logger.warning('No manager emails configured for notifications')
         return
 
+    if digest_emails:
+        try:
+            buffer_clock_event(employee, action, record)
+        except DigestUnavailable as e:
+            if current_app.config.get('NOTIFY_DIGEST_ENABLED', True):
+                logger.warning(f'Digest buffer unavailable ({e}); sending clock event immediately')
+            manager_emails += digest_emails
+
     action_text = 'Clocked In' if action == 'clock_in' else 'Clocked Out'
     timestamp = record.clock_in if action == 'clock_in' else record.clock_out
 
@@ -93,36 +136,47 @@ Time: {timestamp.strftime('%Y-%m-%d %H:%M:%S UTC') if timestamp else 'N/A'}
     </div>
     """
 
-    send_email(subject, manager_emails, body, html=html)
+    if manager_emails:
+        send_email(subject, manager_emails, body, html=html)
 
-    # Log notification
-    try:
-        notification = Notification(
-            employee_id=employee.id,
-            type=action,
-            message=f'{action_text} at {timestamp}',
-        )
-        db.session.add(notification)
-        db.session.commit()
-    except Exception as e:
-        logger.error(f'Failed to log notification: {e}')
+    log_notification(employee.id, action, f'{action_text} at {timestamp}')
+
+
+def notify_clock_event(employee_id, action, record_id):
+    """Dispatcher task: load the committed shift and notify managers."""
+    from app.models.attendance import Attendance
+
+    employee = db.session.get(Employee, employee_id)
+    record = db.session.get(Attendance, record_id)
+    if employee is None or record is None:
+        logger.warning(f'Skipping {action} notification: record {record_id} no longer exists')
+        return
+    send_clock_notification(employee, action, record)
 
 
 def send_monthly_report(year, month):
-    """Generate and email the monthly payroll report to managers."""
-    from app.services.payroll_service import generate_payroll_csv, get_all_employees_monthly_summary
+    """Generate and email the monthly payroll report to managers.
+
+    Returns:
+        int: number of employees in the report, or None if there was no
+        manager to send it to. Runs are recorded in report_runs by
+        app.jobs.monthly_report.
+    """
+    from app.services.payroll_service import generate_payroll_csv, get_payroll_period
 
     manager_emails = get_manager_emails()
     if not manager_emails:
         logger.warning('No manager emails configured for monthly report')
-        return
+        return None
 
-    summaries = get_all_employees_monthly_summary(year, month)
+    # The CSV below reuses the same PayrollPeriod, so the month is aggregated once
+    period = get_payroll_period(year, month)
+    summaries = period.summaries
     csv_data = generate_payroll_csv(year, month)
 
-    total_hours = sum(s['total_hours'] for s in summaries)
-    total_pay = sum(s['total_pay'] for s in summaries)
-    total_overtime = sum(s['overtime_hours'] for s in summaries)
+    total_hours = period.total_hours
+    total_pay = period.total_pay
+    total_overtime = period.overtime_hours
 
     subject = f'[WorkClock] Monthly Payroll Report — {year}-{month:02d}'
 
@@ -149,17 +203,5 @@ Employee Summary:
 
     send_email(subject, manager_emails, body, attachments=attachments)
 
-    # Log notifications
-    try:
-        for s in summaries:
-            notification = Notification(
-                employee_id=s['employee_id'],
-                type='monthly_summary',
-                message=f'Monthly report for {year}-{month:02d}',
-            )
-            db.session.add(notification)
-        db.session.commit()
-    except Exception as e:
-        logger.error(f'Failed to log monthly report notifications: {e}')
-
     logger.info(f'Monthly report sent for {year}-{month:02d} to {manager_emails}')
+    return len(summaries)
@@ -0,0 +1,160 @@
+"""Employee roster reads and background employee deletion.
+
+Deleting an employee only marks them pending deletion (and inactive) in
+the manager's request. Their daily rollups, shifts and notifications are
+then deleted by purge_employee in the scheduler process, which runs
+run_pending_purges every EMPLOYEE_PURGE_INTERVAL_SECONDS, in chunks of
+EMPLOYEE_PURGE_CHUNK rows, each in its own short transaction, and the
+employee row goes last. A purge can run for minutes, so it is never put
+on a web worker's dispatcher; a purge interrupted by a restart is picked
+up by the next run, or by `flask purge-employees`.
+
+Shifts already moved to archive files (archive_service) are not touched.
+"""
+import logging
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.attendance_daily import AttendanceDaily
+from app.models.employee import Employee
+from app.models.notification import Notification
+from app.services.cache_service import bump_data_version
+from app.services.dispatch_service import after_commit
+from app.services.read_models import roster_select
+from app.utils import metrics
+from app.utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, keyset_page
+
+logger = logging.getLogger(__name__)
+
+# (label, model, key column) deleted by employee_id, in this order
+_PURGE_STEPS = (
+    ('attendance_daily', AttendanceDaily, AttendanceDaily.day),
+    ('attendance', Attendance, Attendance.id),
+    ('notifications', Notification, Notification.id),
+)
+
+
+def get_roster_page(include_inactive=False, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of the (non-manager) employee roster, ordered by name.
+
+    Keyset-paginated on (name, id) using ix_employees_name_id. Items are
+    roster_select() rows, not Employee instances.
+
+    Returns:
+        Page: (items, next_cursor); next_cursor is None on the last page.
+
+    Raises:
+        ValueError: if the cursor is malformed.
+    """
+    after = None
+    if cursor:
+        name, employee_id = decode_cursor(cursor, 2)
+        if not isinstance(name, str) or not isinstance(employee_id, int):
+            raise ValueError('Invalid cursor.')
+        after = (name, employee_id)
+
+    stmt = roster_select().where(Employee.role != 'manager')
+    if not include_inactive:
+        stmt = stmt.where(Employee.is_active.is_(True))
+    return keyset_page(stmt, [Employee.name, Employee.id], after, limit,
+                       key=lambda e: (e.name, e.id))
+
+
+def request_employee_deletion(employee):
+    """Mark an employee pending deletion; the scheduler purges them.
+
+    They are deactivated at once, so they drop out of the roster, payroll
+    and login immediately; the rows are deleted by the next
+    run_pending_purges.
+    """
+    employee.is_active = False
+    employee.deletion_requested_at = datetime.now(timezone.utc)
+    after_commit(bump_data_version, background=False)
+    db.session.commit()
+
+
+def purge_employee(employee_id, chunk_size=None):
+    """Delete a pending-deletion employee's rows in chunks, then the employee.
+
+    Each chunk is its own transaction, so no long row locks are held and
+    re-running after an interruption continues where it stopped.
+
+    Returns:
+        dict: rows deleted per table, or None if the employee is not
+        pending deletion (or already gone).
+    """
+    chunk_size = chunk_size or current_app.config.get('EMPLOYEE_PURGE_CHUNK', 1000)
+    employee = db.session.get(Employee, employee_id)
+    if employee is None or not employee.is_pending_deletion:
+        return None
+
+    deleted = {}
+    for label, model, key in _PURGE_STEPS:
+        deleted[label] = 0
+        while True:
+            keys = db.session.scalars(
+                select(key).where(model.employee_id == employee_id).limit(chunk_size)).all()
+            if not keys:
+                break
+            db.session.execute(delete(model).where(model.employee_id == employee_id, key.in_(keys)))
+            db.session.commit()
+            deleted[label] += len(keys)
+            metrics.incr('employee_purge_rows', len(keys))
+        if deleted[label]:
+            logger.info(f'Purging employee {employee_id}: deleted {deleted[label]} {label} rows')
+
+    employee = db.session.get(Employee, employee_id)
+    if employee is not None:
+        db.session.delete(employee)
+        db.session.commit()
+    bump_data_version()
+    logger.info(f'Purged employee {employee_id}: {deleted}')
+    return deleted
+
+
+def purge_progress(employee_id):
+    """Where a purge stands: rows still to delete per table.
+
+    Returns:
+        dict: {status: 'pending' | 'deleted', requested_at, remaining}, or
+        None if the employee exists and is not pending deletion.
+    """
+    employee = db.session.get(Employee, employee_id)
+    if employee is None:
+        return {'status': 'deleted', 'requested_at': None, 'remaining': {}}
+    if not employee.is_pending_deletion:
+        return None
+    remaining = {label: db.session.scalar(select(func.count()).select_from(model)
+                                          .where(model.employee_id == employee_id))
+                 for label, model, _ in _PURGE_STEPS}
+    return {'status': 'pending', 'requested_at': employee.deletion_requested_at.isoformat(),
+            'remaining': remaining}
+
+
+def run_pending_purges():
+    """Purge every employee pending deletion, oldest request first.
+
+    Returns:
+        int: number of employees purged.
+    """
+    employee_ids = db.session.scalars(
+        select(Employee.id).where(Employee.deletion_requested_at.isnot(None))
+        .order_by(Employee.deletion_requested_at)).all()
+    for employee_id in employee_ids:
+        purge_employee(employee_id)
+    return len(employee_ids)
+
+
+def register_purge_command(app):
+    """Register the Flask CLI command for finishing pending employee deletions."""
+
+    @app.cli.command('purge-employees')
+    def purge_employees_cmd():
+        """Finish every pending employee deletion now."""
+        count = run_pending_purges()
+        click.echo(f'Purged {count} employee(s).')
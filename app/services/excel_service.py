@@ -0,0 +1,145 @@
+"""Write-only (streaming) Excel export engine.
+
+openpyxl's write-only mode spools each worksheet to a temporary file as
+rows are appended, and the finished workbook is saved to a spooled
+temporary file, so neither the cells nor the .xlsx bytes of a large
+export are held in memory. Write-only sheets fix their column widths
+before the first row, so widths are either measured in one pass over
+rows that are already in memory (the summary) or derived from the
+column formats (shift detail).
+"""
+import logging
+import re
+import tempfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+logger = logging.getLogger(__name__)
+
+CURRENCY_FORMAT = '$#,##0.00'
+HOURS_FORMAT = '0.00'
+TIMESTAMP_FORMAT = 'yyyy-mm-dd hh:mm'
+
+# Exports up to this size stay in memory; larger ones spill to disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+MIN_COLUMN_WIDTH = 12
+
+# (header, width) for the per-employee shift sheets; widths fit the
+# fixed timestamp format so detail sheets need no measuring pass
+DETAIL_COLUMNS = [
+    ('Record ID', 12),
+    ('Clock In (UTC)', 20),
+    ('Clock Out (UTC)', 20),
+    ('Duration (min)', 15),
+    ('Hours', 10),
+    ('Adjusted By', 24),
+    ('Adjustment Note', 48),
+]
+
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def new_workbook():
+    """Create a write-only workbook with the shared payroll cell styles."""
+    wb = Workbook(write_only=True)
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    styles = {
+        'wc_title': dict(font=Font(bold=True, size=14), alignment=Alignment(horizontal='center')),
+        'wc_header': dict(font=Font(bold=True, color='FFFFFF', size=11),
+                          fill=PatternFill(start_color='1F2937', end_color='1F2937', fill_type='solid'),
+                          alignment=Alignment(horizontal='center'), border=border),
+        'wc_text': dict(border=border),
+        'wc_hours': dict(border=border, number_format=HOURS_FORMAT),
+        'wc_currency': dict(border=border, number_format=CURRENCY_FORMAT),
+        'wc_bold': dict(font=Font(bold=True)),
+        'wc_total_hours': dict(number_format=HOURS_FORMAT),
+        'wc_total_currency': dict(number_format=CURRENCY_FORMAT),
+        'wc_timestamp': dict(number_format=TIMESTAMP_FORMAT),
+    }
+    for name, attrs in styles.items():
+        style = NamedStyle(name=name)
+        for attr, value in attrs.items():
+            setattr(style, attr, value)
+        wb.add_named_style(style)
+    return wb
+
+
+def styled(ws, value, style=None):
+    """A write-only cell using one of the workbook's named styles."""
+    cell = WriteOnlyCell(ws, value=value)
+    if style:
+        cell.style = style
+    return cell
+
+
+def set_column_widths(ws, widths):
+    """Fix column widths; must run before the first row is appended."""
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = max(width, MIN_COLUMN_WIDTH)
+
+
+def measure_widths(headers, rows):
+    """Single pass over rows that are already in memory: widest value per column."""
+    widths = [len(str(h)) + 2 for h in headers]
+    for row in rows:
+        for col, value in enumerate(row):
+            length = len(f'{value:.2f}' if isinstance(value, float) else str(value or '')) + 2
+            if length > widths[col]:
+                widths[col] = length
+    return widths
+
+
+def sheet_title(name, suffix, used):
+    """Excel-safe, unique sheet title (max 31 chars)."""
+    suffix = f' ({suffix})'
+    base = _INVALID_SHEET_CHARS.sub('', name).strip() or 'Sheet'
+    title = base[:31 - len(suffix)] + suffix
+    counter = 2
+    while title.lower() in used:
+        extra = f'{suffix[:-1]}-{counter})'
+        title = base[:31 - len(extra)] + extra
+        counter += 1
+    used.add(title.lower())
+    return title
+
+
+def write_detail_sheet(wb, title, shifts):
+    """Append one employee's shifts to a new sheet.
+
+    Args:
+        shifts: iterable of (record_id, clock_in, clock_out, minutes,
+                adjuster_name, note) tuples.
+    Returns:
+        int: number of shift rows written.
+    """
+    ws = wb.create_sheet(title=title)
+    set_column_widths(ws, [width for _, width in DETAIL_COLUMNS])
+    ws.append([styled(ws, header, 'wc_header') for header, _ in DETAIL_COLUMNS])
+
+    count = 0
+    for record_id, clock_in, clock_out, minutes, adjuster_name, note in shifts:
+        ws.append([
+            record_id,
+            styled(ws, clock_in, 'wc_timestamp'),
+            styled(ws, clock_out, 'wc_timestamp') if clock_out else None,
+            minutes,
+            round(minutes / 60, 2) if minutes is not None else None,
+            adjuster_name,
+            note,
+        ])
+        count += 1
+    return count
+
+
+def save_workbook(wb):
+    """Save to a spooled temporary file and rewind it for send_file."""
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, suffix='.xlsx')
+    wb.save(output)
+    output.seek(0)
+    return output
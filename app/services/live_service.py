@@ -0,0 +1,148 @@
+"""Live dashboard feed over Redis pub/sub and Server-Sent Events.
+
+Attendance writes publish a small event after commit (from the
+background dispatcher). The event already carries the numbers the
+dashboard shows — active count, hours today and the affected employee's
+month row — so every open dashboard can patch itself without querying.
+
+Each SSE connection occupies one gunicorn thread, so streams are capped
+per worker (LIVE_MAX_STREAMS) and closed after LIVE_STREAM_MAX_SECONDS;
+the browser's EventSource reconnects on its own, which spreads
+long-lived connections across workers. Over the cap a stream is closed
+immediately with a longer retry hint.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import redis
+from flask import current_app
+
+from app.extensions import db
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_open_streams = 0
+
+
+def _channel():
+    return current_app.config.get('LIVE_CHANNEL', 'workclock:live')
+
+
+def publish_attendance_event(kind, employee_id):
+    """Dispatcher task: publish an attendance change with fresh dashboard numbers.
+
+    Args:
+        kind: 'clock_in', 'clock_out', 'adjustment' or 'approval'.
+    """
+    from app.models.employee import Employee
+    from app.services.attendance_service import get_active_employees_count
+    from app.services.payroll_service import get_employee_monthly_summary, get_total_hours_today
+
+    client = current_app.extensions.get('redis')
+    if client is None or not current_app.config.get('LIVE_FEED_ENABLED', True):
+        return
+    employee = db.session.get(Employee, employee_id)
+    if employee is None:
+        return
+
+    now = datetime.now(timezone.utc)
+    row = get_employee_monthly_summary(employee, now.year, now.month)
+    event = {
+        'kind': kind,
+        'at': now.isoformat(),
+        'month': f'{now.year}-{now.month:02d}',
+        'active_count': get_active_employees_count(),
+        'total_hours_today': get_total_hours_today(),
+        'row': row,
+    }
+    try:
+        client.publish(_channel(), json.dumps(event))
+        metrics.incr('live_events_published')
+    except redis.RedisError as e:
+        logger.warning(f'Failed to publish live {kind} event: {e}')
+
+
+def _sse(data=None, event=None, retry_ms=None, comment=None):
+    lines = []
+    if comment is not None:
+        lines.append(f': {comment}')
+    if retry_ms is not None:
+        lines.append(f'retry: {retry_ms}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _open_stream(limit):
+    global _open_streams
+    with _lock:
+        if _open_streams >= limit:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _close_stream():
+    global _open_streams
+    with _lock:
+        _open_streams -= 1
+
+
+metrics.register_gauge('live_streams_open', lambda: _open_streams)
+
+
+def event_stream():
+    """Return a generator of SSE frames for the current worker.
+
+    Config and the Redis client are read up front, so the generator does
+    not need an app context and holds no database connection.
+    """
+    cfg = current_app.config
+    client = current_app.extensions.get('redis')
+    enabled = client is not None and cfg.get('LIVE_FEED_ENABLED', True)
+    channel = _channel()
+    limit = cfg.get('LIVE_MAX_STREAMS', 2)
+    keepalive = cfg.get('LIVE_KEEPALIVE_SECONDS', 15)
+    max_seconds = cfg.get('LIVE_STREAM_MAX_SECONDS', 300)
+    retry_ms = cfg.get('LIVE_RETRY_MS', 3000)
+    busy_retry_ms = cfg.get('LIVE_BUSY_RETRY_MS', 30000)
+
+    def stream():
+        if not enabled or not _open_stream(limit):
+            metrics.incr('live_streams_rejected')
+            yield _sse(retry_ms=busy_retry_ms, comment='busy')
+            return
+
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        started = last_sent = time.monotonic()
+        metrics.incr('live_streams_opened')
+        try:
+            pubsub.subscribe(channel)
+            yield _sse(retry_ms=retry_ms, comment='connected')
+            while time.monotonic() - started < max_seconds:
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    data = message['data']
+                    yield _sse(data.decode('utf-8') if isinstance(data, bytes) else data, event='attendance')
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= keepalive:
+                    yield _sse(comment='keepalive')
+                    last_sent = time.monotonic()
+        except redis.RedisError as e:
+            logger.warning(f'Live stream lost Redis: {e}')
+        finally:
+            # Also runs when the client disconnects (the server closes the generator)
+            _close_stream()
+            try:
+                pubsub.close()
+            except redis.RedisError:
+                pass
+
+    return stream()
@@ -0,0 +1,299 @@
+"""Durable outbound email queue.
+
+Web workers only serialise the message and LPUSH it onto a Redis list;
+the sender process (mail_worker.py) moves messages onto its own
+processing list with BLMOVE, sends them in batches over one long-lived
+SMTP connection and removes them once the server has accepted them. A
+sender that dies mid-batch leaves its messages on the processing list,
+and they are put back on the queue when it starts again.
+
+Failed sends are retried with exponential backoff through a sorted set
+keyed by due time; messages that keep failing (or are rejected outright
+with a 5xx) end up on a dead-letter list for inspection.
+"""
+import base64
+import json
+import logging
+import signal
+import smtplib
+import socket
+import time
+import uuid
+from contextlib import ExitStack
+
+import click
+import redis
+from flask import current_app
+from flask_mail import Message
+
+from app.extensions import mail
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Atomically move due messages from the delayed set back onto the queue
+_PROMOTE_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, raw in ipairs(due) do
+    redis.call('ZREM', KEYS[1], raw)
+    redis.call('LPUSH', KEYS[2], raw)
+end
+return #due
+"""
+
+
+class MailQueueUnavailable(Exception):
+    """Raised when the queue is disabled or Redis cannot be reached."""
+
+
+def _client():
+    client = current_app.extensions.get('redis')
+    if client is None or not current_app.config.get('MAIL_QUEUE_ENABLED', True):
+        raise MailQueueUnavailable('Mail queue is disabled.')
+    return client
+
+
+def _key(name):
+    return current_app.config.get('MAIL_QUEUE_KEY_PREFIX', 'workclock:mail:') + name
+
+
+def _processing_key(worker_name):
+    return _key(f'processing:{worker_name}')
+
+
+def enqueue(subject, recipients, body, html=None, attachments=None):
+    """Push a message onto the durable queue.
+
+    Raises:
+        MailQueueUnavailable: if the queue is disabled or Redis is down, so
+            the caller can fall back to sending directly.
+    """
+    payload = {
+        'id': uuid.uuid4().hex,
+        'subject': subject,
+        'recipients': list(recipients),
+        'body': body,
+        'html': html,
+        'attachments': [
+            [filename, content_type, base64.b64encode(data).decode('ascii')]
+            for filename, content_type, data in attachments or []
+        ],
+        'attempts': 0,
+        'enqueued_at': time.time(),
+    }
+    try:
+        _client().lpush(_key('queue'), json.dumps(payload))
+    except redis.RedisError as e:
+        raise MailQueueUnavailable(str(e)) from e
+    metrics.incr('mail_enqueued')
+    return payload['id']
+
+
+def build_message(payload):
+    """Rebuild a flask_mail Message from a queued payload."""
+    msg = Message(subject=payload['subject'], recipients=payload['recipients'])
+    msg.body = payload['body']
+    if payload.get('html'):
+        msg.html = payload['html']
+    for filename, content_type, data in payload.get('attachments', []):
+        msg.attach(filename, content_type, base64.b64decode(data))
+    return msg
+
+
+def get_queue_stats():
+    """Current queue sizes: pending, delayed (waiting to retry), dead, in flight."""
+    client = _client()
+    pipe = client.pipeline(transaction=False)
+    pipe.llen(_key('queue'))
+    pipe.zcard(_key('delayed'))
+    pipe.llen(_key('dead'))
+    processing_keys = list(client.scan_iter(match=_key('processing:*')))
+    for key in processing_keys:
+        pipe.llen(key)
+    pending, delayed, dead, *in_flight = pipe.execute()
+    return {'pending': pending, 'delayed': delayed, 'dead': dead, 'in_flight': sum(in_flight)}
+
+
+def register_queue_gauges():
+    """Expose the shared queue sizes on /api/metrics."""
+    metrics.register_gauge('mail_queue_pending', lambda: _client().llen(_key('queue')))
+    metrics.register_gauge('mail_queue_delayed', lambda: _client().zcard(_key('delayed')))
+    metrics.register_gauge('mail_queue_dead', lambda: _client().llen(_key('dead')))
+
+
+class _SmtpConnection:
+    """One SMTP connection kept open across batches, reopened on demand."""
+
+    def __init__(self):
+        self._stack = None
+        self._conn = None
+        self.last_used = 0.0
+
+    def get(self):
+        if self._conn is None:
+            self._stack = ExitStack()
+            self._conn = self._stack.enter_context(mail.connect())
+            metrics.incr('mail_smtp_connects')
+        self.last_used = time.monotonic()
+        return self._conn
+
+    def close(self):
+        if self._stack is not None:
+            try:
+                self._stack.close()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._stack = self._conn = None
+
+
+def _is_permanent(error):
+    """5xx replies will not succeed on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class MailSender:
+    """Drains the queue: batches, one SMTP connection, retries with backoff."""
+
+    def __init__(self, app, worker_name=None):
+        self.app = app
+        self.worker_name = worker_name or socket.gethostname()
+        self.smtp = _SmtpConnection()
+        self.running = True
+        cfg = app.config
+        self.batch_size = cfg.get('MAIL_QUEUE_BATCH_SIZE', 50)
+        self.max_attempts = cfg.get('MAIL_QUEUE_MAX_ATTEMPTS', 6)
+        self.backoff_base = cfg.get('MAIL_QUEUE_BACKOFF_BASE', 30)
+        self.backoff_max = cfg.get('MAIL_QUEUE_BACKOFF_MAX', 3600)
+        self.idle_timeout = cfg.get('MAIL_QUEUE_SMTP_IDLE_TIMEOUT', 30)
+
+    def stop(self, *_args):
+        self.running = False
+
+    def recover(self):
+        """Put messages a previous run left in flight back on the queue."""
+        client, processing = _client(), _processing_key(self.worker_name)
+        moved = 0
+        while client.lmove(processing, _key('queue'), 'LEFT', 'RIGHT') is not None:
+            moved += 1
+        if moved:
+            logger.warning(f'Requeued {moved} message(s) left in flight by a previous run')
+        return moved
+
+    def promote_due(self):
+        """Move retries whose backoff has expired back onto the queue."""
+        script = _client().register_script(_PROMOTE_DUE)
+        return script(keys=[_key('delayed'), _key('queue')], args=[time.time(), self.batch_size])
+
+    def next_batch(self, timeout=1):
+        """Claim up to batch_size messages, blocking briefly for the first."""
+        client, processing = _client(), _processing_key(self.worker_name)
+        first = client.blmove(_key('queue'), processing, timeout, 'RIGHT', 'LEFT')
+        if first is None:
+            return []
+        batch = [first]
+        while len(batch) < self.batch_size:
+            raw = client.lmove(_key('queue'), processing, 'RIGHT', 'LEFT')
+            if raw is None:
+                break
+            batch.append(raw)
+        return batch
+
+    def _send(self, msg):
+        try:
+            self.smtp.get().send(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped the idle connection; reconnect once
+            self.smtp.close()
+            self.smtp.get().send(msg)
+
+    def _finish(self, raw):
+        _client().lrem(_processing_key(self.worker_name), 1, raw)
+
+    def _fail(self, raw, payload, error):
+        client = _client()
+        payload['attempts'] += 1
+        payload['last_error'] = str(error)[:500]
+        pipe = client.pipeline()
+        pipe.lrem(_processing_key(self.worker_name), 1, raw)
+        if _is_permanent(error) or payload['attempts'] >= self.max_attempts:
+            pipe.lpush(_key('dead'), json.dumps(payload))
+            metrics.incr('mail_dead')
+            logger.error(f'Giving up on email {payload["id"]} "{payload["subject"]}" '
+                         f'after {payload["attempts"]} attempt(s): {error}')
+        else:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (payload['attempts'] - 1))
+            pipe.zadd(_key('delayed'), {json.dumps(payload): time.time() + delay})
+            metrics.incr('mail_retries')
+            logger.warning(f'Email {payload["id"]} failed ({error}); retrying in {delay}s')
+        pipe.execute()
+
+    def process(self, batch):
+        """Send one claimed batch over the shared connection."""
+        sent = 0
+        for raw in batch:
+            payload = json.loads(raw)
+            try:
+                self._send(build_message(payload))
+            except Exception as e:
+                if not _is_permanent(e):
+                    self.smtp.close()
+                self._fail(raw, payload, e)
+                continue
+            self._finish(raw)
+            sent += 1
+            metrics.observe('mail_queue_latency', time.time() - payload['enqueued_at'])
+        metrics.incr('mail_sent', sent)
+        logger.info(f'Sent {sent}/{len(batch)} email(s)')
+        return sent
+
+    def run_once(self, timeout=1):
+        self.promote_due()
+        batch = self.next_batch(timeout)
+        if batch:
+            self.process(batch)
+        elif self.smtp.last_used and time.monotonic() - self.smtp.last_used > self.idle_timeout:
+            self.smtp.close()
+            self.smtp.last_used = 0.0
+        return len(batch)
+
+    def run(self):
+        """Loop until stopped (SIGTERM/SIGINT finish the current batch first)."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        with self.app.app_context():
+            self.recover()
+            logger.info(f'Mail sender "{self.worker_name}" started; queue: {get_queue_stats()}')
+            while self.running:
+                try:
+                    self.run_once()
+                except redis.RedisError as e:
+                    logger.error(f'Redis error in mail sender: {e}; retrying in 5s')
+                    time.sleep(5)
+            self.smtp.close()
+            logger.info('Mail sender stopped.')
+
+
+def register_mail_queue_command(app):
+    """Register the Flask CLI command for inspecting the mail queue."""
+
+    @app.cli.command('mail-queue')
+    @click.option('--retry-dead', is_flag=True, help='Move dead-lettered messages back onto the queue')
+    def mail_queue_cmd(retry_dead):
+        """Show outbound email queue sizes."""
+        try:
+            client = _client()
+            if retry_dead:
+                moved = 0
+                while (raw := client.rpop(_key('dead'))) is not None:
+                    payload = json.loads(raw)
+                    payload['attempts'] = 0
+                    client.lpush(_key('queue'), json.dumps(payload))
+                    moved += 1
+                click.echo(f'Requeued {moved} dead message(s).')
+            stats = get_queue_stats()
+        except (MailQueueUnavailable, redis.RedisError) as e:
+            raise click.ClickException(f'Mail queue unavailable: {e}')
+        for name, value in stats.items():
+            click.echo(f'{name:>9}: {value}')
@@ -0,0 +1,137 @@
+"""Monthly range partitions of the attendance table (PostgreSQL only).
+
+On PostgreSQL, migration d5a9e2c7f130 turns attendance into a table
+partitioned by RANGE (clock_in), with one partition per UTC month named
+attendance_yYYYYmMM plus attendance_default for rows that arrive before
+their month exists. The scheduler runs ensure_partitions() daily so the
+next PARTITION_MONTHS_AHEAD months always exist ahead of time.
+
+Month-range queries on clock_in (payroll_service.month_shifts) are
+pruned to a single partition. SQLite has no partitioning; everything
+here is a no-op there.
+"""
+import logging
+import re
+from datetime import date, datetime, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import text
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'attendance'
+DEFAULT_PARTITION = 'attendance_default'
+# Partition tables and their per-partition indexes, which are managed here
+# rather than by the models (migrations/env.py skips them in autogenerate)
+PARTITION_NAME_RE = re.compile(r'^attendance_(y\d{4}m\d{2}|default)(_|$)')
+
+
+def partition_name(year, month):
+    return f'attendance_y{year}m{month:02d}'
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def is_partitioned(connection=None):
+    """True if the attendance table is a PostgreSQL partitioned table."""
+    conn = connection or db.session.connection()
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)'
+    ), {'name': PARENT_TABLE}).first() is not None
+
+
+def create_month_partition(connection, year, month):
+    """Create one month's partition and its open-shift index if missing.
+
+    Partitioned tables cannot have a unique index that leaves out the
+    partition key, so each partition gets its own partial unique index on
+    open shifts, which only catches duplicates within a month of clock_in.
+    Across months, "one open shift per employee" relies on the employee
+    row lock taken by attendance_service.clock_in and adjust_record.
+
+    Returns:
+        bool: True if the partition was created.
+    """
+    name = partition_name(year, month)
+    if connection.execute(text('SELECT to_regclass(:name)'), {'name': name}).scalar() is not None:
+        return False
+    start = date(year, month, 1)
+    end = date(*_next_month(year, month), 1)
+    bounds = {'start': start, 'end': end}
+
+    # A new partition may not overlap rows in the default partition, so
+    # set aside any that belong to this month and re-route them afterwards
+    in_month = 'clock_in >= :start AND clock_in < :end'
+    stray = connection.execute(text(
+        f'SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_month}'), bounds).scalar()
+    if stray:
+        connection.execute(text(
+            f'CREATE TEMPORARY TABLE attendance_moving ON COMMIT DROP AS '
+            f'SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}'), bounds)
+        connection.execute(text(f'DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}'), bounds)
+
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    connection.execute(text(
+        f'CREATE UNIQUE INDEX {name}_open_shift ON {name} (employee_id) WHERE clock_out IS NULL'
+    ))
+    if stray:
+        connection.execute(text(f'INSERT INTO {PARENT_TABLE} SELECT * FROM attendance_moving'))
+        connection.execute(text('DROP TABLE attendance_moving'))
+        logger.info(f'Moved {stray} attendance rows from {DEFAULT_PARTITION} into {name}')
+    return True
+
+
+def ensure_partitions(months_ahead=None):
+    """Create the partitions for this month and the next months_ahead months.
+
+    Returns:
+        list of str: names of the partitions created (empty on SQLite or
+        when all of them already exist).
+    """
+    if months_ahead is None:
+        months_ahead = current_app.config.get('PARTITION_MONTHS_AHEAD', 3)
+    conn = db.session.connection()
+    if not is_partitioned(conn):
+        return []
+
+    today = datetime.now(timezone.utc)
+    year, month = today.year, today.month
+    created = []
+    for _ in range(months_ahead + 1):
+        if create_month_partition(conn, year, month):
+            created.append(partition_name(year, month))
+        year, month = _next_month(year, month)
+    db.session.commit()
+
+    for name in created:
+        logger.info(f'Created attendance partition {name}')
+    stray = db.session.execute(text(f'SELECT count(*) FROM {DEFAULT_PARTITION}')).scalar()
+    if stray:
+        logger.warning(f'{stray} attendance rows are in {DEFAULT_PARTITION} '
+                       f'(months outside the managed range)')
+    return created
+
+
+def register_partition_command(app):
+    """Register the Flask CLI command for creating attendance partitions."""
+
+    @app.cli.command('ensure-partitions')
+    @click.option('--months-ahead', type=int, default=None,
+                  help='Future months to create (default: PARTITION_MONTHS_AHEAD)')
+    def ensure_partitions_cmd(months_ahead):
+        """Create upcoming monthly attendance partitions (PostgreSQL)."""
+        if not is_partitioned():
+            click.echo('attendance is not partitioned (SQLite, or migrations not applied); nothing to do.')
+            return
+        created = ensure_partitions(months_ahead)
+        click.echo(f'Created {len(created)} partition(s){": " + ", ".join(created) if created else "."}')
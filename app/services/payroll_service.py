@@ -1,14 +1,28 @@
 import csv
+import heapq
 import io
 import logging
-from datetime import datetime, timezone
+from dataclasses import asdict, dataclass, field
+from itertools import groupby
+from operator import attrgetter
+from datetime import datetime, time, timedelta, timezone
 from calendar import monthrange
 
-from sqlalchemy import func, extract
+import click
+from flask import g
+from sqlalchemy import and_, case, delete, func, extract, or_, select, true
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 
 from app.extensions import db
 from app.models.employee import Employee
 from app.models.attendance import Attendance
+from app.models.attendance_daily import AttendanceDaily
+from app.models.payroll_snapshot import ClosedPeriod, PayrollSnapshot
+from app.services.archive_service import archived_period, archived_periods_between, read_month
+from app.services.cache_service import bump_data_version, cached, cached_for_employee
+from app.services.read_models import ShiftRow, shift_select, snapshot_select
+from app.utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, keyset_page, list_page
 
 logger = logging.getLogger(__name__)
 
@@ -21,26 +35,42 @@ def get_month_range(year, month):
     return start, end
 
 
+def month_shifts(year, month):
+    """Filter for shifts that clocked in during a month.
+
+    Half-open, naive UTC bounds (clock_in is timestamp without time zone)
+    that match the monthly attendance partitions exactly, so PostgreSQL
+    prunes the scan to the month's partition at plan time.
+    """
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return and_(Attendance.clock_in >= start, Attendance.clock_in < end)
+
+
 def get_monthly_hours(employee_id, year, month):
     """Calculate total hours and overtime for an employee in a given month.
 
     Returns:
         dict: {total_minutes, total_hours, regular_hours, overtime_hours}
     """
-    from flask import current_app
-    threshold = current_app.config.get('OVERTIME_MONTHLY_THRESHOLD', 160)
-
     start, end = get_month_range(year, month)
 
-    total_minutes = (db.session.query(func.coalesce(func.sum(Attendance.work_duration_minutes), 0))
+    total_minutes = (db.session.query(func.coalesce(func.sum(AttendanceDaily.total_minutes), 0))
                      .filter(
-                         Attendance.employee_id == employee_id,
-                         Attendance.clock_in >= start,
-                         Attendance.clock_in <= end,
-                         Attendance.work_duration_minutes.isnot(None)
+                         AttendanceDaily.employee_id == employee_id,
+                         AttendanceDaily.day >= start.date(),
+                         AttendanceDaily.day <= end.date()
                      )
                      .scalar()) or 0
 
+    return _hours_breakdown(total_minutes)
+
+
+def _hours_breakdown(total_minutes):
+    """Split a month's worked minutes into regular and overtime hours."""
+    from flask import current_app
+    threshold = current_app.config.get('OVERTIME_MONTHLY_THRESHOLD', 160)
+
     total_hours = round(total_minutes / 60, 2)
     regular_hours = min(total_hours, threshold)
     overtime_hours = max(0, total_hours - threshold)
@@ -55,134 +85,424 @@ def get_monthly_hours(employee_id, year, month):
 
 def get_today_hours(employee_id):
     """Calculate total hours worked today for an employee."""
-    now = datetime.now(timezone.utc)
-    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today = datetime.now(timezone.utc).date()
 
-    total_minutes = (db.session.query(func.coalesce(func.sum(Attendance.work_duration_minutes), 0))
+    total_minutes = (db.session.query(AttendanceDaily.total_minutes)
                      .filter(
-                         Attendance.employee_id == employee_id,
-                         Attendance.clock_in >= start_of_day,
-                         Attendance.work_duration_minutes.isnot(None)
+                         AttendanceDaily.employee_id == employee_id,
+                         AttendanceDaily.day == today
                      )
                      .scalar()) or 0
 
     return round(total_minutes / 60, 2)
 
 
+@dataclass
+class RecentShift:
+    """A shift as shown on the employee dashboard (no ORM state, cacheable)."""
+    id: int
+    clock_in: datetime
+    clock_out: datetime = None
+    work_duration_minutes: int = None
+
+    @property
+    def is_active(self):
+        return self.clock_out is None
+
+    @property
+    def formatted_duration(self):
+        return Attendance.format_duration(self.work_duration_minutes)
+
+
+@dataclass
+class EmployeeDashboard:
+    year: int
+    month: int
+    monthly_hours: dict
+    today_hours: float
+    recent_shifts: list = field(default_factory=list)
+
+    def to_dict(self):
+        data = asdict(self)
+        for shift in data['recent_shifts']:
+            for key in ('clock_in', 'clock_out'):
+                shift[key] = shift[key].isoformat() if shift[key] else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        shifts = [RecentShift(**{**s, 'clock_in': datetime.fromisoformat(s['clock_in']),
+                                 'clock_out': s['clock_out'] and datetime.fromisoformat(s['clock_out'])})
+                  for s in data['recent_shifts']]
+        return cls(**{**data, 'recent_shifts': shifts})
+
+
+def get_employee_dashboard(employee_id, year, month, recent=10):
+    """Month totals, today's hours and the latest shifts for one employee.
+
+    One statement: conditional aggregates over the employee's daily
+    rollups (the month, and today) give a single totals row, which is
+    outer-joined to their `recent` newest shifts so it comes back even when
+    they have none. Cached per employee until their next clock event.
+
+    Returns:
+        EmployeeDashboard
+    """
+    today = datetime.now(timezone.utc).date()
+
+    def compute():
+        start, end = get_month_range(year, month)
+        in_month = AttendanceDaily.day.between(start.date(), end.date())
+        totals = (select(
+            func.coalesce(func.sum(case((in_month, AttendanceDaily.total_minutes), else_=0)), 0)
+            .label('month_minutes'),
+            func.coalesce(func.sum(case((AttendanceDaily.day == today, AttendanceDaily.total_minutes), else_=0)), 0)
+            .label('today_minutes'))
+            .where(AttendanceDaily.employee_id == employee_id,
+                   or_(in_month, AttendanceDaily.day == today))
+            .subquery())
+        shifts = (select(Attendance.id, Attendance.clock_in, Attendance.clock_out,
+                         Attendance.work_duration_minutes)
+                  .where(Attendance.employee_id == employee_id)
+                  .order_by(Attendance.clock_in.desc(), Attendance.id.desc())
+                  .limit(recent)
+                  .subquery())
+        rows = db.session.execute(
+            select(totals, shifts)
+            .select_from(totals.outerjoin(shifts, true()))
+            .order_by(shifts.c.clock_in.desc(), shifts.c.id.desc())
+        ).all()
+
+        return EmployeeDashboard(
+            year=year,
+            month=month,
+            monthly_hours=_hours_breakdown(rows[0].month_minutes),
+            today_hours=round(rows[0].today_minutes / 60, 2),
+            recent_shifts=[RecentShift(r.id, r.clock_in, r.clock_out, r.work_duration_minutes)
+                           for r in rows if r.id is not None],
+        ).to_dict()
+
+    data = cached_for_employee('employee_dashboard', employee_id,
+                               f'{year}-{month:02d}:{today}:{recent}', compute)
+    return EmployeeDashboard.from_dict(data)
+
+
 def get_all_employees_monthly_summary(year, month):
     """Generate monthly summary for all active employees.
 
+    Minutes for every employee come from a single grouped query (outer join
+    from employees to the month's daily rollups); overtime and pay are then
+    computed in Python. Only the employee columns the summary needs are
+    selected, so no Employee instances are built.
+
     Returns:
-        list of dicts: [{employee, total_hours, regular_hours, overtime_hours, regular_pay, overtime_pay, total_pay}]
+        list of dicts: [{employee_id, employee_name, email, role, hourly_rate, total_hours,
+                         regular_hours, overtime_hours, regular_pay, overtime_pay, total_pay}]
+    """
+    start, end = get_month_range(year, month)
+
+    rows = db.session.execute(
+        select(Employee.id, Employee.name, Employee.email, Employee.role, Employee.hourly_rate,
+               func.coalesce(func.sum(AttendanceDaily.total_minutes), 0).label('total_minutes'))
+        .outerjoin(AttendanceDaily, and_(
+            AttendanceDaily.employee_id == Employee.id,
+            AttendanceDaily.day >= start.date(),
+            AttendanceDaily.day <= end.date(),
+        ))
+        .where(Employee.is_active.is_(True))
+        .group_by(Employee.id)
+        .order_by(Employee.name)
+    ).all()
+
+    return [_summary_row(row, row.total_minutes or 0) for row in rows]
+
+
+def get_employee_monthly_summary(employee, year, month):
+    """One employee's row of get_all_employees_monthly_summary."""
+    return _summary_row(employee, get_monthly_hours(employee.id, year, month)['total_minutes'])
+
+
+def _summary_row(emp, total_minutes):
+    hours = _hours_breakdown(total_minutes)
+    hourly_rate = float(emp.hourly_rate)
+
+    regular_pay = round(hours['regular_hours'] * hourly_rate, 2)
+    overtime_pay = round(hours['overtime_hours'] * hourly_rate * 1.5, 2)  # 1.5x for overtime
+    total_pay = round(regular_pay + overtime_pay, 2)
+
+    return {
+        'employee_id': emp.id,
+        'employee_name': emp.name,
+        'email': emp.email,
+        'role': emp.role,
+        'hourly_rate': hourly_rate,
+        'total_hours': hours['total_hours'],
+        'regular_hours': hours['regular_hours'],
+        'overtime_hours': hours['overtime_hours'],
+        'regular_pay': regular_pay,
+        'overtime_pay': overtime_pay,
+        'total_pay': total_pay,
+    }
+
+
+@dataclass
+class PayrollPeriod:
+    """A month's payroll, aggregated once and shared by every output.
+
+    The dashboard, CSV and Excel exports and the monthly email all read the
+    same PayrollPeriod, cached per (year, month, data version).
+    summaries holds plain dicts (no ORM objects) so it can be cached.
+    Closed periods are read from their snapshot instead of attendance.
+    """
+    year: int
+    month: int
+    summaries: list = field(default_factory=list)
+    total_hours: float = 0
+    regular_hours: float = 0
+    overtime_hours: float = 0
+    regular_pay: float = 0
+    overtime_pay: float = 0
+    total_pay: float = 0
+    closed_at: str = None
+
+    @classmethod
+    def build(cls, year, month):
+        """Load the period's snapshot if it is closed, else aggregate it live."""
+        closed_at = db.session.scalar(select(ClosedPeriod.closed_at).where(
+            ClosedPeriod.year == year, ClosedPeriod.month == month))
+        if closed_at is None:
+            return cls.from_summaries(year, month, get_all_employees_monthly_summary(year, month))
+
+        snapshot = db.session.execute(snapshot_select(year, month))
+        return cls.from_summaries(year, month, [PayrollSnapshot.summary_from_row(row) for row in snapshot],
+                                  closed_at=closed_at.isoformat())
+
+    @classmethod
+    def from_summaries(cls, year, month, summaries, closed_at=None):
+        return cls(
+            year=year,
+            month=month,
+            summaries=summaries,
+            closed_at=closed_at,
+            **{key: sum(s[key] for s in summaries) for key in (
+                'total_hours', 'regular_hours', 'overtime_hours',
+                'regular_pay', 'overtime_pay', 'total_pay')},
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def get_payroll_period(year, month):
+    """Return the PayrollPeriod for a month, computing it at most once.
+
+    Memoised on flask.g for the current request or CLI run, and cached in
+    Redis across requests until an attendance write bumps the data version.
+    """
+    memo = g.setdefault('payroll_periods', {})
+    if (year, month) not in memo:
+        data = cached('payroll_period', year, month,
+                      lambda: PayrollPeriod.build(year, month).to_dict())
+        memo[(year, month)] = PayrollPeriod.from_dict(data)
+    return memo[(year, month)]
+
+
+def _save_snapshot(year, month):
+    """Replace the period's snapshot rows with freshly aggregated summaries."""
+    db.session.execute(delete(PayrollSnapshot).where(
+        PayrollSnapshot.year == year, PayrollSnapshot.month == month))
+    summaries = get_all_employees_monthly_summary(year, month)
+    db.session.add_all(PayrollSnapshot(year=year, month=month, **s) for s in summaries)
+    return len(summaries)
+
+
+def _forget_period(year, month):
+    g.get('payroll_periods', {}).pop((year, month), None)
+    bump_data_version(datetime(year, month, 1))
+
+
+def close_period(year, month, closed_by=None):
+    """Freeze a finished month's payroll into payroll_snapshots.
+
+    From then on every reader (dashboard, exports, email) gets the saved
+    rows, so later shift edits or pay rate changes no longer alter it.
+
+    Raises:
+        ValueError: if the month has not ended yet or is already closed.
+    """
+    now = datetime.now(timezone.utc)
+    if (year, month) >= (now.year, now.month):
+        raise ValueError(f'{year}-{month:02d} has not ended yet.')
+    if db.session.get(ClosedPeriod, (year, month)):
+        raise ValueError(f'{year}-{month:02d} is already closed.')
+
+    count = _save_snapshot(year, month)
+    db.session.add(ClosedPeriod(year=year, month=month, closed_by=closed_by))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Closed concurrently by another request
+        db.session.rollback()
+        raise ValueError(f'{year}-{month:02d} is already closed.')
+
+    _forget_period(year, month)
+    logger.info(f'Closed payroll period {year}-{month:02d} ({count} employees)')
+    return count
+
+
+def reopen_period(year, month, closed_by=None):
+    """Recompute a closed month from current attendance and re-save its snapshot.
+
+    Use after correcting shifts or rates in a month that was already closed.
+
+    Raises:
+        ValueError: if the month is not closed, or its shifts are archived.
     """
-    employees = Employee.query.filter_by(is_active=True).order_by(Employee.name).all()
-    summaries = []
-
-    for emp in employees:
-        hours = get_monthly_hours(emp.id, year, month)
-        hourly_rate = float(emp.hourly_rate)
-
-        regular_pay = round(hours['regular_hours'] * hourly_rate, 2)
-        overtime_pay = round(hours['overtime_hours'] * hourly_rate * 1.5, 2)  # 1.5x for overtime
-        total_pay = round(regular_pay + overtime_pay, 2)
-
-        summaries.append({
-            'employee': emp,
-            'employee_id': emp.id,
-            'employee_name': emp.name,
-            'email': emp.email,
-            'hourly_rate': hourly_rate,
-            'total_hours': hours['total_hours'],
-            'regular_hours': hours['regular_hours'],
-            'overtime_hours': hours['overtime_hours'],
-            'regular_pay': regular_pay,
-            'overtime_pay': overtime_pay,
-            'total_pay': total_pay,
-        })
-
-    return summaries
+    closed = db.session.get(ClosedPeriod, (year, month))
+    if closed is None:
+        raise ValueError(f'{year}-{month:02d} is not closed.')
+    if archived_period(year, month) is not None:
+        raise ValueError(f'{year}-{month:02d} is archived; restore its shifts first (flask restore-attendance).')
+
+    count = _save_snapshot(year, month)
+    closed.closed_at = datetime.now(timezone.utc)
+    closed.closed_by = closed_by
+    db.session.commit()
+
+    _forget_period(year, month)
+    logger.info(f'Re-saved payroll snapshot for {year}-{month:02d} ({count} employees)')
+    return count
+
+
+def get_total_hours_today():
+    """Hours worked today across all employees, from the daily rollups."""
+    today = datetime.now(timezone.utc).date()
+    total_today_minutes = (db.session.query(func.coalesce(func.sum(AttendanceDaily.total_minutes), 0))
+                           .filter(AttendanceDaily.day == today)
+                           .scalar()) or 0
+    return round(total_today_minutes / 60, 2)
 
 
 def get_dashboard_metrics(year, month):
     """Get dashboard summary metrics.
 
+    The month's summaries and totals come from the shared PayrollPeriod;
+    the live numbers (active count, hours today) are always read fresh
+    from the rollups.
+
     Returns:
         dict with keys: active_count, total_hours_today, monthly_summaries,
-                        total_monthly_hours, total_payroll, total_overtime_pay
+                        total_monthly_hours, total_payroll, total_overtime_pay,
+                        closed_at (ISO timestamp, or None while the period is open)
     """
     from app.services.attendance_service import get_active_employees_count
 
-    summaries = get_all_employees_monthly_summary(year, month)
-
-    # Total hours today across all employees
-    now = datetime.now(timezone.utc)
-    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    total_today_minutes = (db.session.query(func.coalesce(func.sum(Attendance.work_duration_minutes), 0))
-                           .filter(
-                               Attendance.clock_in >= start_of_day,
-                               Attendance.work_duration_minutes.isnot(None)
-                           )
-                           .scalar()) or 0
-
-    total_monthly_hours = sum(s['total_hours'] for s in summaries)
-    total_payroll = sum(s['total_pay'] for s in summaries)
-    total_overtime_pay = sum(s['overtime_pay'] for s in summaries)
+    period = get_payroll_period(year, month)
 
     return {
         'active_count': get_active_employees_count(),
-        'total_hours_today': round(total_today_minutes / 60, 2),
-        'monthly_summaries': summaries,
-        'total_monthly_hours': round(total_monthly_hours, 2),
-        'total_payroll': round(total_payroll, 2),
-        'total_overtime_pay': round(total_overtime_pay, 2),
+        'total_hours_today': get_total_hours_today(),
+        'monthly_summaries': period.summaries,
+        'total_monthly_hours': round(period.total_hours, 2),
+        'total_payroll': round(period.total_pay, 2),
+        'total_overtime_pay': round(period.overtime_pay, 2),
+        'closed_at': period.closed_at,
     }
 
 
-def get_employee_monthly_log(employee_id, year, month):
-    """Get all attendance records for an employee in a given month."""
-    start, end = get_month_range(year, month)
-
-    records = (Attendance.query
-               .filter(
-                   Attendance.employee_id == employee_id,
-                   Attendance.clock_in >= start,
-                   Attendance.clock_in <= end,
-               )
-               .order_by(Attendance.clock_in.desc())
-               .all())
-
-    return records
+def get_employee_monthly_log(employee_id, year, month, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of an employee's attendance records for a month, newest first.
 
+    Keyset-paginated on (clock_in, id) so later pages stay index range
+    scans on ix_attendance_employee_clock_in. Archived months are read
+    from their archive file with the same cursors.
 
-def generate_payroll_csv(year, month):
-    """Generate a CSV file for payroll data.
+    Args:
+        cursor: next_cursor of the previous page, or None for the first page.
 
     Returns:
-        io.StringIO: CSV content ready for download or email attachment.
-    """
-    summaries = get_all_employees_monthly_summary(year, month)
-
-    output = io.StringIO()
-    writer = csv.writer(output)
+        Page: (items, next_cursor) of ShiftRow; next_cursor is None on the
+        last page.
 
-    # Header
-    writer.writerow([
-        'Employee ID', 'Employee Name', 'Email', 'Hourly Rate',
-        'Total Hours', 'Regular Hours', 'Overtime Hours',
-        'Regular Pay', 'Overtime Pay (1.5x)', 'Total Pay'
-    ])
+    Raises:
+        ValueError: if the cursor is malformed.
+    """
+    after = None
+    if cursor:
+        clock_in, record_id = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(clock_in), int(record_id))
+        except (TypeError, ValueError) as e:
+            raise ValueError('Invalid cursor.') from e
+
+    key = attrgetter('clock_in', 'id')
+    archived = archived_period(year, month)
+    if archived is not None:
+        rows = [ShiftRow(*r[:9]) for r in read_month(archived, employee_id)]
+        return list_page(rows, after, limit, key, descending=True)
+
+    stmt = shift_select().where(Attendance.employee_id == employee_id, month_shifts(year, month))
+    return keyset_page(stmt, [Attendance.clock_in, Attendance.id], after, limit,
+                       key=key, descending=True, row_type=ShiftRow)
+
+
+def count_employee_monthly_records(employee_id, year, month):
+    """Number of attendance records (including an open shift) in a month."""
+    archived = archived_period(year, month)
+    if archived is not None:
+        return len(read_month(archived, employee_id))
+    return (db.session.query(func.count(Attendance.id))
+            .filter(Attendance.employee_id == employee_id, month_shifts(year, month))
+            .scalar())
+
+
+PAYROLL_HEADERS = [
+    'Employee ID', 'Employee Name', 'Email', 'Hourly Rate',
+    'Total Hours', 'Regular Hours', 'Overtime Hours',
+    'Regular Pay', 'Overtime Pay (1.5x)', 'Total Pay'
+]
+
+TIMESHEET_HEADERS = [
+    'Record ID', 'Employee ID', 'Employee Name', 'Clock In (UTC)', 'Clock Out (UTC)',
+    'Duration (min)', 'Hours', 'Adjusted By', 'Adjustment Note', 'IP Address'
+]
+
+# Rows fetched per server-side cursor batch and written per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def _csv_chunks(rows, chunk_rows=EXPORT_BATCH_SIZE):
+    """Encode rows as CSV, yielding one string per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _payroll_csv_rows(summaries):
+    yield PAYROLL_HEADERS
 
     for s in summaries:
-        writer.writerow([
+        yield [
             s['employee_id'], s['employee_name'], s['email'],
             f"${s['hourly_rate']:.2f}",
             f"{s['total_hours']:.2f}", f"{s['regular_hours']:.2f}", f"{s['overtime_hours']:.2f}",
             f"${s['regular_pay']:.2f}", f"${s['overtime_pay']:.2f}", f"${s['total_pay']:.2f}",
-        ])
+        ]
 
     # Totals row
-    writer.writerow([])
-    writer.writerow([
+    yield []
+    yield [
         '', '', '', 'TOTALS',
         f"{sum(s['total_hours'] for s in summaries):.2f}",
         f"{sum(s['regular_hours'] for s in summaries):.2f}",
@@ -190,87 +510,192 @@ def generate_payroll_csv(year, month):
         f"${sum(s['regular_pay'] for s in summaries):.2f}",
         f"${sum(s['overtime_pay'] for s in summaries):.2f}",
         f"${sum(s['total_pay'] for s in summaries):.2f}",
-    ])
+    ]
+
 
+def iter_payroll_csv(year, month):
+    """Yield the payroll CSV for a month in chunks, for streaming responses."""
+    period = get_payroll_period(year, month)
+    return _csv_chunks(_payroll_csv_rows(period.summaries))
+
+
+def generate_payroll_csv(year, month):
+    """Generate a CSV file for payroll data.
+
+    Returns:
+        io.StringIO: CSV content ready for download or email attachment.
+    """
+    output = io.StringIO()
+    output.writelines(iter_payroll_csv(year, month))
     output.seek(0)
     return output
 
 
-def generate_payroll_excel(year, month):
+def iter_timesheet_rows(start_date, end_date, employee_id=None):
+    """Yield one tuple per shift with clock_in between two dates (inclusive).
+
+    Rows are plain column tuples fetched through a server-side cursor in
+    batches of EXPORT_BATCH_SIZE, so memory stays flat for any range.
+    Shifts of archived months are merged in from their archive files, one
+    month at a time.
+    """
+    # Naive UTC like clock_in, so only the range's partitions are scanned
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date + timedelta(days=1), time.min)
+    adjuster = aliased(Employee)
+
+    stmt = (db.select(Attendance.id, Attendance.employee_id, Employee.name,
+                      Attendance.clock_in, Attendance.clock_out,
+                      Attendance.work_duration_minutes, adjuster.name,
+                      Attendance.adjustment_note, Attendance.ip_address)
+            .join(Employee, Employee.id == Attendance.employee_id)
+            .outerjoin(adjuster, adjuster.id == Attendance.adjusted_by)
+            .where(Attendance.clock_in >= start, Attendance.clock_in < end)
+            .order_by(Attendance.clock_in, Attendance.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE))
+    if employee_id:
+        stmt = stmt.where(Attendance.employee_id == employee_id)
+
+    rows = db.session.execute(stmt)
+    archived = archived_periods_between(start_date, end_date)
+    if archived:
+        rows = heapq.merge(rows, _archived_timesheet_rows(archived, start, end, employee_id),
+                           key=lambda r: (r[3], r[0]))
+    yield from rows
+
+
+def _archived_timesheet_rows(periods, start, end, employee_id=None):
+    """iter_timesheet_rows tuples from archive files, ordered by (clock_in, id)."""
+    for period in periods:
+        rows = sorted((r for r in read_month(period, employee_id or None) if start <= r[3] < end),
+                      key=lambda r: (r[3], r[0]))
+        for r in rows:
+            yield (r[0], r[1], r[2], r[3], r[4], r[5], r[7], r[8], r[9])
+
+
+def _timesheet_csv_rows(start_date, end_date, employee_id=None):
+    yield TIMESHEET_HEADERS
+
+    for (record_id, emp_id, name, clock_in, clock_out,
+         minutes, adjuster_name, note, ip_address) in iter_timesheet_rows(start_date, end_date, employee_id):
+        yield [
+            record_id, emp_id, name,
+            clock_in.strftime('%Y-%m-%d %H:%M:%S'),
+            clock_out.strftime('%Y-%m-%d %H:%M:%S') if clock_out else '',
+            minutes if minutes is not None else '',
+            f'{minutes / 60:.2f}' if minutes is not None else '',
+            adjuster_name or '', note or '', ip_address or '',
+        ]
+
+
+def iter_timesheet_csv(start_date, end_date, employee_id=None):
+    """Yield a shift-level timesheet CSV in chunks, for streaming responses."""
+    return _csv_chunks(_timesheet_csv_rows(start_date, end_date, employee_id))
+
+
+def generate_payroll_excel(year, month, detail=False):
     """Generate an Excel file for payroll data.
 
+    Built with the write-only engine in excel_service. With detail=True the
+    workbook gets one extra sheet per employee listing the month's shifts,
+    streamed from the database.
+
     Returns:
-        io.BytesIO: Excel content ready for download.
+        file object: spooled temporary file, rewound, ready for download.
     """
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    from app.services import excel_service as xl
 
-    summaries = get_all_employees_monthly_summary(year, month)
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f'Payroll {year}-{month:02d}'
-
-    # Styles
-    header_font = Font(bold=True, color='FFFFFF', size=11)
-    header_fill = PatternFill(start_color='1F2937', end_color='1F2937', fill_type='solid')
-    currency_format = '$#,##0.00'
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+    summaries = get_payroll_period(year, month).summaries
+    wb = xl.new_workbook()
+    ws = wb.create_sheet(title=f'Payroll {year}-{month:02d}')
+
+    rows = [[
+        s['employee_id'], s['employee_name'], s['email'],
+        s['hourly_rate'], s['total_hours'], s['regular_hours'],
+        s['overtime_hours'], s['regular_pay'], s['overtime_pay'], s['total_pay']
+    ] for s in summaries]
+    totals = [sum(row[col] for row in rows) for col in range(4, 10)]
+
+    xl.set_column_widths(ws, xl.measure_widths(PAYROLL_HEADERS, rows + [['', '', '', 'TOTALS', *totals]]))
 
     # Title
-    ws.merge_cells('A1:J1')
-    title_cell = ws['A1']
-    title_cell.value = f'WorkClock Payroll Report — {year}-{month:02d}'
-    title_cell.font = Font(bold=True, size=14)
-    title_cell.alignment = Alignment(horizontal='center')
+    ws.append([xl.styled(ws, f'WorkClock Payroll Report — {year}-{month:02d}', 'wc_title')])
+    ws.merged_cells.add('A1:J1')
+    ws.append([])
 
     # Headers
-    headers = [
-        'Employee ID', 'Employee Name', 'Email', 'Hourly Rate',
-        'Total Hours', 'Regular Hours', 'Overtime Hours',
-        'Regular Pay', 'Overtime Pay (1.5x)', 'Total Pay'
-    ]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-        cell.border = thin_border
+    ws.append([xl.styled(ws, header, 'wc_header') for header in PAYROLL_HEADERS])
 
     # Data
-    for row_idx, s in enumerate(summaries, 4):
-        data = [
-            s['employee_id'], s['employee_name'], s['email'],
-            s['hourly_rate'], s['total_hours'], s['regular_hours'],
-            s['overtime_hours'], s['regular_pay'], s['overtime_pay'], s['total_pay']
-        ]
-        for col, value in enumerate(data, 1):
-            cell = ws.cell(row=row_idx, column=col, value=value)
-            cell.border = thin_border
-            if col >= 4:
-                cell.number_format = currency_format if col in (4, 8, 9, 10) else '0.00'
+    for row in rows:
+        ws.append([
+            xl.styled(ws, value, 'wc_currency' if col in (4, 8, 9, 10)
+                      else 'wc_hours' if col >= 4 else 'wc_text')
+            for col, value in enumerate(row, 1)
+        ])
 
     # Totals row
-    total_row = len(summaries) + 5
-    ws.cell(row=total_row, column=4, value='TOTALS').font = Font(bold=True)
-    ws.cell(row=total_row, column=5, value=sum(s['total_hours'] for s in summaries)).number_format = '0.00'
-    ws.cell(row=total_row, column=6, value=sum(s['regular_hours'] for s in summaries)).number_format = '0.00'
-    ws.cell(row=total_row, column=7, value=sum(s['overtime_hours'] for s in summaries)).number_format = '0.00'
-    ws.cell(row=total_row, column=8, value=sum(s['regular_pay'] for s in summaries)).number_format = currency_format
-    ws.cell(row=total_row, column=9, value=sum(s['overtime_pay'] for s in summaries)).number_format = currency_format
-    ws.cell(row=total_row, column=10, value=sum(s['total_pay'] for s in summaries)).number_format = currency_format
-
-    # Auto-width columns
-    from openpyxl.utils import get_column_letter
-    for col in range(1, 11):
-        max_length = max(len(str(ws.cell(row=r, column=col).value or '')) for r in range(3, total_row + 1))
-        ws.column_dimensions[get_column_letter(col)].width = max(max_length + 2, 12)
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+    ws.append([])
+    ws.append([None, None, None, xl.styled(ws, 'TOTALS', 'wc_bold')] + [
+        xl.styled(ws, value, 'wc_total_currency' if col >= 8 else 'wc_total_hours')
+        for col, value in enumerate(totals, 5)
+    ])
+
+    if detail:
+        _write_shift_sheets(xl, wb, year, month)
+
+    return xl.save_workbook(wb)
+
+
+def _write_shift_sheets(xl, wb, year, month):
+    """One sheet per active employee with shifts in the month, streamed."""
+    adjuster = aliased(Employee)
+    stmt = (db.select(Attendance.employee_id, Employee.name,
+                      Attendance.id, Attendance.clock_in, Attendance.clock_out,
+                      Attendance.work_duration_minutes, adjuster.name,
+                      Attendance.adjustment_note)
+            .join(Employee, Employee.id == Attendance.employee_id)
+            .outerjoin(adjuster, adjuster.id == Attendance.adjusted_by)
+            .where(Employee.is_active.is_(True), month_shifts(year, month))
+            .order_by(Employee.name, Attendance.employee_id, Attendance.clock_in)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+    used_titles = {f'payroll {year}-{month:02d}'}
+    archived = archived_period(year, month)
+    if archived is None:
+        rows = db.session.execute(stmt)
+    else:
+        names = dict(db.session.execute(
+            db.select(Employee.id, Employee.name).where(Employee.is_active.is_(True))).all())
+        rows = sorted(((r[1], names[r[1]], r[0], r[3], r[4], r[5], r[7], r[8])
+                       for r in read_month(archived) if r[1] in names),
+                      key=lambda r: (r[1], r[0], r[3]))
+    for (employee_id, name), shifts in groupby(rows, key=lambda r: (r[0], r[1])):
+        xl.write_detail_sheet(wb, xl.sheet_title(name, employee_id, used_titles),
+                              (tuple(r[2:]) for r in shifts))
+
+
+def register_period_commands(app):
+    """Register the Flask CLI commands for closing and reopening payroll periods."""
+
+    @app.cli.command('close-period')
+    @click.argument('year', type=int)
+    @click.argument('month', type=click.IntRange(1, 12))
+    def close_period_cmd(year, month):
+        """Snapshot a finished month so its payroll is never recomputed."""
+        try:
+            count = close_period(year, month)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'Closed {year}-{month:02d}: {count} employee rows saved.')
+
+    @app.cli.command('reopen-period')
+    @click.argument('year', type=int)
+    @click.argument('month', type=click.IntRange(1, 12))
+    def reopen_period_cmd(year, month):
+        """Recompute a closed month from attendance and re-save its snapshot."""
+        try:
+            count = reopen_period(year, month)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'Re-saved {year}-{month:02d}: {count} employee rows.')
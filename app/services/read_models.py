@@ -0,0 +1,63 @@
+"""Lightweight read models for listing and reporting paths.
+
+These are Core selects that load the joined columns (employee and
+adjuster names) up front and return plain tuples. No ORM instances are
+built, so there is no identity map and no lazy load per row. Use them
+wherever rows are only displayed; load the ORM entity only when it is
+going to be modified.
+"""
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.models.payroll_snapshot import PayrollSnapshot
+
+
+class ShiftRow(NamedTuple):
+    """An attendance record with its employee's and adjuster's names."""
+    id: int
+    employee_id: int
+    employee_name: str
+    clock_in: datetime
+    clock_out: datetime | None
+    work_duration_minutes: int | None
+    adjusted_by: int | None
+    adjuster_name: str | None
+    adjustment_note: str | None
+
+    @property
+    def is_active(self):
+        return self.clock_out is None
+
+    @property
+    def formatted_duration(self):
+        return Attendance.format_duration(self.work_duration_minutes)
+
+
+def shift_select():
+    """SELECT of ShiftRow columns; add filters and ordering to taste."""
+    adjuster = aliased(Employee, name='adjuster')
+    return (select(Attendance.id, Attendance.employee_id, Employee.name.label('employee_name'),
+                   Attendance.clock_in, Attendance.clock_out, Attendance.work_duration_minutes,
+                   Attendance.adjusted_by, adjuster.name.label('adjuster_name'),
+                   Attendance.adjustment_note)
+            .join(Employee, Employee.id == Attendance.employee_id)
+            .outerjoin(adjuster, adjuster.id == Attendance.adjusted_by))
+
+
+def roster_select():
+    """SELECT of the employee columns shown on roster cards."""
+    return select(Employee.id, Employee.name, Employee.email, Employee.role,
+                  Employee.hourly_rate, Employee.is_active, Employee.created_at,
+                  Employee.deletion_requested_at)
+
+
+def snapshot_select(year, month):
+    """SELECT of a closed month's PayrollSnapshot.SUMMARY_FIELDS, by employee name."""
+    return (select(*(getattr(PayrollSnapshot, key) for key in PayrollSnapshot.SUMMARY_FIELDS))
+            .where(PayrollSnapshot.year == year, PayrollSnapshot.month == month)
+            .order_by(PayrollSnapshot.employee_name))
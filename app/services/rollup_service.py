@@ -0,0 +1,158 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import case, delete, func, select
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.attendance_daily import AttendanceDaily
+from app.models.employee import Employee
+from app.services.archive_service import archived_day_ranges
+from app.services.cache_service import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def _daily_threshold_minutes():
+    return int(current_app.config.get('OVERTIME_DAILY_THRESHOLD', 8) * 60)
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT DO UPDATE for the current dialect."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(AttendanceDaily)
+
+
+def refresh_day(employee_id, day):
+    """Recompute one employee's rollup row for one day from raw shifts.
+
+    Does not commit — call it inside the transaction that changed the
+    shifts so the rollup and attendance stay consistent.
+
+    The employee row is locked first (FOR NO KEY UPDATE, held until
+    commit), so concurrent clock-outs and adjustments of the same employee
+    recompute one after the other: under READ COMMITTED the later one
+    re-reads the shifts after the earlier one committed instead of
+    overwriting its total with a stale sum.
+    """
+    db.session.execute(select(Employee.id).where(Employee.id == employee_id)
+                       .with_for_update(key_share=True))
+
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+
+    total_minutes, shift_count = (db.session.query(
+        func.coalesce(func.sum(Attendance.work_duration_minutes), 0),
+        func.count(Attendance.id))
+        .filter(
+            Attendance.employee_id == employee_id,
+            Attendance.clock_in >= start,
+            Attendance.clock_in < end,
+            Attendance.work_duration_minutes.isnot(None)
+        )
+        .one())
+
+    if not shift_count:
+        db.session.execute(delete(AttendanceDaily).where(
+            AttendanceDaily.employee_id == employee_id,
+            AttendanceDaily.day == day))
+        return
+
+    values = {
+        'total_minutes': total_minutes,
+        'shift_count': shift_count,
+        'overtime_eligible_minutes': max(0, total_minutes - _daily_threshold_minutes()),
+    }
+    stmt = _upsert_statement().values(employee_id=employee_id, day=day, **values)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['employee_id', 'day'], set_=values))
+
+
+def refresh_days_for(record, *extra_days):
+    """Refresh the rollup for the day of a record's clock-in (plus any
+    days it was moved away from)."""
+    days = {record.clock_in.date(), *extra_days}
+    for day in days:
+        refresh_day(record.employee_id, day)
+
+
+def rebuild_chunk(employee_ids, since=None):
+    """Rebuild all rollup rows for a chunk of employees in one transaction."""
+    threshold = _daily_threshold_minutes()
+    day = func.date(Attendance.clock_in)
+    total = func.sum(Attendance.work_duration_minutes)
+
+    source = (db.select(
+        Attendance.employee_id,
+        day,
+        total,
+        func.count(Attendance.id),
+        case((total > threshold, total - threshold), else_=0))
+        .where(Attendance.employee_id.in_(employee_ids),
+               Attendance.work_duration_minutes.isnot(None))
+        .group_by(Attendance.employee_id, day))
+
+    clear = delete(AttendanceDaily).where(AttendanceDaily.employee_id.in_(employee_ids))
+    # Archived months have no shifts left to rebuild from; keep their rollups
+    for first, last in archived_day_ranges():
+        clear = clear.where(~AttendanceDaily.day.between(first, last))
+    if since:
+        source = source.where(Attendance.clock_in >= datetime.combine(since, time.min, tzinfo=timezone.utc))
+        clear = clear.where(AttendanceDaily.day >= since)
+
+    db.session.execute(clear)
+    result = db.session.execute(db.insert(AttendanceDaily).from_select(
+        ['employee_id', 'day', 'total_minutes', 'shift_count', 'overtime_eligible_minutes'],
+        source))
+    db.session.commit()
+    return result.rowcount
+
+
+def rebuild_rollups(app, since=None, chunk_size=200, workers=4):
+    """Backfill or repair attendance_daily, one employee chunk per transaction.
+
+    Chunks run on a small thread pool, each with its own app context and
+    therefore its own session and connection.
+    """
+    employee_ids = [row[0] for row in db.session.query(Employee.id).order_by(Employee.id)]
+    chunks = [employee_ids[i:i + chunk_size] for i in range(0, len(employee_ids), chunk_size)]
+
+    if db.engine.dialect.name == 'sqlite':
+        workers = 1  # SQLite has a single writer
+
+    def run(chunk):
+        with app.app_context():
+            rows = rebuild_chunk(chunk, since)
+            logger.info(f'Rebuilt {rows} rollup rows for employees {chunk[0]}-{chunk[-1]}')
+            return rows
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        rows = sum(pool.map(run, chunks))
+    # Cached month figures (closed months for up to CACHE_CLOSED_MONTH_TTL)
+    # were computed from the old rollups
+    bump_data_version()
+    return rows
+
+
+def register_rollup_command(app):
+    """Register the Flask CLI command for rebuilding the daily rollups."""
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='Only rebuild days on or after this date (YYYY-MM-DD)')
+    @click.option('--chunk-size', type=int, default=200, show_default=True,
+                  help='Employees per transaction')
+    @click.option('--workers', type=int, default=4, show_default=True,
+                  help='Chunks rebuilt in parallel')
+    def rebuild_rollups_cmd(since, chunk_size, workers):
+        """Backfill or repair the attendance_daily rollup table."""
+        since_day = since.date() if since else None
+        click.echo(f'Rebuilding daily rollups{f" since {since_day}" if since_day else ""}...')
+        rows = rebuild_rollups(app, since_day, chunk_size, workers)
+        click.echo(f'Done! {rows} rollup rows written.')
@@ -0,0 +1,260 @@
+"""Hours, overtime and payroll cost over a range of months.
+
+Open months are aggregated from the daily rollups in one grouped query
+and priced the way payroll_service prices a month: active employees at
+their current rate, overtime past OVERTIME_MONTHLY_THRESHOLD hours in
+the month at 1.5x. Closed months keep the employees and rates frozen in
+their snapshot, so a trend never disagrees with a closed payroll.
+
+Weekly buckets (starting Monday, clipped to the range) split each
+month's overtime by when the threshold was crossed, so the weeks of a
+month add up to that month. In a closed month each employee's snapshot
+is spread over the days they worked, in proportion to the live daily
+rollups (evenly over the month if the rollups are gone, e.g. after a
+purge), so its weeks still add up to the snapshot after later edits.
+"""
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import extract, func, tuple_
+
+from app.extensions import db
+from app.models.attendance_daily import AttendanceDaily
+from app.models.employee import Employee
+from app.models.payroll_snapshot import ClosedPeriod, PayrollSnapshot
+from app.services.cache_service import cached_range
+
+GRANULARITIES = ('month', 'week')
+MAX_TREND_MONTHS = 60
+OVERTIME_MULTIPLIER = 1.5
+
+_FIELDS = ('total_hours', 'regular_hours', 'overtime_hours', 'regular_pay', 'overtime_pay', 'total_pay')
+
+
+def _months(start, end):
+    """Every (year, month) from start to end inclusive."""
+    year, month = start
+    months = []
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _month_end(year, month):
+    return (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)) - timedelta(days=1)
+
+
+def _empty():
+    return dict.fromkeys(_FIELDS, 0.0)
+
+
+def _add(bucket, minutes, overtime_minutes, rate):
+    regular_hours = (minutes - overtime_minutes) / 60
+    overtime_hours = overtime_minutes / 60
+    bucket['total_hours'] += minutes / 60
+    bucket['regular_hours'] += regular_hours
+    bucket['overtime_hours'] += overtime_hours
+    bucket['regular_pay'] += regular_hours * rate
+    bucket['overtime_pay'] += overtime_hours * rate * OVERTIME_MULTIPLIER
+
+
+def _rates(months, employee_id):
+    """{(year, month, employee_id): hourly rate} for the employees each month pays.
+
+    Closed months use their snapshot; open months use every active employee.
+    """
+    closed = {(p.year, p.month) for p in ClosedPeriod.query.filter(
+        tuple_(ClosedPeriod.year, ClosedPeriod.month).in_(months))} if months else set()
+
+    rates = {}
+    if closed:
+        query = db.session.query(PayrollSnapshot.year, PayrollSnapshot.month,
+                                 PayrollSnapshot.employee_id, PayrollSnapshot.hourly_rate).filter(
+            tuple_(PayrollSnapshot.year, PayrollSnapshot.month).in_(closed))
+        if employee_id is not None:
+            query = query.filter(PayrollSnapshot.employee_id == employee_id)
+        rates.update(((y, m, emp), float(rate)) for y, m, emp, rate in query)
+
+    query = db.session.query(Employee.id, Employee.hourly_rate).filter(Employee.is_active.is_(True))
+    if employee_id is not None:
+        query = query.filter(Employee.id == employee_id)
+    current = [(emp, float(rate)) for emp, rate in query]
+    for y, m in months:
+        if (y, m) not in closed:
+            rates.update(((y, m, emp), rate) for emp, rate in current)
+    return closed, rates
+
+
+def _closed_month_totals(closed, employee_id):
+    """Snapshot totals per closed month, in one grouped query."""
+    query = (db.session.query(PayrollSnapshot.year, PayrollSnapshot.month,
+                              *(func.sum(getattr(PayrollSnapshot, f)) for f in _FIELDS))
+             .filter(tuple_(PayrollSnapshot.year, PayrollSnapshot.month).in_(closed))
+             .group_by(PayrollSnapshot.year, PayrollSnapshot.month))
+    if employee_id is not None:
+        query = query.filter(PayrollSnapshot.employee_id == employee_id)
+    return {(y, m): dict(zip(_FIELDS, (float(v or 0) for v in values))) for y, m, *values in query}
+
+
+def _monthly(months, employee_id):
+    closed, rates = _rates(months, employee_id)
+    threshold = current_app.config.get('OVERTIME_MONTHLY_THRESHOLD', 160)
+    first, last = months[0], months[-1]
+
+    year = extract('year', AttendanceDaily.day)
+    month = extract('month', AttendanceDaily.day)
+    query = (db.session.query(AttendanceDaily.employee_id, year, month,
+                              func.sum(AttendanceDaily.total_minutes))
+             .filter(AttendanceDaily.day >= date(*first, 1),
+                     AttendanceDaily.day <= _month_end(*last))
+             .group_by(AttendanceDaily.employee_id, year, month))
+    if employee_id is not None:
+        query = query.filter(AttendanceDaily.employee_id == employee_id)
+
+    buckets = {m: _empty() for m in months}
+    for emp, y, m, minutes in query:
+        y, m = int(y), int(m)
+        rate = rates.get((y, m, emp))
+        if (y, m) in closed or rate is None:
+            continue
+        # Same rounding as payroll_service._summary_row, so months match payroll
+        total_hours = round((minutes or 0) / 60, 2)
+        overtime_hours = max(0, total_hours - threshold)
+        regular_hours = total_hours - overtime_hours
+        bucket = buckets[(y, m)]
+        bucket['total_hours'] += total_hours
+        bucket['regular_hours'] += regular_hours
+        bucket['overtime_hours'] += overtime_hours
+        bucket['regular_pay'] += round(regular_hours * rate, 2)
+        bucket['overtime_pay'] += round(overtime_hours * rate * OVERTIME_MULTIPLIER, 2)
+
+    if closed:
+        buckets.update(_closed_month_totals(closed, employee_id))
+    return [(f'{y}-{m:02d}', date(y, m, 1), _month_end(y, m), buckets[(y, m)]) for y, m in months]
+
+
+def _closed_employee_months(closed, employee_id):
+    """Snapshot rows of the closed months, keyed by (employee_id, year, month)."""
+    if not closed:
+        return {}
+    query = PayrollSnapshot.query.filter(tuple_(PayrollSnapshot.year, PayrollSnapshot.month).in_(closed))
+    if employee_id is not None:
+        query = query.filter(PayrollSnapshot.employee_id == employee_id)
+    return {(s.employee_id, s.year, s.month): s for s in query}
+
+
+def _spread_snapshot(buckets, snapshot, days):
+    """Add one employee's closed month to the weeks, day by day.
+
+    Each of the (day, minutes) rollup days gets its share of the snapshot's
+    hours; overtime starts on the day the snapshot's regular hours run out,
+    and pay follows the hours, so the days add up to the snapshot exactly.
+    """
+    days = [(day, minutes) for day, minutes in days if minutes]
+    if not days:
+        days = [(date(snapshot.year, snapshot.month, d), 1)
+                for d in range(1, _month_end(snapshot.year, snapshot.month).day + 1)]
+    live_minutes = sum(minutes for _, minutes in days)
+    total_hours, regular_hours = float(snapshot.total_hours), float(snapshot.regular_hours)
+    overtime_hours = float(snapshot.overtime_hours)
+
+    worked = 0.0
+    for day, minutes in days:
+        hours = total_hours * minutes / live_minutes
+        overtime = min(hours, max(0.0, worked + hours - regular_hours))
+        worked += hours
+        bucket = buckets[day - timedelta(days=day.weekday())]
+        bucket['total_hours'] += hours
+        bucket['regular_hours'] += hours - overtime
+        bucket['overtime_hours'] += overtime
+        if regular_hours:
+            bucket['regular_pay'] += float(snapshot.regular_pay) * (hours - overtime) / regular_hours
+        if overtime_hours:
+            bucket['overtime_pay'] += float(snapshot.overtime_pay) * overtime / overtime_hours
+
+
+def _weekly(months, employee_id):
+    closed, rates = _rates(months, employee_id)
+    snapshots = _closed_employee_months(closed, employee_id)
+    threshold_minutes = current_app.config.get('OVERTIME_MONTHLY_THRESHOLD', 160) * 60
+    first_day, last_day = date(*months[0], 1), _month_end(*months[-1])
+
+    query = (db.session.query(AttendanceDaily.employee_id, AttendanceDaily.day,
+                              AttendanceDaily.total_minutes)
+             .filter(AttendanceDaily.day >= first_day, AttendanceDaily.day <= last_day)
+             .order_by(AttendanceDaily.employee_id, AttendanceDaily.day))
+    if employee_id is not None:
+        query = query.filter(AttendanceDaily.employee_id == employee_id)
+
+    week_start = first_day - timedelta(days=first_day.weekday())
+    buckets = {}
+    while week_start <= last_day:
+        buckets[week_start] = _empty()
+        week_start += timedelta(days=7)
+
+    # Minutes worked so far in each employee's month, to find the overtime crossover
+    worked = {}
+    closed_days = {key: [] for key in snapshots}
+    for emp, day, minutes in query:
+        if (day.year, day.month) in closed:
+            closed_days.get((emp, day.year, day.month), []).append((day, minutes))
+            continue
+        rate = rates.get((day.year, day.month, emp))
+        if rate is None:
+            continue
+        month_key = (emp, day.year, day.month)
+        before = worked.get(month_key, 0)
+        worked[month_key] = before + minutes
+        overtime = min(minutes, max(0, before + minutes - threshold_minutes))
+        _add(buckets[day - timedelta(days=day.weekday())], minutes, overtime, rate)
+    for key, snapshot in snapshots.items():
+        _spread_snapshot(buckets, snapshot, closed_days[key])
+
+    return [(f'{start:%G-W%V}', max(start, first_day), min(start + timedelta(days=6), last_day), bucket)
+            for start, bucket in buckets.items()]
+
+
+def get_trends(start, end, granularity='month', employee_id=None):
+    """Totals per month or week from start to end, company-wide or for one employee.
+
+    Args:
+        start, end: (year, month) of the first and last month, inclusive.
+        granularity: 'month' or 'week'.
+
+    Returns:
+        dict: {granularity, start, end, employee_id, buckets, totals}; each
+        bucket has period, start, end and the hours and pay fields.
+
+    Raises:
+        ValueError: for an empty or too long range, or an unknown granularity.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Granularity must be one of: {", ".join(GRANULARITIES)}.')
+    if end < start:
+        raise ValueError('End month must not be before start month.')
+    months = _months(start, end)
+    if len(months) > MAX_TREND_MONTHS:
+        raise ValueError(f'Trends cover at most {MAX_TREND_MONTHS} months.')
+
+    def compute():
+        rows = (_monthly if granularity == 'month' else _weekly)(months, employee_id)
+        buckets = []
+        totals = _empty()
+        for period, first, last, values in rows:
+            values['total_pay'] = values['regular_pay'] + values['overtime_pay']
+            for key in _FIELDS:
+                totals[key] += values[key]
+            buckets.append({'period': period, 'start': first.isoformat(), 'end': last.isoformat(),
+                            **{key: round(values[key], 2) for key in _FIELDS}})
+        return {
+            'granularity': granularity,
+            'start': f'{start[0]}-{start[1]:02d}',
+            'end': f'{end[0]}-{end[1]:02d}',
+            'employee_id': employee_id,
+            'buckets': buckets,
+            'totals': {key: round(value, 2) for key, value in totals.items()},
+        }
+
+    label = f'{start[0]}-{start[1]:02d}:{end[0]}-{end[1]:02d}:{granularity}:{employee_id or "all"}'
+    return cached_range('trends', label, months, compute)
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt as _bcrypt
+from flask import current_app
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pool = None
+_slots = None
+_pool_pid = None
+_workers = 0
+_in_flight = 0
+
+
+class VerificationBusy(Exception):
+    """Raised when the verification queue is full or a check times out."""
+
+
+def _checkpw(pw_hash, password):
+    """Run the bcrypt comparison. pyca/bcrypt releases the GIL while hashing,
+    so checks running on pool threads use separate cores."""
+    return _bcrypt.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+
+
+def _get_pool():
+    """Create the pool lazily, once per process (gunicorn forks workers)."""
+    global _pool, _slots, _pool_pid, _workers, _in_flight
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool, _slots
+
+    with _lock:
+        if _pool is None or _pool_pid != pid:
+            _workers = current_app.config.get('VERIFY_POOL_WORKERS') or os.cpu_count() or 1
+            queue_size = current_app.config.get('VERIFY_QUEUE_SIZE', 16)
+            _pool = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix='verify')
+            _slots = threading.BoundedSemaphore(_workers + queue_size)
+            _pool_pid = pid
+            _in_flight = 0
+            metrics.register_gauge('verify_queue_depth', get_queue_depth)
+            metrics.register_gauge('verify_in_flight', lambda: _in_flight)
+    return _pool, _slots
+
+
+def get_queue_depth():
+    """Number of checks waiting for a free pool thread in this process."""
+    return max(0, _in_flight - _workers)
+
+
+def verify(pw_hash, password):
+    """Check a password or PIN against a bcrypt hash on the verification pool.
+
+    Admission is bounded: when the pool and its queue are full the check is
+    rejected immediately with VerificationBusy, which the app turns into a
+    503 with Retry-After instead of letting requests pile up behind bcrypt.
+    """
+    global _in_flight
+    if not pw_hash or not password:
+        return False
+
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        metrics.incr('verify_rejected')
+        logger.warning('Verification queue full; rejecting request')
+        raise VerificationBusy('Verification queue is full.')
+
+    with _lock:
+        _in_flight += 1
+    started = time.perf_counter()
+
+    def _release(_future):
+        # Runs when the check really finishes, so a timed-out check keeps
+        # its slot until bcrypt is done with the pool thread.
+        global _in_flight
+        with _lock:
+            _in_flight -= 1
+        slots.release()
+        metrics.observe('verify', time.perf_counter() - started)
+
+    try:
+        future = pool.submit(_checkpw, pw_hash, password)
+    except Exception:
+        _release(None)
+        raise
+    future.add_done_callback(_release)
+    metrics.incr('verify_total')
+
+    try:
+        return future.result(timeout=current_app.config.get('VERIFY_TIMEOUT', 5))
+    except FutureTimeout:
+        future.cancel()
+        metrics.incr('verify_timeouts')
+        raise VerificationBusy('Verification timed out.')
+    except ValueError:
+        # Malformed hash stored in the database
+        return False
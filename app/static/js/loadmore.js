@@ -0,0 +1,46 @@
+/**
+ * WorkClock "Load more" links
+ * Links carry the page URL in href (works without JS) and the JSON
+ * endpoint in data-load-more; the returned html is appended to
+ * data-target and the link follows next_cursor until the last page.
+ */
+(function () {
+    function withCursor(raw, cursor) {
+        const url = new URL(raw, window.location.href);
+        url.searchParams.set('cursor', cursor);
+        return url.toString();
+    }
+
+    document.querySelectorAll('a[data-load-more]').forEach(function (link) {
+        const target = document.getElementById(link.dataset.target);
+        if (!target) return;
+
+        link.addEventListener('click', function (event) {
+            event.preventDefault();
+            if (link.dataset.loading) return;
+            link.dataset.loading = '1';
+
+            fetch(link.dataset.loadMore, {headers: {'Accept': 'application/json'}})
+                .then(function (response) {
+                    if (!response.ok) throw new Error(response.statusText);
+                    return response.json();
+                })
+                .then(function (page) {
+                    target.insertAdjacentHTML('beforeend', page.html);
+                    if (!page.next_cursor) {
+                        link.parentElement.remove();
+                        return;
+                    }
+                    link.href = withCursor(link.href, page.next_cursor);
+                    link.dataset.loadMore = withCursor(link.dataset.loadMore, page.next_cursor);
+                })
+                .catch(function () {
+                    // Fall back to a full page load of the next page
+                    window.location.href = link.href;
+                })
+                .finally(function () {
+                    delete link.dataset.loading;
+                });
+        });
+    });
+})();
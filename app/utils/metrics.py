@@ -0,0 +1,84 @@
+"""Lightweight in-process metrics.
+
+Each gunicorn worker keeps its own counters, latency windows and gauges;
+/api/metrics reports the numbers of whichever worker served the request.
+"""
+import functools
+import threading
+import time
+from collections import deque
+
+_lock = threading.Lock()
+_counters = {}
+_latencies = {}
+_gauges = {}
+
+LATENCY_WINDOW = 1000
+
+
+def incr(name, amount=1):
+    """Increment a named counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name, seconds):
+    """Record one latency sample (in seconds) for a named code path."""
+    with _lock:
+        window = _latencies.get(name)
+        if window is None:
+            window = _latencies[name] = deque(maxlen=LATENCY_WINDOW)
+        window.append(seconds)
+
+
+def timed(name):
+    """Decorator: record each call's wall time under a latency name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def register_gauge(name, func):
+    """Register a callable that returns the current value of a gauge."""
+    with _lock:
+        _gauges[name] = func
+
+
+def _percentile(sorted_samples, pct):
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def snapshot():
+    """Return all counters, gauges and latency summaries as a dict."""
+    with _lock:
+        counters = dict(_counters)
+        latencies = {name: sorted(window) for name, window in _latencies.items()}
+        gauges = dict(_gauges)
+
+    summary = {}
+    for name, samples in latencies.items():
+        if not samples:
+            continue
+        summary[name] = {
+            'count': len(samples),
+            'p50_ms': round(_percentile(samples, 50) * 1000, 2),
+            'p99_ms': round(_percentile(samples, 99) * 1000, 2),
+            'max_ms': round(samples[-1] * 1000, 2),
+        }
+
+    gauge_values = {}
+    for name, func in gauges.items():
+        try:
+            gauge_values[name] = func()
+        except Exception:
+            gauge_values[name] = None
+
+    return {'counters': counters, 'gauges': gauge_values, 'latency': summary}
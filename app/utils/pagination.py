@@ -0,0 +1,90 @@
+"""Keyset (cursor) pagination.
+
+Pages are selected with a row-value comparison on the sort key plus the
+primary key, e.g. WHERE (clock_in, id) < (:clock_in, :id), so each page
+is an index range scan no matter how deep the client has scrolled. The
+cursor is an opaque, URL-safe token holding the last row's sort key.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import NamedTuple
+
+from sqlalchemy import tuple_
+
+from app.extensions import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: str | None
+
+
+def page_size(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a requested page size to 1..maximum."""
+    if not raw:
+        return default
+    return max(1, min(int(raw), maximum))
+
+
+def encode_cursor(*values):
+    def default(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+    raw = json.dumps(values, default=default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Decode a cursor into its list of key values.
+
+    Raises:
+        ValueError: if the token is malformed or has the wrong arity.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor.') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor.')
+    return values
+
+
+def keyset_page(stmt, columns, after, limit, key, descending=False, row_type=None):
+    """Fetch one page of a Core select ordered by columns.
+
+    Args:
+        columns: sort key columns, ending with a unique tie-breaker (id).
+        after: decoded cursor values of the previous page's last row, or None.
+        key: row -> tuple of that row's values for columns.
+        descending: newest/largest first.
+        row_type: optional NamedTuple to build each row as (row_type(*row)).
+    """
+    if after is not None:
+        bound = tuple_(*columns)
+        stmt = stmt.where(bound < tuple_(*after) if descending else bound > tuple_(*after))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = db.session.execute(stmt.order_by(*order).limit(limit + 1)).all()
+    if row_type is not None:
+        rows = [row_type(*row) for row in rows]
+
+    items = rows[:limit]
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    return Page(items, next_cursor)
+
+
+def list_page(rows, after, limit, key, descending=False):
+    """keyset_page over rows already in memory (e.g. read from an archive)."""
+    rows = sorted(rows, key=key, reverse=descending)
+    if after is not None:
+        after = tuple(after)
+        rows = [r for r in rows if (key(r) < after if descending else key(r) > after)]
+    items = rows[:limit]
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    return Page(items, next_cursor)
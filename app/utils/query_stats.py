@@ -0,0 +1,126 @@
+"""Per-request SQL statement counts and timings.
+
+Cursor-execute events on every Engine add each statement's count and
+duration to the current request (flask.g). When the response goes out
+the totals are logged as one logfmt line, reported in a Server-Timing
+header (visible in the browser's network panel) and compared against
+QUERY_BUDGET.
+
+Statements run while a streamed body (CSV export, SSE) is being sent
+happen after the response headers and are not included.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.extensions import db
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statement budgets checked by tests/test_query_budgets.py; {id} is filled
+# with a real employee. Tighten these when a page gets cheaper.
+ENDPOINT_BUDGETS = {
+    '/dashboard/': 6,
+    '/dashboard/employees': 4,
+    '/dashboard/employee/{id}': 7,
+    '/api/employees': 4,
+    '/api/employees/{id}/attendance': 4,
+    '/api/trends': 6,
+    '/employee/dashboard': 3,
+}
+
+
+class QueryStats:
+    __slots__ = ('count', 'seconds', 'started')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.started = time.perf_counter()
+
+
+# The start time lives on the statement's execution context, not on the
+# pooled connection: a statement that raises never reaches
+# after_cursor_execute, and its context is simply discarded
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+
+def init_query_stats(app):
+    """Count statements per request and report them on the response."""
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.seconds * 1000
+
+        response.headers.add('Server-Timing', f'db;desc="{stats.count} queries";dur={db_ms:.1f}')
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+        metrics.incr('sql_queries', stats.count)
+        metrics.observe('request_db_time', stats.seconds)
+
+        line = (f'method={request.method} path={request.path} endpoint={request.endpoint} '
+                f'status={response.status_code} queries={stats.count} '
+                f'db_ms={db_ms:.1f} total_ms={total_ms:.1f}')
+        budget = app.config.get('QUERY_BUDGET', 20)
+        if budget and stats.count > budget:
+            metrics.incr('query_budget_exceeded')
+            logger.warning(f'{line} over_budget={budget}')
+        else:
+            logger.info(line)
+        return response
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail if the block runs more than limit SQL statements.
+
+    with assert_max_queries(5):
+        client.get('/dashboard/')
+
+    Raises:
+        AssertionError: listing the statements that were run.
+    """
+    engine = engine or db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    if len(statements) > limit:
+        listing = '\n'.join(f'  {i}. {" ".join(s.split())[:200]}' for i, s in enumerate(statements, 1))
+        raise AssertionError(f'{len(statements)} queries, expected at most {limit}:\n{listing}')
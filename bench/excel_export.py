@@ -0,0 +1,100 @@
+"""Benchmark: in-memory vs write-only Excel export of shift detail sheets.
+
+Compares the previous export approach (an in-memory workbook with
+per-cell styles and a second pass to size the columns) against
+excel_service's write-only path, on synthetic shifts.
+
+Usage:
+    python bench/excel_export.py [--rows 10000 --rows 1000000] [--legacy-limit 200000]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+from openpyxl.styles import Font  # noqa: E402
+from openpyxl.utils import get_column_letter  # noqa: E402
+
+from app.services.excel_service import (  # noqa: E402
+    DETAIL_COLUMNS, MIN_COLUMN_WIDTH, TIMESTAMP_FORMAT,
+    new_workbook, save_workbook, write_detail_sheet,
+)
+
+
+def synthetic_shifts(count):
+    start = datetime(2020, 1, 1, 8, 0)
+    for i in range(count):
+        clock_in = start + timedelta(hours=12 * i)
+        minutes = 420 + i % 180
+        yield (i + 1, clock_in, clock_in + timedelta(minutes=minutes), minutes,
+               'Admin Manager' if i % 50 == 0 else None,
+               'Corrected missed clock-out' if i % 50 == 0 else None)
+
+
+def legacy_detail_export(count):
+    """The previous approach: in-memory workbook, per-cell styles, then a
+    second pass over every cell to size the columns."""
+    wb = Workbook()
+    ws = wb.active
+    header_font = Font(bold=True, color='FFFFFF', size=11)
+    for col, (header, _) in enumerate(DETAIL_COLUMNS, 1):
+        ws.cell(row=1, column=col, value=header).font = header_font
+    for row_idx, shift in enumerate(synthetic_shifts(count), 2):
+        record_id, clock_in, clock_out, minutes, adjuster_name, note = shift
+        values = [record_id, clock_in, clock_out, minutes, round(minutes / 60, 2), adjuster_name, note]
+        for col, value in enumerate(values, 1):
+            cell = ws.cell(row=row_idx, column=col, value=value)
+            if col in (2, 3):
+                cell.number_format = TIMESTAMP_FORMAT
+    for col in range(1, len(DETAIL_COLUMNS) + 1):
+        max_length = max(len(str(ws.cell(row=r, column=col).value or '')) for r in range(1, count + 2))
+        ws.column_dimensions[get_column_letter(col)].width = max(max_length + 2, MIN_COLUMN_WIDTH)
+    output = io.BytesIO()
+    wb.save(output)
+    return output
+
+
+def write_only_detail_export(count):
+    wb = new_workbook()
+    write_detail_sheet(wb, 'Shifts', synthetic_shifts(count))
+    return save_workbook(wb)
+
+
+def measure(func, count):
+    tracemalloc.start()
+    started = time.perf_counter()
+    output = func(count)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    output.seek(0, 2)
+    size = output.tell()
+    output.close()
+    return f'{elapsed:8.2f}s  peak {peak / 2**20:8.1f} MiB  file {size / 2**20:7.1f} MiB'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append',
+                        help='Shift rows to export (repeatable; default: 10000 and 1000000)')
+    parser.add_argument('--legacy-limit', type=int, default=200_000,
+                        help='Skip the in-memory path above this many rows (default: 200000)')
+    args = parser.parse_args()
+
+    for count in args.rows or [10_000, 1_000_000]:
+        print(f'{count:,} rows')
+        if count <= args.legacy_limit:
+            print(f'  in-memory   {measure(legacy_detail_export, count)}')
+        else:
+            print('  in-memory   skipped (above --legacy-limit)')
+        print(f'  write-only  {measure(write_only_detail_export, count)}')
+
+
+if __name__ == '__main__':
+    main()
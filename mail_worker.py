@@ -0,0 +1,33 @@
+"""Standalone outbound email sender.
+
+Drains the Redis mail queue over a single long-lived SMTP connection.
+Run it as its own process/container, like scheduler.py; web workers
+only enqueue messages.
+
+Usage:
+    python mail_worker.py [worker-name]
+
+The worker name (default: hostname) keys its in-flight list, so a
+restarted sender with the same name picks up anything it had claimed.
+"""
+import logging
+import sys
+
+from app import create_app
+from app.services.mail_queue_service import MailSender
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+)
+logger = logging.getLogger('workclock.mail_worker')
+
+
+def main():
+    app = create_app()
+    sender = MailSender(app, worker_name=sys.argv[1] if len(sys.argv) > 1 else None)
+    sender.run()
+
+
+if __name__ == '__main__':
+    main()
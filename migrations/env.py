@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from app.services.partition_service import PARTITION_NAME_RE
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -97,6 +99,19 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # the monthly attendance partitions and their open-shift indexes
+        # (which replace uq_attendance_open_shift on PostgreSQL) are managed
+        # by app.services.partition_service, not by the models
+        partitioned = connection.dialect.name == 'postgresql'
+
+        def include_object(object, name, type_, reflected, compare_to):
+            if type_ in ('table', 'index') and name and PARTITION_NAME_RE.match(name):
+                return False
+            if partitioned and type_ == 'index' and name == 'uq_attendance_open_shift':
+                return False
+            return True
+
+        conf_args.setdefault('include_object', include_object)
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
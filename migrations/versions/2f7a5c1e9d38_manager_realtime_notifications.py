@@ -0,0 +1,27 @@
+"""Per-manager opt-in for real-time clock notifications
+
+Revision ID: 2f7a5c1e9d38
+Revises: 9b4f2d6e8a13
+Create Date: 2026-10-17 16:20:31.507944
+
+Existing managers default to the periodic digest.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f7a5c1e9d38'
+down_revision = '9b4f2d6e8a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('notify_realtime', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_column('notify_realtime')
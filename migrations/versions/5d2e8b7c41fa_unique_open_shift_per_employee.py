@@ -0,0 +1,52 @@
+"""Allow at most one open shift per employee
+
+Revision ID: 5d2e8b7c41fa
+Revises: a3c91f0d52e4
+Create Date: 2026-10-17 10:03:26.540911
+
+Duplicate open shifts left behind by earlier clock races are closed with a
+zero duration (keeping the newest one open) so the partial unique index
+can be built. Affected rows are tagged in adjustment_note for review.
+
+The clean-up commits in its own transaction; on PostgreSQL the index is
+then built CONCURRENTLY outside any transaction, so clock-ins and
+clock-outs are not blocked while it scans attendance. A clock race in
+between can still leave a duplicate, in which case the build fails with
+an INVALID index behind: drop it and re-run the migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8b7c41fa'
+down_revision = 'a3c91f0d52e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        UPDATE attendance
+        SET clock_out = clock_in,
+            work_duration_minutes = 0,
+            adjustment_note = COALESCE(adjustment_note || ' | ', '')
+                              || 'Duplicate open shift closed by migration'
+        WHERE clock_out IS NULL
+          AND id NOT IN (SELECT MAX(id) FROM attendance
+                         WHERE clock_out IS NULL
+                         GROUP BY employee_id)
+    """)
+
+    # autocommit_block commits the UPDATE above before the index build starts
+    with op.get_context().autocommit_block():
+        op.create_index('uq_attendance_open_shift', 'attendance', ['employee_id'], unique=True,
+                        postgresql_where=sa.text('clock_out IS NULL'),
+                        sqlite_where=sa.text('clock_out IS NULL'),
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('uq_attendance_open_shift', table_name='attendance',
+                      postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""Archived attendance periods
+
+Revision ID: 6c1e8f4b2a97
+Revises: d5a9e2c7f130
+Create Date: 2026-10-17 19:41:07.553812
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1e8f4b2a97'
+down_revision = 'd5a9e2c7f130'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_periods',
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('format', sa.String(length=16), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('total_minutes', sa.BigInteger(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['year', 'month'], ['payroll_periods.year', 'payroll_periods.month'], ),
+    sa.PrimaryKeyConstraint('year', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('archived_periods')
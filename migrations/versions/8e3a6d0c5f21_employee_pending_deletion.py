@@ -0,0 +1,26 @@
+"""Pending-deletion marker on employees
+
+Revision ID: 8e3a6d0c5f21
+Revises: f2b7d4a19c60
+Create Date: 2026-10-17 21:14:52.087436
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3a6d0c5f21'
+down_revision = 'f2b7d4a19c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deletion_requested_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_column('deletion_requested_at')
@@ -0,0 +1,48 @@
+"""Closed payroll periods and their snapshots
+
+Revision ID: 9b4f2d6e8a13
+Revises: e46b0d7a9c12
+Create Date: 2026-10-17 15:02:44.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4f2d6e8a13'
+down_revision = 'e46b0d7a9c12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payroll_periods',
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=False),
+    sa.Column('closed_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['closed_by'], ['employees.id'], ),
+    sa.PrimaryKeyConstraint('year', 'month')
+    )
+    op.create_table('payroll_snapshots',
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('employee_name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('hourly_rate', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_hours', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('regular_hours', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('overtime_hours', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('regular_pay', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('overtime_pay', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total_pay', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('year', 'month', 'employee_id')
+    )
+
+
+def downgrade():
+    op.drop_table('payroll_snapshots')
+    op.drop_table('payroll_periods')
@@ -0,0 +1,32 @@
+"""Add indexed PIN lookup column to employees
+
+Revision ID: a3c91f0d52e4
+Revises: 7757d77864e9
+Create Date: 2026-10-17 09:12:40.118302
+
+pin_lookup is a keyed HMAC of the PIN and cannot be derived from the
+existing bcrypt hashes, so it starts out NULL. Employee.find_by_pin
+backfills it the next time each PIN is used, and set_pin fills it
+whenever a PIN is reset.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91f0d52e4'
+down_revision = '7757d77864e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pin_lookup', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_employees_pin_lookup'), ['pin_lookup'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_employees_pin_lookup'))
+        batch_op.drop_column('pin_lookup')
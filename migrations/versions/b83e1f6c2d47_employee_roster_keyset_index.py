@@ -0,0 +1,31 @@
+"""Index for keyset pagination of the employee roster
+
+Revision ID: b83e1f6c2d47
+Revises: 2f7a5c1e9d38
+Create Date: 2026-10-17 17:05:12.318806
+
+The roster pages on (name, id). Attendance pages on (clock_in, id) within
+one employee and month, which ix_attendance_employee_clock_in (employee_id,
+clock_in) already serves. Built CONCURRENTLY on PostgreSQL like the other
+hot-query indexes (c81f4a9e03b7).
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83e1f6c2d47'
+down_revision = '2f7a5c1e9d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_employees_name_id', 'employees', ['name', 'id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_employees_name_id', table_name='employees',
+                      postgresql_concurrently=True)
@@ -0,0 +1,49 @@
+"""Indexes for the attendance and notification hot queries
+
+Revision ID: c81f4a9e03b7
+Revises: 5d2e8b7c41fa
+Create Date: 2026-10-17 11:20:51.903477
+
+On PostgreSQL every index is built (and the superseded employee_id index
+dropped) with CONCURRENTLY outside the migration transaction, so writes to
+a large attendance table are not blocked during deploy. If a concurrent
+build fails it leaves an INVALID index behind; drop it and re-run.
+
+The open-shift partial index (uq_attendance_open_shift) was added in
+5d2e8b7c41fa and already serves the clock_out IS NULL scans.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4a9e03b7'
+down_revision = '5d2e8b7c41fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_attendance_employee_clock_in', 'attendance',
+                        ['employee_id', 'clock_in'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_attendance_clock_in', 'attendance', ['clock_in'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_notifications_type_sent_at', 'notifications',
+                        ['type', 'sent_at'], unique=False,
+                        postgresql_concurrently=True)
+        # Covered by the (employee_id, clock_in) prefix
+        op.drop_index('ix_attendance_employee_id', table_name='attendance',
+                      postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_attendance_employee_id', 'attendance', ['employee_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.drop_index('ix_notifications_type_sent_at', table_name='notifications',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_attendance_clock_in', table_name='attendance',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_attendance_employee_clock_in', table_name='attendance',
+                      postgresql_concurrently=True)
@@ -0,0 +1,114 @@
+"""Partition attendance by clock_in month (PostgreSQL)
+
+Revision ID: d5a9e2c7f130
+Revises: b83e1f6c2d47
+Create Date: 2026-10-17 18:20:44.902157
+
+Rebuilds attendance as a table partitioned by RANGE (clock_in), with one
+partition per UTC month (attendance_yYYYYmMM) from the oldest shift
+through three months ahead, and a default partition as a safety net.
+Later months are created by partition_service, which the scheduler runs
+daily.
+
+Schema changes that partitioning forces:
+  * The primary key becomes (id, clock_in); ids still come from the same
+    sequence, so they stay unique.
+  * uq_attendance_open_shift cannot span partitions; each partition has
+    its own partial unique index instead, which only sees one month of
+    clock_in. The application keeps one open shift per employee across
+    months by locking the employee row before opening a shift
+    (attendance_service.clock_in).
+
+Rows are copied into the new table in this migration's transaction, so
+attendance is locked for the duration: run it in a maintenance window.
+SQLite has no partitioning and is left unchanged.
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a9e2c7f130'
+down_revision = 'b83e1f6c2d47'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _create_partition(name, bounds):
+    op.execute(f'CREATE TABLE {name} PARTITION OF attendance {bounds}')
+    op.execute(f'CREATE UNIQUE INDEX {name}_open_shift ON {name} (employee_id) WHERE clock_out IS NULL')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute('ALTER TABLE attendance RENAME TO attendance_unpartitioned')
+    op.execute('ALTER TABLE attendance_unpartitioned RENAME CONSTRAINT attendance_pkey '
+               'TO attendance_unpartitioned_pkey')
+    # Not needed on the old table any more; dropping them also speeds up the copy
+    op.drop_index('uq_attendance_open_shift', table_name='attendance_unpartitioned')
+    op.drop_index('ix_attendance_employee_clock_in', table_name='attendance_unpartitioned')
+    op.drop_index('ix_attendance_clock_in', table_name='attendance_unpartitioned')
+
+    op.execute('CREATE TABLE attendance (LIKE attendance_unpartitioned INCLUDING DEFAULTS) '
+               'PARTITION BY RANGE (clock_in)')
+    op.execute('ALTER SEQUENCE attendance_id_seq OWNED BY attendance.id')
+    op.create_primary_key('attendance_pkey', 'attendance', ['id', 'clock_in'])
+    op.create_foreign_key('attendance_employee_id_fkey', 'attendance', 'employees',
+                          ['employee_id'], ['id'])
+    op.create_foreign_key('attendance_adjusted_by_fkey', 'attendance', 'employees',
+                          ['adjusted_by'], ['id'])
+    op.create_index('ix_attendance_employee_clock_in', 'attendance', ['employee_id', 'clock_in'])
+    op.create_index('ix_attendance_clock_in', 'attendance', ['clock_in'])
+
+    oldest = bind.execute(sa.text('SELECT min(clock_in) FROM attendance_unpartitioned')).scalar()
+    now = datetime.now(timezone.utc)
+    year, month = (oldest.year, oldest.month) if oldest else (now.year, now.month)
+    last = (now.year, now.month)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(*last)
+    while (year, month) <= last:
+        following = _next_month(year, month)
+        _create_partition(f'attendance_y{year}m{month:02d}',
+                          f"FOR VALUES FROM ('{year}-{month:02d}-01') "
+                          f"TO ('{following[0]}-{following[1]:02d}-01')")
+        year, month = following
+    _create_partition('attendance_default', 'DEFAULT')
+
+    op.execute('INSERT INTO attendance SELECT * FROM attendance_unpartitioned')
+    op.drop_table('attendance_unpartitioned')
+    op.execute('ANALYZE attendance')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Fails on the unique index below if an employee has open shifts in two
+    # months, which only writes bypassing attendance_service can cause
+    op.execute('CREATE TABLE attendance_unpartitioned (LIKE attendance INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO attendance_unpartitioned SELECT * FROM attendance')
+    op.execute('ALTER SEQUENCE attendance_id_seq OWNED BY attendance_unpartitioned.id')
+    op.drop_table('attendance')  # and every partition with it
+    op.rename_table('attendance_unpartitioned', 'attendance')
+
+    op.create_primary_key('attendance_pkey', 'attendance', ['id'])
+    op.create_foreign_key('attendance_employee_id_fkey', 'attendance', 'employees',
+                          ['employee_id'], ['id'])
+    op.create_foreign_key('attendance_adjusted_by_fkey', 'attendance', 'employees',
+                          ['adjusted_by'], ['id'])
+    op.create_index('uq_attendance_open_shift', 'attendance', ['employee_id'], unique=True,
+                    postgresql_where=sa.text('clock_out IS NULL'))
+    op.create_index('ix_attendance_employee_clock_in', 'attendance', ['employee_id', 'clock_in'])
+    op.create_index('ix_attendance_clock_in', 'attendance', ['clock_in'])
@@ -0,0 +1,50 @@
+"""Daily attendance rollup table
+
+Revision ID: e46b0d7a9c12
+Revises: c81f4a9e03b7
+Create Date: 2026-10-17 12:41:09.337150
+
+The table is backfilled from existing completed shifts. Run
+`flask rebuild-rollups` afterwards to repair it in chunks if needed.
+"""
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = 'e46b0d7a9c12'
+down_revision = 'c81f4a9e03b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_daily',
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total_minutes', sa.Integer(), nullable=False),
+    sa.Column('shift_count', sa.Integer(), nullable=False),
+    sa.Column('overtime_eligible_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+    sa.PrimaryKeyConstraint('employee_id', 'day')
+    )
+
+    threshold = int(current_app.config.get('OVERTIME_DAILY_THRESHOLD', 8) * 60)
+    op.execute(sa.text("""
+        INSERT INTO attendance_daily
+            (employee_id, day, total_minutes, shift_count, overtime_eligible_minutes)
+        SELECT employee_id,
+               date(clock_in),
+               SUM(work_duration_minutes),
+               COUNT(id),
+               CASE WHEN SUM(work_duration_minutes) > :threshold
+                    THEN SUM(work_duration_minutes) - :threshold ELSE 0 END
+        FROM attendance
+        WHERE work_duration_minutes IS NOT NULL
+        GROUP BY employee_id, date(clock_in)
+    """).bindparams(threshold=threshold))
+
+
+def downgrade():
+    op.drop_table('attendance_daily')
@@ -0,0 +1,61 @@
+"""Report-run ledger
+
+Revision ID: f2b7d4a19c60
+Revises: 6c1e8f4b2a97
+Create Date: 2026-10-17 20:32:18.640215
+
+Months whose monthly report was already logged in notifications
+('Monthly report for YYYY-MM') are backfilled as sent, so the first run
+after deploying does not send them again.
+
+ix_notifications_type_sent_at is dropped (concurrently on PostgreSQL):
+it served the monthly report's LIKE scan of notifications, which the
+ledger replaces, and pruning walks the primary key instead, so it was
+only write overhead on that table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7d4a19c60'
+down_revision = '6c1e8f4b2a97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_runs',
+    sa.Column('report_type', sa.String(length=30), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('employee_count', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('report_type', 'year', 'month')
+    )
+    op.execute("""
+        INSERT INTO report_runs (report_type, year, month, status, attempts,
+                                 started_at, finished_at, employee_count)
+        SELECT 'monthly_summary',
+               CAST(substr(message, 20, 4) AS INTEGER),
+               CAST(substr(message, 25, 2) AS INTEGER),
+               'sent', 1, coalesce(min(sent_at), CURRENT_TIMESTAMP), max(sent_at), count(*)
+        FROM notifications
+        WHERE type = 'monthly_summary' AND message LIKE 'Monthly report for ____-__'
+        GROUP BY substr(message, 20, 4), substr(message, 25, 2)
+    """)
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_notifications_type_sent_at', table_name='notifications',
+                      postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_notifications_type_sent_at', 'notifications',
+                        ['type', 'sent_at'], unique=False,
+                        postgresql_concurrently=True)
+    op.drop_table('report_runs')
@@ -9,6 +9,7 @@ Usage:
 import logging
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from app import create_app
 
@@ -38,6 +39,85 @@ def main():
         replace_existing=True,
     )
 
+    # Monthly attendance partitions (PostgreSQL) — daily at 01:15 UTC, so a
+    # missed run still leaves PARTITION_MONTHS_AHEAD months of headroom
+    def partition_job():
+        with app.app_context():
+            from app.services.partition_service import ensure_partitions
+            try:
+                ensure_partitions()
+            except Exception as e:
+                logger.error(f'Failed to create attendance partitions: {e}', exc_info=True)
+
+    scheduler.add_job(
+        partition_job,
+        trigger=CronTrigger(hour=1, minute=15),
+        id='attendance_partitions',
+        name='Attendance Partitions',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # Notification log retention — daily at 02:30 UTC, in small batches
+    def retention_job():
+        with app.app_context():
+            from app.jobs.notification_retention import prune_notifications
+            try:
+                prune_notifications(pause=0.1)
+            except Exception as e:
+                logger.error(f'Failed to prune notifications: {e}', exc_info=True)
+
+    scheduler.add_job(
+        retention_job,
+        trigger=CronTrigger(hour=2, minute=30),
+        id='notification_retention',
+        name='Notification Retention',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # Employee deletions — every EMPLOYEE_PURGE_INTERVAL_SECONDS; this job is
+    # the only thing that purges, so the web workers never run one
+    def purge_job():
+        with app.app_context():
+            from app.services.employee_service import run_pending_purges
+            try:
+                run_pending_purges()
+            except Exception as e:
+                logger.error(f'Failed to purge deleted employees: {e}', exc_info=True)
+
+    scheduler.add_job(
+        purge_job,
+        trigger=IntervalTrigger(seconds=app.config.get('EMPLOYEE_PURGE_INTERVAL_SECONDS', 30)),
+        id='employee_purge',
+        name='Employee Purge',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # Clock-event digest for managers — every NOTIFY_DIGEST_MINUTES
+    def digest_job():
+        with app.app_context():
+            from app.services.digest_service import flush_digests
+            try:
+                flush_digests()
+            except Exception as e:
+                logger.error(f'Failed to flush clock-event digest: {e}', exc_info=True)
+
+    if app.config.get('NOTIFY_DIGEST_ENABLED', True):
+        scheduler.add_job(
+            digest_job,
+            trigger=IntervalTrigger(minutes=app.config.get('NOTIFY_DIGEST_MINUTES', 15)),
+            id='clock_event_digest',
+            name='Clock Event Digest',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
     logger.info('WorkClock scheduler started. Waiting for jobs...')
     logger.info('Next monthly report run: 1st of next month at 00:30 UTC')
 
@@ -0,0 +1,36 @@
+"""Shared fixtures: the app on a throwaway SQLite database."""
+import pytest
+
+from app import create_app
+from app.extensions import db
+from config import TestingConfig
+
+
+def make_app(database_uri, **overrides):
+    """create_app('testing') bound to database_uri.
+
+    Flask-SQLAlchemy builds its engine inside create_app, so the URI and any
+    overrides are patched onto TestingConfig only for the duration of the call.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', database_uri)
+        for key, value in overrides.items():
+            mp.setattr(TestingConfig, key, value, raising=False)
+        return create_app('testing')
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(f'sqlite:///{tmp_path / "test.db"}',
+                   SESSION_FILE_DIR=str(tmp_path / 'sessions'),
+                   ARCHIVE_DIR=str(tmp_path / 'archive'))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,51 @@
+"""Employee deletion is only marked in the request and purged by the scheduler job."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.models.notification import Notification
+from app.services.employee_service import purge_progress, request_employee_deletion, run_pending_purges
+
+
+def _employee_with_rows(name, shifts=5):
+    employee = Employee(name=name, email=f'{name.lower()}@example.com', hourly_rate=20)
+    db.session.add(employee)
+    db.session.flush()
+    for day in range(1, shifts + 1):
+        clock_in = datetime(2026, 3, day, 8)
+        shift = Attendance(employee_id=employee.id, clock_in=clock_in,
+                           clock_out=clock_in + timedelta(hours=8))
+        shift.calculate_duration()
+        db.session.add(shift)
+        db.session.add(Notification(employee_id=employee.id, type='clock_in'))
+    db.session.commit()
+    return employee.id
+
+
+def test_deletion_request_leaves_the_rows_to_the_scheduler(app):
+    employee_id = _employee_with_rows('Bea')
+
+    request_employee_deletion(db.session.get(Employee, employee_id))
+
+    progress = purge_progress(employee_id)
+    assert progress['status'] == 'pending'
+    assert progress['remaining']['attendance'] == 5
+    assert progress['remaining']['notifications'] == 5
+
+
+def test_run_pending_purges_deletes_only_pending_employees(app):
+    app.config['EMPLOYEE_PURGE_CHUNK'] = 2
+    doomed = _employee_with_rows('Bea')
+    kept = _employee_with_rows('Al')
+    request_employee_deletion(db.session.get(Employee, doomed))
+
+    assert run_pending_purges() == 1
+
+    assert db.session.get(Employee, doomed) is None
+    assert purge_progress(doomed)['status'] == 'deleted'
+    assert db.session.scalar(select(func.count()).select_from(Attendance)
+                             .where(Attendance.employee_id == kept)) == 5
+    assert run_pending_purges() == 0
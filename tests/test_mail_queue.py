@@ -0,0 +1,201 @@
+"""Mail queue and sender against a local SMTP server (aiosmtpd) and fakeredis.
+
+Covers the BLMOVE claim and crash recovery, retries through the delayed
+set and its Lua promote script, dead-lettering of 5xx rejections, the
+idle connection close, and send_email's direct fallback.
+"""
+import email
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+fakeredis = pytest.importorskip('fakeredis')
+
+from app.services import mail_queue_service as mq  # noqa: E402
+from app.services.email_service import send_email  # noqa: E402
+
+from conftest import make_app  # noqa: E402
+
+
+class RecordingHandler:
+    """Accepts mail, except recipients starting with 'reject' (550) and the
+    next fail_next DATA commands (451)."""
+
+    def __init__(self):
+        self.messages = []
+        self.peers = []
+        self.fail_next = 0
+        self.received = threading.Event()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('reject'):
+            return '550 No such user here'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail_next:
+            self.fail_next -= 1
+            return '451 Try again later'
+        self.messages.append(email.message_from_bytes(envelope.content))
+        self.peers.append(session.peer)
+        self.received.set()
+        return '250 Message accepted for delivery'
+
+    @property
+    def subjects(self):
+        return [msg['Subject'] for msg in self.messages]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def _mail_app(tmp_path, smtp, redis_server, **overrides):
+    app = make_app(f'sqlite:///{tmp_path / "test.db"}',
+                   SESSION_FILE_DIR=str(tmp_path / 'sessions'),
+                   MAIL_SERVER=smtp.hostname, MAIL_PORT=smtp.port,
+                   MAIL_USE_TLS=False, MAIL_USERNAME='', MAIL_PASSWORD='',
+                   MAIL_SUPPRESS_SEND=False, MAIL_QUEUE_ENABLED=True,
+                   **overrides)
+    app.extensions['redis'] = fakeredis.FakeRedis(server=redis_server)
+    return app
+
+
+@pytest.fixture
+def mail_app(tmp_path, smtp, redis_server):
+    app = _mail_app(tmp_path, smtp, redis_server)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def sender(mail_app):
+    sender = mq.MailSender(mail_app, worker_name='test')
+    yield sender
+    sender.smtp.close()
+
+
+def _enqueue(*subjects, recipient='alice@example.com'):
+    for subject in subjects:
+        mq.enqueue(subject, [recipient], f'Body of {subject}')
+
+
+def test_batch_is_delivered_over_one_connection(sender, smtp):
+    _enqueue('one', 'two', 'three')
+
+    assert sender.run_once(timeout=0.1) == 3
+
+    handler = smtp.handler
+    assert sorted(handler.subjects) == ['one', 'three', 'two']
+    assert len(set(handler.peers)) == 1
+    assert mq.get_queue_stats() == {'pending': 0, 'delayed': 0, 'dead': 0, 'in_flight': 0}
+
+
+def test_temporary_failure_is_retried_with_backoff(sender, smtp):
+    smtp.handler.fail_next = 1
+    _enqueue('flaky')
+
+    sender.run_once(timeout=0.1)
+
+    assert smtp.handler.messages == []
+    stats = mq.get_queue_stats()
+    assert stats['delayed'] == 1 and stats['pending'] == 0 and stats['in_flight'] == 0
+    client = mq._client()
+    raw, due = client.zrange(mq._key('delayed'), 0, 0, withscores=True)[0]
+    payload = json.loads(raw)
+    assert payload['attempts'] == 1 and '451' in payload['last_error']
+    assert due == pytest.approx(time.time() + sender.backoff_base, abs=5)
+
+    # Not due yet: the promote script leaves it alone
+    assert sender.promote_due() == 0
+    # Backoff expired
+    client.zadd(mq._key('delayed'), {raw: time.time() - 1})
+    sender.run_once(timeout=0.1)
+
+    assert smtp.handler.subjects == ['flaky']
+    assert mq.get_queue_stats() == {'pending': 0, 'delayed': 0, 'dead': 0, 'in_flight': 0}
+
+
+def test_permanent_rejection_is_dead_lettered(sender, smtp):
+    _enqueue('bounce', recipient='reject@example.com')
+    _enqueue('fine')
+
+    sender.run_once(timeout=0.1)
+
+    assert smtp.handler.subjects == ['fine']
+    stats = mq.get_queue_stats()
+    assert stats['dead'] == 1 and stats['delayed'] == 0 and stats['pending'] == 0
+    dead = json.loads(mq._client().lindex(mq._key('dead'), 0))
+    assert dead['subject'] == 'bounce' and dead['attempts'] == 1
+    assert '550' in dead['last_error']
+
+
+def test_messages_of_a_crashed_sender_are_requeued(mail_app, sender, smtp):
+    _enqueue('a', 'b')
+    claimed = sender.next_batch(timeout=0.1)  # ...and the process dies here
+    assert len(claimed) == 2
+    assert mq.get_queue_stats()['in_flight'] == 2
+
+    restarted = mq.MailSender(mail_app, worker_name='test')
+    try:
+        assert restarted.recover() == 2
+        assert restarted.run_once(timeout=0.1) == 2
+    finally:
+        restarted.smtp.close()
+
+    assert sorted(smtp.handler.subjects) == ['a', 'b']
+    assert mq.get_queue_stats()['in_flight'] == 0
+
+
+def test_idle_connection_is_closed_and_reopened(sender, smtp):
+    sender.idle_timeout = 0
+    _enqueue('first')
+    sender.run_once(timeout=0.1)
+    assert sender.smtp._conn is not None
+
+    time.sleep(0.01)
+    assert sender.run_once(timeout=0.1) == 0
+    assert sender.smtp._conn is None
+
+    _enqueue('second')
+    sender.run_once(timeout=0.1)
+    assert smtp.handler.subjects == ['first', 'second']
+    assert len(set(smtp.handler.peers)) == 2
+
+
+def test_send_email_falls_back_to_a_thread_when_redis_is_down(tmp_path, smtp, redis_server):
+    app = _mail_app(tmp_path, smtp, redis_server)
+    redis_server.connected = False
+    with app.app_context():
+        send_email('direct', ['alice@example.com'], 'Sent without the queue')
+
+    assert smtp.handler.received.wait(5)
+    assert smtp.handler.subjects == ['direct']
+
+
+def test_send_email_enqueues_when_the_queue_is_up(mail_app, smtp):
+    send_email('queued', ['alice@example.com'], 'Via the queue')
+
+    assert mq.get_queue_stats()['pending'] == 1
+    assert smtp.handler.messages == []
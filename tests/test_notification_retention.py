@@ -0,0 +1,49 @@
+"""Notification pruning deletes old rows batch by batch and stops at the cutoff."""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.jobs.notification_retention import prune_notifications
+from app.models.employee import Employee
+from app.models.notification import Notification
+
+
+def test_prune_stops_at_the_first_recent_row(app):
+    employee = Employee(name='Bea', email='bea@example.com', hourly_rate=20)
+    db.session.add(employee)
+    db.session.flush()
+    now = datetime.now(timezone.utc)
+    sent = [now - timedelta(days=days) for days in range(125, 0, -10)]  # oldest first
+    db.session.add_all([Notification(employee_id=employee.id, type='clock_in', sent_at=at)
+                        for at in sent])
+    db.session.commit()
+
+    deleted = prune_notifications(days=90, batch_size=2)
+
+    assert deleted == 4
+    kept = db.session.scalars(select(Notification.sent_at).order_by(Notification.id)).all()
+    assert len(kept) == len(sent) - 4
+    assert min(kept) >= (now - timedelta(days=90)).replace(tzinfo=None)
+
+
+def test_rows_without_sent_at_are_judged_by_their_id(app):
+    employee = Employee(name='Bea', email='bea@example.com', hourly_rate=20)
+    db.session.add(employee)
+    db.session.flush()
+    now = datetime.now(timezone.utc)
+    sent = [now - timedelta(days=200), None, now - timedelta(days=100), now - timedelta(days=10), None]
+    db.session.add_all([Notification(employee_id=employee.id, type='clock_in') for _ in sent])
+    db.session.flush()
+    for notification, at in zip(Notification.query.order_by(Notification.id), sent):
+        notification.sent_at = at  # the column default fills in None on insert
+    db.session.commit()
+
+    assert prune_notifications(days=90, batch_size=2) == 3
+
+    kept = db.session.scalars(select(Notification.sent_at).order_by(Notification.id)).all()
+    assert kept == [sent[3].replace(tzinfo=None), None]
+
+
+def test_prune_of_an_empty_or_recent_table_deletes_nothing(app):
+    assert prune_notifications(days=90, batch_size=2) == 0
@@ -0,0 +1,246 @@
+"""Monthly partitioning of attendance on PostgreSQL.
+
+Runs migration d5a9e2c7f130 up and down on seeded data, and the
+partition_service / archive_service paths that create and drop monthly
+partitions. Set TEST_POSTGRES_URL as for tests/test_query_plans.py; the
+role must be allowed to CREATE DATABASE, because every test migrates its
+own throwaway database next to that one.
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import current_app
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.employee import Employee
+from app.services.archive_service import archive_period, restore_period
+from app.services.attendance_service import adjust_record, clock_in
+from app.services.partition_service import (DEFAULT_PARTITION, create_month_partition,
+                                            is_partitioned, partition_name)
+from app.services.payroll_service import close_period
+
+from conftest import make_app
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+UNPARTITIONED = 'b83e1f6c2d47'
+PARTITIONED = 'd5a9e2c7f130'
+
+SHIFT_COLUMNS = 'id, employee_id, clock_in, clock_out, work_duration_minutes'
+
+
+@pytest.fixture
+def pg(tmp_path):
+    """An app bound to a new, empty database on the TEST_POSTGRES_URL server."""
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    base = make_url(url)
+    name = f'{base.database}_partitions'
+    admin = create_engine(base, isolation_level='AUTOCOMMIT')
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS {name}'))
+        conn.execute(text(f'CREATE DATABASE {name}'))
+
+    app = make_app(base.set(database=name).render_as_string(hide_password=False),
+                   SESSION_FILE_DIR=str(tmp_path / 'sessions'),
+                   ARCHIVE_DIR=str(tmp_path / 'archive'),
+                   ARCHIVE_FORMAT='csv.gz')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE {name}'))
+    admin.dispose()
+
+
+def _seed(conn):
+    """Two employees with closed shifts in Nov and Dec 2025 and one open shift now.
+
+    Plain SQL, so it works at any revision from UNPARTITIONED on.
+    """
+    employee_ids = conn.execute(text(
+        "INSERT INTO employees (name, email, role, hourly_rate, is_active) VALUES "
+        "('Bea', 'bea@example.com', 'employee', 20, true), "
+        "('Al', 'al@example.com', 'employee', 30, true) RETURNING id")).scalars().all()
+    # The last one clocks in on 30 Nov and out on 1 Dec: it belongs to November
+    starts = [datetime(2025, 11, day, 8) for day in (3, 4, 5)] + [datetime(2025, 11, 30, 22)]
+    starts += [datetime(2025, 12, day, 8) for day in (1, 2)]
+    for employee_id in employee_ids:
+        for start in starts:
+            conn.execute(text(
+                'INSERT INTO attendance (employee_id, clock_in, clock_out, work_duration_minutes) '
+                'VALUES (:employee_id, :clock_in, :clock_out, 480)'),
+                {'employee_id': employee_id, 'clock_in': start, 'clock_out': start + timedelta(hours=8)})
+    conn.execute(text('INSERT INTO attendance (employee_id, clock_in) VALUES (:employee_id, :now)'),
+                 {'employee_id': employee_ids[0], 'now': datetime.now(timezone.utc).replace(tzinfo=None)})
+    return employee_ids
+
+
+def _shifts(conn, where='true'):
+    return conn.execute(text(f'SELECT {SHIFT_COLUMNS} FROM attendance WHERE {where} ORDER BY id')).all()
+
+
+def _partitions_of(conn, where='true'):
+    """{partition table name: row count} of the attendance rows matching where."""
+    return dict(conn.execute(text(
+        f'SELECT tableoid::regclass::text, count(*) FROM attendance WHERE {where} GROUP BY 1')).all())
+
+
+def _exists(conn, name):
+    return conn.execute(text('SELECT to_regclass(:name)'), {'name': name}).scalar() is not None
+
+
+def _add_shift(conn, employee_id, clock_in, clock_out=None):
+    return conn.execute(text(
+        'INSERT INTO attendance (employee_id, clock_in, clock_out) '
+        'VALUES (:employee_id, :clock_in, :clock_out) RETURNING id'),
+        {'employee_id': employee_id, 'clock_in': clock_in, 'clock_out': clock_out}).scalar()
+
+
+def test_partition_migration_round_trip(pg):
+    upgrade(MIGRATIONS, UNPARTITIONED)
+    with db.engine.begin() as conn:
+        employee_ids = _seed(conn)
+        before = _shifts(conn)
+
+    upgrade(MIGRATIONS, PARTITIONED)
+
+    now = datetime.now(timezone.utc)
+    with db.engine.begin() as conn:
+        assert is_partitioned(conn)
+        assert _shifts(conn) == before
+        assert _partitions_of(conn) == {'attendance_y2025m11': 8, 'attendance_y2025m12': 4,
+                                        partition_name(now.year, now.month): 1}
+        assert _exists(conn, 'attendance_y2025m11_open_shift')
+        assert _exists(conn, DEFAULT_PARTITION)
+        # The id sequence and the foreign keys moved to the new table
+        new_id = _add_shift(conn, employee_ids[1], datetime(2025, 12, 3, 8), datetime(2025, 12, 3, 16))
+        assert new_id > before[-1].id
+    with pytest.raises(IntegrityError):
+        with db.engine.begin() as conn:
+            _add_shift(conn, max(employee_ids) + 1, datetime(2025, 12, 3, 8))
+    with db.engine.begin() as conn:
+        after_upgrade = _shifts(conn)
+
+    downgrade(MIGRATIONS, UNPARTITIONED)
+
+    with db.engine.begin() as conn:
+        assert not is_partitioned(conn)
+        assert _shifts(conn) == after_upgrade
+        assert _partitions_of(conn) == {'attendance': len(after_upgrade)}
+        assert _add_shift(conn, employee_ids[1], datetime(2025, 12, 4, 8), datetime(2025, 12, 4, 16)) > new_id
+    # One open shift per employee is back to a single unique index
+    with pytest.raises(IntegrityError):
+        with db.engine.begin() as conn:
+            _add_shift(conn, employee_ids[0], datetime(2025, 12, 5, 8))
+
+
+def test_new_partition_takes_over_stray_default_rows(pg):
+    upgrade(MIGRATIONS)
+    later = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=366)
+    following = later + timedelta(days=31)
+    with db.engine.begin() as conn:
+        employee_id = _seed(conn)[1]
+        stray_id = _add_shift(conn, employee_id, later, later + timedelta(hours=8))
+        other_id = _add_shift(conn, employee_id, following, following + timedelta(hours=8))
+        assert _partitions_of(conn, f'id IN ({stray_id}, {other_id})') == {DEFAULT_PARTITION: 2}
+        stray = _shifts(conn, f'id = {stray_id}')
+
+    name = partition_name(later.year, later.month)
+    with db.engine.begin() as conn:
+        assert create_month_partition(conn, later.year, later.month)
+    with db.engine.begin() as conn:
+        assert _shifts(conn, f'id = {stray_id}') == stray
+        assert _partitions_of(conn, f'id = {stray_id}') == {name: 1}
+        assert _partitions_of(conn, f'id = {other_id}') == {DEFAULT_PARTITION: 1}
+        assert _exists(conn, f'{name}_open_shift')
+        assert not create_month_partition(conn, later.year, later.month)
+
+
+def test_archive_drops_and_restore_recreates_the_month_partition(pg):
+    upgrade(MIGRATIONS, UNPARTITIONED)
+    with db.engine.begin() as conn:
+        _seed(conn)
+    upgrade(MIGRATIONS)
+    with db.engine.begin() as conn:
+        november = _shifts(conn, "clock_in < '2025-12-01'")
+        december = _shifts(conn, "clock_in >= '2025-12-01' AND clock_in < '2026-01-01'")
+
+    close_period(2025, 11)
+    period = archive_period(2025, 11)
+
+    assert period.row_count == len(november) == 8
+    with db.engine.begin() as conn:
+        assert not _exists(conn, 'attendance_y2025m11')
+        assert _shifts(conn, "clock_in < '2025-12-01'") == []
+        assert _shifts(conn, "clock_in >= '2025-12-01' AND clock_in < '2026-01-01'") == december
+
+    assert restore_period(2025, 11) == 8
+
+    with db.engine.begin() as conn:
+        assert _exists(conn, 'attendance_y2025m11_open_shift')
+        assert _shifts(conn, "clock_in < '2025-12-01'") == november
+        assert _partitions_of(conn, "clock_in < '2025-12-01'") == {'attendance_y2025m11': 8}
+
+
+def _last_minute_of_last_month():
+    return datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0,
+                                              tzinfo=None) - timedelta(minutes=1)
+
+
+def _open_shift_ids(conn, employee_id):
+    return conn.execute(text('SELECT id FROM attendance WHERE employee_id = :employee_id '
+                             'AND clock_out IS NULL'), {'employee_id': employee_id}).scalars().all()
+
+
+def test_one_open_shift_per_employee_across_month_partitions(pg):
+    upgrade(MIGRATIONS)
+    with db.engine.begin() as conn:
+        employee_id = _seed(conn)[1]
+        # Clocked in just before midnight on the last day of last month
+        open_id = _add_shift(conn, employee_id, _last_minute_of_last_month())
+        closed_id = _shifts(conn, f"employee_id = {employee_id} AND clock_in >= '2025-12-01'")[0].id
+
+    assert clock_in(db.session.get(Employee, employee_id)).id == open_id
+    with pytest.raises(ValueError, match='already has an open shift'):
+        adjust_record(closed_id, datetime(2025, 12, 1, 8, tzinfo=timezone.utc), None,
+                      employee_id, 'Reopened by mistake')
+
+    with db.engine.begin() as conn:
+        assert _open_shift_ids(conn, employee_id) == [open_id]
+
+
+def test_clock_in_waits_for_a_concurrent_clock_in_in_another_month(pg):
+    upgrade(MIGRATIONS)
+    with db.engine.begin() as conn:
+        employee_id = _seed(conn)[1]
+    app = current_app._get_current_object()
+    result = {}
+
+    def second_kiosk():
+        with app.app_context():
+            result['shift_id'] = clock_in(db.session.get(Employee, employee_id)).id
+
+    # The first kiosk is mid clock-in, just before midnight at the month end
+    with db.engine.connect() as conn:
+        with conn.begin():
+            conn.execute(select(Employee.id).where(Employee.id == employee_id)
+                         .with_for_update(key_share=True))
+            first_id = _add_shift(conn, employee_id, _last_minute_of_last_month())
+            kiosk = threading.Thread(target=second_kiosk)
+            kiosk.start()
+            kiosk.join(0.5)
+            assert kiosk.is_alive()  # waiting for the employee lock
+        kiosk.join(5)
+
+    assert result['shift_id'] == first_id
+    with db.engine.begin() as conn:
+        assert _open_shift_ids(conn, employee_id) == [first_id]
@@ -0,0 +1,38 @@
+"""Closed payroll periods are served from their snapshot, without ORM objects."""
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.services.payroll_service import PayrollPeriod, close_period, get_all_employees_monthly_summary
+
+
+def _add_month_of_shifts(year, month):
+    employees = [Employee(name=name, email=f'{name.lower()}@example.com', hourly_rate=rate)
+                 for name, rate in (('Bea', 20), ('Al', 31.5))]
+    db.session.add_all(employees)
+    db.session.flush()
+    for day in range(1, 23):
+        for employee in employees:
+            clock_in = datetime(year, month, day, 8)
+            shift = Attendance(employee_id=employee.id, clock_in=clock_in,
+                               clock_out=clock_in + timedelta(hours=8, minutes=45))
+            shift.calculate_duration()
+            db.session.add(shift)
+    db.session.commit()
+
+
+def test_closed_period_matches_live_figures_without_orm_objects(app):
+    _add_month_of_shifts(2025, 3)
+    live = PayrollPeriod.build(2025, 3)
+    close_period(2025, 3)
+    db.session.expunge_all()
+
+    closed = PayrollPeriod.build(2025, 3)
+
+    assert len(db.session.identity_map) == 0
+    assert closed.closed_at is not None
+    assert closed.summaries == sorted(get_all_employees_monthly_summary(2025, 3),
+                                      key=lambda s: s['employee_name'])
+    assert [s['employee_name'] for s in closed.summaries] == ['Al', 'Bea']
+    assert closed.total_pay == live.total_pay
@@ -0,0 +1,61 @@
+"""Each budgeted page must stay within its SQL statement budget.
+
+Pages are requested uncached (TestingConfig disables the cache) against a
+small dataset, with no app context held open between requests, so every
+request pays its full worst-case cost, including loading the user.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.services.rollup_service import rebuild_rollups
+from app.utils.query_stats import ENDPOINT_BUDGETS, assert_max_queries
+
+from conftest import make_app
+
+
+@pytest.fixture(scope='module')
+def site(tmp_path_factory):
+    """The app, its engine and the manager/employee ids of a tiny dataset."""
+    tmp_path = tmp_path_factory.mktemp('budgets')
+    app = make_app(f'sqlite:///{tmp_path / "test.db"}', SESSION_FILE_DIR=str(tmp_path / 'sessions'))
+    with app.app_context():
+        db.create_all()
+        manager = Employee(name='Manager', email='manager@example.com', role='manager', hourly_rate=0)
+        employees = [Employee(name=f'Employee {i}', email=f'employee{i}@example.com', hourly_rate=20)
+                     for i in range(3)]
+        db.session.add_all([manager, *employees])
+        db.session.flush()
+
+        today = datetime.now(timezone.utc).replace(hour=8, minute=0, second=0, microsecond=0)
+        for day in range(1, 40):
+            clock_in = today - timedelta(days=day)
+            for employee in employees:
+                shift = Attendance(employee_id=employee.id, clock_in=clock_in,
+                                   clock_out=clock_in + timedelta(hours=8))
+                shift.calculate_duration()
+                db.session.add(shift)
+        db.session.add(Attendance(employee_id=employees[0].id, clock_in=today))  # clocked in now
+        db.session.commit()
+        rebuild_rollups(app, workers=1)
+        ids = {'manager': manager.id, 'employee': employees[0].id}
+        engine = db.engine
+    return app, engine, ids
+
+
+@pytest.mark.parametrize('path', ENDPOINT_BUDGETS)
+def test_page_within_query_budget(site, path):
+    app, engine, ids = site
+    user_id = ids['employee'] if path.startswith('/employee/') else ids['manager']
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    with assert_max_queries(ENDPOINT_BUDGETS[path], engine=engine):
+        response = client.get(path.format(id=ids['employee']))
+
+    assert response.status_code == 200
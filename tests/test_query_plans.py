@@ -0,0 +1,117 @@
+"""Each attendance/notification hot query must be served by its index.
+
+Run before and after an index migration: a query whose index is missing
+(or that the planner can no longer use) fails here instead of turning
+into a full scan in production.
+
+The SQLite checks always run. Set TEST_POSTGRES_URL to a migrated scratch
+database to check the PostgreSQL plans too.
+"""
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import func, or_, select, text
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.notification import Notification
+from app.services.partition_service import create_month_partition, is_partitioned
+
+from conftest import make_app
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+END = datetime(2026, 1, 31, 23, 59, 59, tzinfo=timezone.utc)
+
+HOT_QUERIES = [
+    pytest.param(
+        select(func.coalesce(func.sum(Attendance.work_duration_minutes), 0))
+        .where(Attendance.employee_id == 1,
+               Attendance.clock_in >= START,
+               Attendance.clock_in <= END,
+               Attendance.work_duration_minutes.isnot(None)),
+        'ix_attendance_employee_clock_in', id='monthly-hours'),
+    pytest.param(
+        select(func.coalesce(func.sum(Attendance.work_duration_minutes), 0))
+        .where(Attendance.clock_in >= START,
+               Attendance.work_duration_minutes.isnot(None)),
+        'ix_attendance_clock_in', id='hours-today'),
+    pytest.param(
+        select(func.count(func.distinct(Attendance.employee_id)))
+        .where(Attendance.clock_out.is_(None)),
+        'uq_attendance_open_shift', id='active-employees'),
+    pytest.param(
+        select(Attendance.id)
+        .where(Attendance.clock_out.is_(None),
+               or_(Attendance.employee_id == 1, Attendance.adjusted_by.is_(None)))
+        .limit(2),
+        'uq_attendance_open_shift', id='clock-state'),
+    pytest.param(
+        select(Notification.id).where(Notification.employee_id == 1),
+        'ix_notifications_employee_id', id='notifications-of-employee'),
+]
+
+
+def _literal_sql(conn, stmt):
+    return str(stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+
+
+@pytest.mark.parametrize('stmt, index', HOT_QUERIES)
+def test_sqlite_plan_uses_index(app, stmt, index):
+    with db.engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {_literal_sql(conn, stmt)}'))]
+    assert any(re.search(rf'USING (COVERING )?INDEX {index}\b', line) for line in plan), plan
+
+
+@pytest.fixture(scope='module')
+def pg_app():
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    app = make_app(url)
+    with app.app_context():
+        db.create_all()  # no-op on a migrated database
+        with db.engine.begin() as conn:
+            # Production has the queried month's partition; without it the
+            # planner only sees attendance_default and picks either index
+            if is_partitioned(conn):
+                create_month_partition(conn, START.year, START.month)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def _pg_plan_indexes(conn, stmt):
+    # Small scratch tables are always cheaper to seq-scan, so ask the planner
+    # whether an index path exists at all rather than which one it prefers
+    conn.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = conn.execute(text(f'EXPLAIN (FORMAT JSON) {_literal_sql(conn, stmt)}')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes, indexes = [plan[0]['Plan']], []
+    while nodes:
+        node = nodes.pop()
+        assert node['Node Type'] != 'Seq Scan', f'full scan of {node.get("Relation Name")}'
+        if node.get('Index Name'):
+            indexes.append(node['Index Name'])
+        nodes.extend(node.get('Plans', []))
+    return indexes
+
+
+@pytest.mark.parametrize('stmt, index', HOT_QUERIES)
+def test_postgres_plan_uses_index(pg_app, stmt, index):
+    with db.engine.connect() as conn, conn.begin() as trans:
+        used = _pg_plan_indexes(conn, stmt)
+        # On the partitioned attendance table each partition has its own
+        # copy of the index, attached to the parent's; the open-shift index
+        # exists only per partition (partition_service)
+        accepted = {index, *conn.execute(text(
+            'SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = to_regclass(:name)'
+        ), {'name': index}).scalars()}
+        trans.rollback()
+    if index == 'uq_attendance_open_shift':
+        accepted |= {name for name in used if name.endswith('_open_shift')}
+    assert accepted & set(used), used
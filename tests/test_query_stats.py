@@ -0,0 +1,23 @@
+"""Per-request statement counting survives failing statements."""
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from app.utils.query_stats import QueryStats
+
+
+def test_failed_statements_leave_no_state_on_the_connection(app):
+    with app.test_request_context(), db.engine.connect() as conn:
+        g.query_stats = QueryStats()
+        info = repr(conn.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM no_such_table'))
+            conn.rollback()
+        conn.execute(text('SELECT 1'))
+
+        assert repr(conn.info) == info
+        assert g.query_stats.count == 1
+        assert g.query_stats.seconds > 0
@@ -0,0 +1,24 @@
+"""The bulk seed gives every employee a distinct PIN, or refuses."""
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.employee import Employee
+from app.seeds.bulk import MAX_EMPLOYEES, seed_bulk
+
+
+def test_every_employee_gets_a_distinct_pin(app):
+    result = seed_bulk(app, 3, 1, until=date(2026, 3, 1))
+
+    assert result['employees'] == 3
+    employee = db.session.scalars(select(Employee).where(Employee.role == 'employee')
+                                  .order_by(Employee.id).limit(1)).one()
+    assert employee.check_pin('0001')
+    assert db.session.scalar(select(func.count(func.distinct(Employee.pin_lookup)))) == 4
+
+
+def test_more_employees_than_pins_is_refused(app):
+    with pytest.raises(ValueError, match='distinct 4-digit PIN'):
+        seed_bulk(app, MAX_EMPLOYEES + 1, 1)
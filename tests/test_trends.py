@@ -0,0 +1,65 @@
+"""The weeks of a month add up to the month, also once it is closed."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete
+
+from app.extensions import db
+from app.models.attendance import Attendance
+from app.models.attendance_daily import AttendanceDaily
+from app.models.employee import Employee
+from app.services.attendance_service import adjust_record
+from app.services.payroll_service import close_period
+from app.services.rollup_service import rebuild_rollups
+from app.services.trends_service import get_trends
+
+RANGE = ((2025, 2), (2025, 4))
+
+
+def _add_shifts():
+    """Two employees working 8h45 every weekday of Feb-Apr 2025 (overtime past 100 h)."""
+    employees = [Employee(name=name, email=f'{name.lower()}@example.com', hourly_rate=rate)
+                 for name, rate in (('Bea', 20), ('Al', 31.5))]
+    db.session.add_all(employees)
+    db.session.flush()
+    day = datetime(2025, 2, 1, 8)
+    while day < datetime(2025, 5, 1):
+        if day.weekday() < 5:
+            for employee in employees:
+                shift = Attendance(employee_id=employee.id, clock_in=day,
+                                   clock_out=day + timedelta(hours=8, minutes=45))
+                shift.calculate_duration()
+                db.session.add(shift)
+        day += timedelta(days=1)
+    db.session.commit()
+    return [e.id for e in employees]
+
+
+def _assert_weeks_add_up_to_months():
+    weekly = get_trends(*RANGE, granularity='week')['totals']
+    monthly = get_trends(*RANGE, granularity='month')['totals']
+    assert weekly == pytest.approx(monthly, abs=0.02)
+    return monthly
+
+
+def test_weeks_of_a_closed_month_add_up_to_its_snapshot(app):
+    app.config['OVERTIME_MONTHLY_THRESHOLD'] = 100
+    employee_ids = _add_shifts()
+    rebuild_rollups(app, workers=1)
+    _assert_weeks_add_up_to_months()
+
+    close_period(2025, 3)
+    closed = _assert_weeks_add_up_to_months()
+
+    # Edits after closing change the rollups but not the snapshot
+    shift = Attendance.query.filter(Attendance.employee_id == employee_ids[0],
+                                    Attendance.clock_in >= datetime(2025, 3, 10)).first()
+    adjust_record(shift.id, shift.clock_in.replace(tzinfo=timezone.utc),
+                  shift.clock_in.replace(tzinfo=timezone.utc) + timedelta(hours=14),
+                  employee_ids[1], 'Stayed for inventory')
+    assert _assert_weeks_add_up_to_months() == closed
+
+    # A purged employee's rollups are gone; their snapshot stays
+    db.session.execute(delete(AttendanceDaily).where(AttendanceDaily.employee_id == employee_ids[1]))
+    db.session.commit()
+    _assert_weeks_add_up_to_months()